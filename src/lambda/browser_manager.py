@@ -0,0 +1,261 @@
+"""
+Headless browser manager shared across warm Lambda invocations.
+
+The browser is launched once per container and reused; every capture gets
+a fresh incognito context so cookies and storage never leak between pages.
+"""
+import asyncio
+import logging
+import os
+
+from html_snapshot import render_snapshot
+from page_readiness import wait_until_ready
+from page_text import extract_page_text
+from resource_policy import install_resource_policy
+from tiled_capture import capture_tiles
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# pyppeteer and a Chromium binary are provided by the Lambda layer
+try:
+    from pyppeteer import launch
+    PYPPETEER_AVAILABLE = True
+except ImportError:
+    launch = None
+    PYPPETEER_AVAILABLE = False
+
+DEFAULT_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--no-first-run',
+    '--no-zygote',
+    '--single-process'
+]
+
+DEFAULT_VIEWPORT = {'width': 1280, 'height': 720}
+
+
+async def launch_chromium():
+    """
+    Launch headless Chromium with Lambda-friendly options.
+
+    Returns:
+        pyppeteer.browser.Browser: Launched browser
+    """
+    if not PYPPETEER_AVAILABLE:
+        raise ImportError("pyppeteer is not available")
+
+    options = {
+        'headless': True,
+        'args': DEFAULT_LAUNCH_ARGS,
+        # Keep the browser alive between invocations and let the manager close it
+        'autoClose': False,
+        'handleSIGINT': False,
+        'handleSIGTERM': False,
+        'handleSIGHUP': False
+    }
+    executable_path = os.environ.get('CHROMIUM_PATH')
+    if executable_path:
+        options['executablePath'] = executable_path
+
+    return await launch(options)
+
+
+class BrowserManager:
+    """
+    Keeps one headless browser alive and hands out isolated pages.
+
+    Args:
+        launcher: Coroutine function returning a browser (defaults to Chromium)
+        health_check_timeout: Seconds to wait for the browser to answer a ping
+    """
+
+    def __init__(self, launcher=None, health_check_timeout: float = 2.0):
+        self.launcher = launcher or launch_chromium
+        self.health_check_timeout = health_check_timeout
+        self.browser = None
+        self.launch_count = 0
+        self._loop = None
+        self._launch_lock = None
+
+    def run(self, coroutine):
+        """
+        Run a coroutine on the manager's persistent event loop.
+
+        The browser connection is bound to the loop it was created on, so the
+        same loop must be reused across invocations.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+
+    async def is_healthy(self) -> bool:
+        """Return True if the current browser responds to a version query."""
+        if self.browser is None:
+            return False
+        try:
+            await asyncio.wait_for(self.browser.version(), self.health_check_timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"Browser health check failed: {str(e)}")
+            return False
+
+    async def get_browser(self):
+        """
+        Return a healthy browser, launching or relaunching it as needed.
+        """
+        # Concurrent captures must not launch several browsers at once
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+
+        async with self._launch_lock:
+            if await self.is_healthy():
+                return self.browser
+
+            if self.browser is not None:
+                logger.warning("Relaunching unresponsive browser")
+                await self._discard_browser()
+
+            self.browser = await self.launcher()
+            self.launch_count += 1
+            logger.info(f"Launched browser (launch #{self.launch_count})")
+            return self.browser
+
+    async def _discard_browser(self):
+        browser, self.browser = self.browser, None
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser: {str(e)}")
+
+    async def open_page(self, viewport=None):
+        """
+        Open a page in a fresh incognito context.
+
+        Returns:
+            tuple: (page, browser_context); close the context when done
+        """
+        browser = await self.get_browser()
+        browser_context = await browser.createIncognitoBrowserContext()
+        try:
+            page = await browser_context.newPage()
+            await page.setViewport(viewport or DEFAULT_VIEWPORT)
+        except Exception:
+            await browser_context.close()
+            raise
+        return page, browser_context
+
+    async def capture(self, url: str, image_path: str, options=None):
+        """
+        Load a URL and save a full-page PNG screenshot.
+
+        A crashed browser is relaunched and the capture retried once.
+
+        Args:
+            url: URL to capture
+            image_path: Destination file path
+            options: Optional dict with viewport, timeoutMs, resourcePolicy
+                (a ResourcePolicy applied through request interception) and
+                readiness (page_readiness options; navigation then only waits
+                for DOMContentLoaded and the page is polled until stable) and
+                extractText (maximum characters of rendered text to return) and
+                tiling (tiled_capture options; the page is captured in
+                viewport-height strips instead of one full-page bitmap) and
+                snapshot (an HtmlSnapshot rendered offline instead of
+                loading the URL; resourcePolicy is not applied)
+
+        Returns:
+            dict: imagePath, plus resourceStats, readiness, scrapedItem,
+                tiling, tiles and snapshot when those options are used
+        """
+        options = options or {}
+        for attempt in range(2):
+            try:
+                page, browser_context = await self.open_page(options.get('viewport'))
+                try:
+                    result = {'imagePath': image_path}
+                    await self._load(page, url, options, result)
+                    if options.get('extractText'):
+                        result['scrapedItem'] = await extract_page_text(page, url, options['extractText'])
+                    if options.get('tiling'):
+                        tiling = await capture_tiles(page, image_path, options['tiling'])
+                        if 'tiles' in tiling:
+                            result['tiles'] = tiling.pop('tiles')
+                        result['tiling'] = tiling
+                    else:
+                        await page.screenshot({'path': image_path, 'fullPage': True})
+                    if 'resourceStats' in result:
+                        result['resourceStats'] = result['resourceStats'].to_dict()
+                finally:
+                    await browser_context.close()
+                return result
+            except Exception as e:
+                if attempt == 0 and not await self.is_healthy():
+                    logger.warning(f"Browser crashed during capture, retrying: {str(e)}")
+                    continue
+                raise
+
+    async def _load(self, page, url, options, result):
+        """
+        Load the live URL, or render the archived snapshot offline.
+        """
+        timeout_ms = options.get('timeoutMs', 30000)
+        readiness = options.get('readiness')
+
+        if options.get('snapshot') is not None:
+            result['snapshot'] = await render_snapshot(page, options['snapshot'], timeout_ms)
+        else:
+            if options.get('resourcePolicy') is not None:
+                result['resourceStats'] = await install_resource_policy(page, options['resourcePolicy'], url)
+            await page.goto(url, {
+                'waitUntil': 'domcontentloaded' if readiness else 'load',
+                'timeout': timeout_ms
+            })
+
+        if readiness:
+            result['readiness'] = await wait_until_ready(page, readiness)
+
+    async def capture_many(self, targets, max_tabs: int = 1, options=None):
+        """
+        Capture several URLs in parallel tabs of the same browser.
+
+        Args:
+            targets: List of (url, image_path) tuples
+            max_tabs: Maximum number of pages open at the same time
+            options: Capture options passed to capture()
+
+        Returns:
+            list: Capture result or the raised exception for each target, in order
+        """
+        semaphore = asyncio.Semaphore(max(1, max_tabs))
+
+        async def capture_one(url, image_path):
+            async with semaphore:
+                return await self.capture(url, image_path, options)
+
+        return await asyncio.gather(
+            *(capture_one(url, image_path) for url, image_path in targets),
+            return_exceptions=True
+        )
+
+    async def close(self):
+        """Close the browser if it is running."""
+        if self.browser is not None:
+            await self._discard_browser()
+
+
+_browser_manager = None
+
+
+def get_browser_manager() -> BrowserManager:
+    """
+    Return the container-wide browser manager, creating it on first use.
+    """
+    global _browser_manager
+    if _browser_manager is None:
+        _browser_manager = BrowserManager()
+    return _browser_manager
@@ -0,0 +1,147 @@
+"""
+Index of the last uploaded screenshot per URL.
+
+page_capture compares a new screenshot's perceptual hash with the indexed
+one to skip uploading pages that look unchanged; google_drive_uploader
+updates the index after each upload.
+
+The index also maps the SHA-256 of uploaded bytes to their Drive file, so
+google_drive_uploader can skip uploading identical bytes again.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from object_store import get_object_store
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Index location (s3://bucket/prefix or local directory); dedupe is off when unset
+INDEX_LOCATION_ENV = 'CAPTURE_INDEX_LOCATION'
+
+# Maximum number of differing hash bits for a page to count as unchanged
+DEDUPE_THRESHOLD_ENV = 'CAPTURE_DEDUPE_THRESHOLD'
+DEFAULT_DEDUPE_THRESHOLD = 0
+
+
+def _record_key(url: str) -> str:
+    return f"urls/{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+
+def load_capture_record(location: str, url: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the indexed record for a URL.
+
+    Args:
+        location: Index location
+        url: Captured page URL
+
+    Returns:
+        dict: Record (perceptualHash, shareable_url, file_id, updatedAt) or None
+    """
+    data = get_object_store(location).get(_record_key(url))
+    return json.loads(data.decode('utf-8')) if data else None
+
+
+def save_capture_record(location: str, url: str, perceptual_hash: str,
+                        shareable_url: str, file_id: str) -> Dict[str, Any]:
+    """
+    Store the record for a URL after its screenshot was uploaded.
+
+    Returns:
+        dict: Stored record
+    """
+    record = {
+        'url': url,
+        'perceptualHash': perceptual_hash,
+        'shareable_url': shareable_url,
+        'file_id': file_id,
+        'updatedAt': datetime.utcnow().isoformat() + 'Z'
+    }
+    get_object_store(location).put(
+        _record_key(url),
+        json.dumps(record).encode('utf-8'),
+        content_type='application/json'
+    )
+    return record
+
+
+def _content_key(content_hash: str, folder_id: Optional[str]) -> str:
+    # Uploads without a folder go to the Drive root, which Drive also calls 'root'
+    return f"content/{folder_id or 'root'}/{content_hash}.json"
+
+
+def load_content_record(location: str, content_hash: str,
+                        folder_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Load the indexed upload of identical bytes in a folder.
+
+    Args:
+        location: Index location
+        content_hash: SHA-256 hex digest of the image bytes
+        folder_id: Drive folder of the upload (None for the root)
+
+    Returns:
+        dict: Record (contentHash, folderId, shareable_url, file_id, updatedAt) or None
+    """
+    data = get_object_store(location).get(_content_key(content_hash, folder_id))
+    return json.loads(data.decode('utf-8')) if data else None
+
+
+def save_content_record(location: str, content_hash: str, folder_id: Optional[str],
+                        shareable_url: str, file_id: str) -> Dict[str, Any]:
+    """
+    Store the Drive file holding the bytes with the given hash in a folder.
+
+    Returns:
+        dict: Stored record
+    """
+    record = {
+        'contentHash': content_hash,
+        'folderId': folder_id,
+        'shareable_url': shareable_url,
+        'file_id': file_id,
+        'updatedAt': datetime.utcnow().isoformat() + 'Z'
+    }
+    get_object_store(location).put(
+        _content_key(content_hash, folder_id),
+        json.dumps(record).encode('utf-8'),
+        content_type='application/json'
+    )
+    return record
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Return the number of differing bits between two hex hashes."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+def find_unchanged_capture(location: str, url: str, perceptual_hash: str,
+                           threshold: int = DEFAULT_DEDUPE_THRESHOLD) -> Optional[Dict[str, Any]]:
+    """
+    Return the indexed record if the page looks the same as last time.
+
+    Args:
+        location: Index location
+        url: Captured page URL
+        perceptual_hash: Hash of the new screenshot
+        threshold: Maximum differing bits to treat as unchanged
+
+    Returns:
+        dict: Previous record, or None if the page changed or was never uploaded
+    """
+    record = load_capture_record(location, url)
+    if not record or not record.get('shareable_url') or not record.get('perceptualHash'):
+        return None
+
+    distance = hamming_distance(record['perceptualHash'], perceptual_hash)
+    if distance > threshold:
+        logger.info(f"Page changed since last capture ({distance} bits): {url}")
+        return None
+
+    logger.info(f"Page unchanged since last capture ({distance} bits): {url}")
+    return record
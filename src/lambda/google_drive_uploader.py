@@ -4,9 +4,22 @@ Lambda function to upload images to Google Drive and generate shareable URLs.
 import json
 import logging
 import base64
+import contextlib
+import hashlib
 import io
+import mimetypes
 import os
-from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from capture_index import INDEX_LOCATION_ENV, load_content_record, save_capture_record, save_content_record
+from image_processing import MAGIC_HEADER_SIZE, detect_mime_type
+from object_store import get_object_store
+from rate_limiter import (
+    backoff_delay, call_with_retries, get_rate_limiter, is_rate_limit_error, retry_after_seconds, set_deadline
+)
+from scratch_space import DEFAULT_SCRATCH_DIR, SCRATCH_DIR_ENV
+from upload_sessions import SESSION_LOCATION_ENV, clear_upload_session, load_upload_session, save_upload_session
 
 # Configure logging
 logger = logging.getLogger()
@@ -17,23 +30,72 @@ try:
     from googleapiclient.discovery import build
     from google.oauth2.service_account import Credentials
     from googleapiclient.http import MediaIoBaseUpload
+    import google_auth_httplib2
+    import httplib2
     GOOGLE_DRIVE_AVAILABLE = True
 except ImportError:
     # Create mock objects for testing when libraries are not available
     build = None
     Credentials = None
     MediaIoBaseUpload = None
+    google_auth_httplib2 = None
+    httplib2 = None
     GOOGLE_DRIVE_AVAILABLE = False
     logger.warning("Google Drive API libraries not available")
 
+# Object store holding images written by page_capture (see imageKey in the event)
+STORAGE_LOCATION_ENV = 'IMAGE_STORAGE_LOCATION'
+
+# Bytes sent per request during resumable uploads
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Files up to this size are sent in one multipart request; larger files use
+# a chunked resumable session
+MULTIPART_THRESHOLD_ENV = 'DRIVE_MULTIPART_THRESHOLD'
+DEFAULT_MULTIPART_THRESHOLD = 5 * 1024 * 1024
+
+# When enabled, identical bytes are not uploaded twice: their SHA-256 is
+# looked up in the capture index and in the appProperties of Drive files
+CONTENT_DEDUPE_ENV = 'DRIVE_CONTENT_DEDUPE'
+CONTENT_HASH_PROPERTY = 'sha256'
+
+# Drive accepts at most 100 calls in one batch HTTP request
+BATCH_REQUEST_LIMIT = 100
+
+PUBLIC_READER_PERMISSION = {
+    'role': 'reader',
+    'type': 'anyone'
+}
+
+# 'file' shares every uploaded file; 'folder' shares the target folder once
+# and lets files inherit its access
+SHARE_MODE_ENV = 'DRIVE_SHARE_MODE'
+SHARE_MODES = ('file', 'folder')
+
+# Folders known to be publicly readable, kept for the container's lifetime
+_shared_folders = set()
+
+# The cached OAuth token is refreshed when it expires within this margin
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Drive client kept for the container's lifetime: the service (with its HTTP
+# connections), its credentials and the key they were built from
+_drive_client = None
+
 
 def get_drive_service():
     """
-    Create and return Google Drive service instance.
+    Return the cached Google Drive service, creating it on first use.
+    
+    The service and its OAuth token are reused across warm invocations;
+    the token is refreshed only when it is about to expire, and the client
+    is rebuilt when the service account key changes.
     
     Returns:
         googleapiclient.discovery.Resource: Google Drive service
     """
+    global _drive_client
+    
     if not GOOGLE_DRIVE_AVAILABLE:
         raise ImportError("Google Drive API libraries not available")
     
@@ -42,23 +104,100 @@ def get_drive_service():
     if not service_account_info:
         raise ValueError("GOOGLE_SERVICE_ACCOUNT_KEY environment variable not set")
     
+    if _drive_client is not None and _drive_client['key'] == service_account_info:
+        _refresh_token_if_expiring(_drive_client['credentials'])
+        return _drive_client['service']
+    
     try:
         credentials_dict = json.loads(service_account_info)
         credentials = Credentials.from_service_account_info(
             credentials_dict,
             scopes=['https://www.googleapis.com/auth/drive']
         )
-        service = build('drive', 'v3', credentials=credentials)
+        # Static discovery (the bundled document) is already the 2.x default and
+        # is pinned here explicitly; cache_discovery=False skips the unused file cache
+        service = build('drive', 'v3', credentials=credentials, static_discovery=True, cache_discovery=False)
+        _drive_client = {'key': service_account_info, 'credentials': credentials, 'service': service}
         return service
     except Exception as e:
         logger.error(f"Failed to create Google Drive service: {str(e)}")
         raise
 
 
+def reset_drive_service() -> None:
+    """Drop the cached Drive client so the next call builds a new one."""
+    global _drive_client
+    _drive_client = None
+
+
+def _refresh_token_if_expiring(credentials) -> None:
+    """
+    Refresh the OAuth token if it expires within TOKEN_REFRESH_MARGIN.
+    
+    Credentials without a token yet are left alone; the client fetches one
+    with the first request.
+    """
+    expiry = getattr(credentials, 'expiry', None)
+    if not isinstance(expiry, datetime) or expiry - datetime.utcnow() > TOKEN_REFRESH_MARGIN:
+        return
+    
+    logger.info("Refreshing Google Drive access token")
+    credentials.refresh(google_auth_httplib2.Request(httplib2.Http()))
+
+
+def _is_auth_error(error: Exception) -> bool:
+    """Return True for errors caused by a rejected or unrefreshable token."""
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return status == 401 or type(error).__name__ == 'RefreshError'
+
+
+def _execute(make_request, requests: int = 1):
+    """
+    Execute a Drive API request within the Drive rate limit, rebuilding the
+    client once after an auth error.
+    
+    Args:
+        make_request: Callable taking the service and returning a request
+        requests: Number of API requests sent (the size of a batch)
+    
+    Returns:
+        Response of the request
+    """
+    def send():
+        return make_request(get_drive_service()).execute()
+    
+    try:
+        return call_with_retries('drive', send, requests)
+    except Exception as e:
+        if not _is_auth_error(e):
+            raise
+        logger.warning(f"Google Drive authentication failed, rebuilding client: {str(e)}")
+        reset_drive_service()
+        return call_with_retries('drive', send, requests)
+
+
+def _scratch_file_path(path: str) -> str:
+    """
+    Resolve an event's imagePath, accepting only files in the scratch directory.
+    
+    Anything else (e.g. /proc/self/environ, which holds the service account
+    key) would be uploaded and made public, so it is rejected.
+    
+    Raises:
+        ValueError: If the path resolves outside the scratch directory
+    """
+    root = os.path.realpath(os.environ.get(SCRATCH_DIR_ENV, DEFAULT_SCRATCH_DIR))
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([root, resolved]) != root or resolved == root:
+        raise ValueError(f"Image path outside the scratch directory: {path}")
+    return resolved
+
+
 def upload_image_to_drive(
     image_data: bytes,
-    filename: str,
-    folder_id: Optional[str] = None
+    filename: Optional[str] = None,
+    folder_id: Optional[str] = None,
+    mime_type: Optional[str] = None
 ) -> Dict[str, str]:
     """
     Upload image to Google Drive and return file info with shareable URL.
@@ -67,6 +206,84 @@ def upload_image_to_drive(
         image_data: Binary image data
         filename: Name for the uploaded file
         folder_id: Optional Google Drive folder ID
+        mime_type: MIME type used when the image format is not recognized
+    
+    Returns:
+        dict: File information including shareable URL
+    """
+    session_id = f"sha256:{hashlib.sha256(image_data).hexdigest()}"
+    return upload_stream_to_drive(io.BytesIO(image_data), filename, folder_id, mime_type, session_id)
+
+
+def upload_from_object_store(
+    storage_location: str,
+    image_key: str,
+    filename: Optional[str] = None,
+    folder_id: Optional[str] = None,
+    mime_type: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Stream an image from the object store to Google Drive.
+    
+    Args:
+        storage_location: Object store location (s3://bucket/prefix or directory)
+        image_key: Key of the image in the store
+        filename: Name for the uploaded file (defaults to the key's basename)
+        folder_id: Optional Google Drive folder ID
+        mime_type: MIME type used when the image format is not recognized
+    
+    Returns:
+        dict: File information including shareable URL
+    """
+    store = get_object_store(storage_location)
+    with store.open(image_key) as stream:
+        return upload_stream_to_drive(stream, filename or os.path.basename(image_key), folder_id, mime_type,
+                                      store.uri(image_key))
+
+
+def upload_file_to_drive(
+    image_path: str,
+    filename: Optional[str] = None,
+    folder_id: Optional[str] = None,
+    mime_type: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Stream a local image file to Google Drive.
+    
+    Args:
+        image_path: Path of the image file
+        filename: Name for the uploaded file (defaults to the file's basename)
+        folder_id: Optional Google Drive folder ID
+        mime_type: MIME type used when the image format is not recognized
+    
+    Returns:
+        dict: File information including shareable URL
+    """
+    with open(image_path, 'rb') as stream:
+        return upload_stream_to_drive(stream, filename or os.path.basename(image_path), folder_id, mime_type,
+                                      os.path.abspath(image_path))
+
+
+def upload_stream_to_drive(
+    stream,
+    filename: Optional[str] = None,
+    folder_id: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    session_id: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Upload a seekable binary stream to Google Drive.
+    
+    The stream is read in chunks, and its MIME type is detected from the
+    leading bytes.
+    
+    Args:
+        stream: Seekable binary file object
+        filename: Name for the uploaded file
+        folder_id: Optional Google Drive folder ID
+        mime_type: MIME type used when the image format is not recognized
+        session_id: Identity of the content; with UPLOAD_SESSION_LOCATION set,
+            a resumable upload of the same content continues its saved session
     
     Returns:
         dict: File information including shareable URL
@@ -75,55 +292,434 @@ def upload_image_to_drive(
         raise ImportError("Google Drive API libraries not available")
         
     try:
-        service = get_drive_service()
+        filename, mime_type = _file_type(_read_header(stream), filename, mime_type)
+        content_hash = _hash_stream(stream) if _content_dedupe_enabled() else None
+        if content_hash:
+            existing_id = _find_duplicate(content_hash, folder_id)
+            if existing_id:
+                return dict(_file_info(existing_id, filename), deduplicated=True)
         
-        # Prepare file metadata
-        file_metadata = {
-            'name': filename,
-            'parents': [folder_id] if folder_id else None
-        }
+        # Settled before uploading, so a failure leaves no unshared file behind
+        folder_shares = _folder_shares_files(folder_id)
+        file_id = _create_file(stream, filename, folder_id, mime_type, session_id, content_hash)
         
-        # Remove None values from metadata
-        file_metadata = {k: v for k, v in file_metadata.items() if v is not None}
+        # Make file publicly accessible, unless it inherits access from its folder
+        if not folder_shares:
+            _execute(lambda service: service.permissions().create(
+                fileId=file_id,
+                body=PUBLIC_READER_PERMISSION
+            ))
         
-        # Create media upload
-        media = MediaIoBaseUpload(
-            io.BytesIO(image_data),
-            mimetype='image/png',  # Default to PNG, could be detected
-            resumable=True
+        file_info = _file_info(file_id, filename)
+        if content_hash:
+            _remember_content(content_hash, folder_id, file_info)
+        return file_info
+        
+    except Exception as e:
+        logger.error(f"Failed to upload image to Google Drive: {str(e)}")
+        raise
+
+
+def upload_streams_to_drive(uploads, folder_id: Optional[str] = None) -> List[Any]:
+    """
+    Upload several streams and make them public with one batch request.
+    
+    Media uploads cannot be batched, so files are created one after the
+    other, each stream being opened just before its upload; the permission
+    grants for all of them are then sent through Drive batch HTTP requests.
+    With content dedupe enabled, streams whose bytes are already in Drive
+    are neither uploaded nor shared again.
+    
+    Args:
+        uploads: List of (stream, filename, mime_type) tuples; stream is a
+            seekable binary stream or a callable returning a context manager
+            that opens one, and filename and mime_type may be None
+        folder_id: Optional Google Drive folder ID
+    
+    Returns:
+        list: File information or the raised exception for each upload, in order
+    """
+    if not GOOGLE_DRIVE_AVAILABLE:
+        raise ImportError("Google Drive API libraries not available")
+    
+    # Settled before uploading, so a failure leaves no unshared files behind
+    folder_shares = _folder_shares_files(folder_id)
+    dedupe = _content_dedupe_enabled()
+    filenames = []
+    file_ids = []
+    content_hashes = []
+    duplicates = set()
+    for source, filename, mime_type in uploads:
+        content_hash = None
+        try:
+            with (source() if callable(source) else contextlib.nullcontext(source)) as stream:
+                filename, mime_type = _file_type(_read_header(stream), filename, mime_type)
+                content_hash = _hash_stream(stream) if dedupe else None
+                existing_id = _find_duplicate(content_hash, folder_id) if content_hash else None
+                if existing_id:
+                    duplicates.add(existing_id)
+                    file_ids.append(existing_id)
+                else:
+                    file_ids.append(_create_file(stream, filename, folder_id, mime_type, content_hash=content_hash))
+        except Exception as e:
+            logger.error(f"Failed to upload {filename} to Google Drive: {str(e)}")
+            file_ids.append(e)
+        filenames.append(filename)
+        content_hashes.append(content_hash)
+    
+    if folder_shares:
+        grant_errors = {}
+    else:
+        grant_errors = _grant_public_read_batch(
+            [file_id for file_id in file_ids if isinstance(file_id, str) and file_id not in duplicates]
         )
+    
+    results = []
+    for filename, file_id, content_hash in zip(filenames, file_ids, content_hashes):
+        if isinstance(file_id, Exception):
+            results.append(file_id)
+        elif file_id in grant_errors:
+            results.append(grant_errors[file_id])
+        elif file_id in duplicates:
+            results.append(dict(_file_info(file_id, filename), deduplicated=True))
+        else:
+            file_info = _file_info(file_id, filename)
+            if content_hash:
+                _remember_content(content_hash, folder_id, file_info)
+            results.append(file_info)
+    return results
+
+
+def _folder_shares_files(folder_id: Optional[str]) -> bool:
+    """
+    Return True if files uploaded to the folder need no permission of their own.
+    
+    In 'folder' share mode the folder is given the public reader permission
+    the first time it is used (if it does not have it yet); the result is
+    cached so later uploads make no permission calls at all.
+    """
+    share_mode = os.environ.get(SHARE_MODE_ENV, 'file')
+    if share_mode not in SHARE_MODES:
+        raise ValueError(f"Unsupported Drive share mode: {share_mode}")
+    if share_mode != 'folder' or not folder_id:
+        return False
+    if folder_id in _shared_folders:
+        return True
+    
+    response = _execute(lambda service: service.permissions().list(
+        fileId=folder_id,
+        fields='permissions(type,role)'
+    ))
+    public = any(
+        permission.get('type') == 'anyone' and permission.get('role') in ('reader', 'commenter', 'writer')
+        for permission in response.get('permissions') or []
+    )
+    if not public:
+        _execute(lambda service: service.permissions().create(
+            fileId=folder_id,
+            body=PUBLIC_READER_PERMISSION
+        ))
+        logger.info(f"Shared folder {folder_id} publicly")
+    
+    _shared_folders.add(folder_id)
+    return True
+
+
+def _content_dedupe_enabled() -> bool:
+    return os.environ.get(CONTENT_DEDUPE_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def _read_header(stream) -> bytes:
+    """Return the leading bytes of a seekable stream, leaving it at the start."""
+    stream.seek(0)
+    header = stream.read(MAGIC_HEADER_SIZE)
+    stream.seek(0)
+    return header
+
+
+def _file_type(header: bytes, filename: Optional[str], mime_type: Optional[str]):
+    """
+    Decide the Drive filename and MIME type of an image.
+    
+    The format recognized from the image's leading bytes wins over the
+    given MIME type, which wins over a guess from the filename.
+    
+    Returns:
+        tuple: (filename, mime_type)
+    """
+    mime_type = (detect_mime_type(header) or mime_type
+                 or (filename and mimetypes.guess_type(filename)[0]) or 'image/png')
+    if not filename:
+        filename = 'screenshot' + (mimetypes.guess_extension(mime_type) or '.png')
+    return filename, mime_type
+
+
+def _hash_stream(stream) -> str:
+    """Return the SHA-256 hex digest of a seekable stream, read in chunks."""
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _find_duplicate(content_hash: str, folder_id: Optional[str]) -> Optional[str]:
+    """
+    Find a Drive file already holding the bytes with the given hash.
+    
+    The capture index is checked first, and an indexed file is reused only
+    while it still exists outside the trash; otherwise Drive is queried for
+    a file in the same folder carrying the hash in its appProperties. A
+    failed lookup is treated as no duplicate, so the bytes are uploaded.
+    
+    Returns:
+        str: ID of the existing file, or None
+    """
+    index_location = os.environ.get(INDEX_LOCATION_ENV)
+    if index_location:
+        try:
+            record = load_content_record(index_location, content_hash, folder_id)
+        except Exception as e:
+            logger.warning(f"Failed to read content index: {str(e)}")
+            record = None
+        if record and record.get('file_id') and record.get('folderId') == folder_id:
+            if _file_is_live(record['file_id']):
+                logger.info(f"Identical image found in content index: {record['file_id']}")
+                return record['file_id']
+            logger.info(f"Indexed file {record['file_id']} was deleted or trashed")
+    
+    query = (f"appProperties has {{ key='{CONTENT_HASH_PROPERTY}' and value='{content_hash}' }} "
+             f"and trashed = false")
+    if folder_id:
+        query += f" and '{folder_id}' in parents"
+    try:
+        response = _execute(lambda service: service.files().list(
+            q=query,
+            fields='files(id)',
+            pageSize=1,
+            spaces='drive'
+        ))
+    except Exception as e:
+        logger.warning(f"Failed to look up identical image in Google Drive: {str(e)}")
+        return None
+    files = response.get('files') or []
+    if not files:
+        return None
+    
+    file_id = files[0]['id']
+    logger.info(f"Identical image found in Google Drive: {file_id}")
+    if index_location:
+        _remember_content(content_hash, folder_id, _file_info(file_id, ''))
+    return file_id
+
+
+def _file_is_live(file_id: str) -> bool:
+    """Return True if a Drive file still exists and is not in the trash."""
+    try:
+        file = _execute(lambda service: service.files().get(fileId=file_id, fields='trashed'))
+    except Exception as e:
+        logger.warning(f"Failed to check Drive file {file_id}: {str(e)}")
+        return False
+    return not file.get('trashed')
+
+
+def _remember_content(content_hash: str, folder_id: Optional[str], file_info: Dict[str, str]) -> None:
+    """Record an uploaded file in the content index, if one is configured."""
+    index_location = os.environ.get(INDEX_LOCATION_ENV)
+    if not index_location:
+        return
+    try:
+        save_content_record(index_location, content_hash, folder_id,
+                            file_info['shareable_url'], file_info['file_id'])
+    except Exception as e:
+        # A missing record only costs a Drive query next time
+        logger.warning(f"Failed to update content index: {str(e)}")
+
+
+def _create_file(stream, filename: str, folder_id: Optional[str], mime_type: str,
+                 session_id: Optional[str] = None, content_hash: Optional[str] = None) -> str:
+    """
+    Upload a stream as a new Drive file.
+    
+    Small files are sent in one multipart request; files above the
+    multipart threshold use a chunked resumable session. The content hash,
+    if given, is stored in the file's appProperties.
+    
+    Returns:
+        str: ID of the created file
+    """
+    # Prepare file metadata
+    file_metadata = {
+        'name': filename,
+        'parents': [folder_id] if folder_id else None,
+        'appProperties': {CONTENT_HASH_PROPERTY: content_hash} if content_hash else None
+    }
+    
+    # Remove None values from metadata
+    file_metadata = {k: v for k, v in file_metadata.items() if v is not None}
+    
+    size = stream.seek(0, io.SEEK_END)
+    threshold = int(os.environ.get(MULTIPART_THRESHOLD_ENV, DEFAULT_MULTIPART_THRESHOLD))
+    
+    if size > threshold:
+        file = _upload_resumable(stream, size, file_metadata, mime_type, session_id)
+    else:
+        def create_file(service):
+            # A retried upload starts again from the beginning of the stream
+            stream.seek(0)
+            media = MediaIoBaseUpload(stream, mimetype=mime_type, resumable=False)
+            return service.files().create(
+                body=file_metadata,
+                media_body=media,
+                fields='id'
+            )
         
         # Upload file
-        file = service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id'
-        ).execute()
-        
-        file_id = file.get('id')
-        logger.info(f"File uploaded successfully with ID: {file_id}")
-        
-        # Make file publicly accessible
-        service.permissions().create(
-            fileId=file_id,
-            body={
-                'role': 'reader',
-                'type': 'anyone'
-            }
-        ).execute()
+        file = _execute(create_file)
+    
+    file_id = file.get('id')
+    logger.info(f"File uploaded successfully with ID: {file_id} ({size} bytes)")
+    return file_id
+
+
+def _upload_resumable(stream, size: int, file_metadata: Dict[str, Any], mime_type: str,
+                      session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Upload a stream through a chunked resumable session.
+    
+    With a session location and session_id, the session URI and progress
+    are saved after every chunk and a saved session is resumed.
+    
+    Returns:
+        dict: Created file resource
+    """
+    session_location = os.environ.get(SESSION_LOCATION_ENV) if session_id else None
+    session = load_upload_session(session_location, session_id) if session_location else None
+    if session and session.get('size') != size:
+        session = None
+    
+    def new_request(uri=None, progress=0):
+        media = MediaIoBaseUpload(stream, mimetype=mime_type, chunksize=UPLOAD_CHUNK_SIZE, resumable=True)
+        request = get_drive_service().files().create(body=file_metadata, media_body=media, fields='id')
+        if uri:
+            request.resumable_uri = uri
+            request.resumable_progress = progress
+        return request
+    
+    if session:
+        logger.info(f"Resuming upload session at {session['progress']} of {size} bytes")
+        request = new_request(session['uri'], session['progress'])
+    else:
+        request = new_request()
+    
+    reauthenticated = False
+    response = None
+    while response is None:
+        try:
+            _, response = call_with_retries('drive', request.next_chunk)
+        except Exception as e:
+            status = getattr(getattr(e, 'resp', None), 'status', None)
+            if session and status in (404, 410):
+                # Sessions expire after about a week; start a new one
+                logger.warning("Saved upload session expired, starting a new one")
+                session = None
+                request = new_request()
+                continue
+            if _is_auth_error(e) and not reauthenticated:
+                logger.warning(f"Google Drive authentication failed, rebuilding client: {str(e)}")
+                reauthenticated = True
+                reset_drive_service()
+                request = new_request(request.resumable_uri, request.resumable_progress)
+                continue
+            raise
+        
+        if response is None and session_location:
+            save_upload_session(session_location, session_id, request.resumable_uri, request.resumable_progress, size)
+    
+    if session_location:
+        clear_upload_session(session_location, session_id)
+    return response
+
+
+def _grant_public_read_batch(file_ids: List[str]) -> Dict[str, Exception]:
+    """
+    Make files publicly readable using batch HTTP requests.
+    
+    Grants rejected by a rate limit within a batch are sent again one by
+    one through the rate limiter, after its backoff or Retry-After delay.
+    
+    Args:
+        file_ids: IDs of the files to share
+    
+    Returns:
+        dict: File ID -> exception for every grant that failed
+    """
+    errors = {}
+    granted = set()
+    rate_limited = {}
+    
+    for start in range(0, len(file_ids), BATCH_REQUEST_LIMIT):
+        chunk = file_ids[start:start + BATCH_REQUEST_LIMIT]
         
-        # Generate shareable URL
-        shareable_url = f"https://drive.google.com/file/d/{file_id}/view"
+        def on_response(request_id, response, exception):
+            if exception is None:
+                granted.add(request_id)
+            elif is_rate_limit_error(exception):
+                rate_limited[request_id] = exception
+            else:
+                logger.error(f"Failed to share file {request_id}: {str(exception)}")
+                errors[request_id] = exception
         
-        return {
-            'file_id': file_id,
-            'shareable_url': shareable_url,
-            'filename': filename
-        }
+        def make_batch(service):
+            # A retried batch reports every grant again
+            for file_id in chunk:
+                errors.pop(file_id, None)
+                rate_limited.pop(file_id, None)
+            batch = service.new_batch_http_request(callback=on_response)
+            for file_id in chunk:
+                batch.add(
+                    service.permissions().create(fileId=file_id, body=PUBLIC_READER_PERMISSION),
+                    request_id=file_id
+                )
+            return batch
         
-    except Exception as e:
-        logger.error(f"Failed to upload image to Google Drive: {str(e)}")
-        raise
+        try:
+            _execute(make_batch, len(chunk))
+        except Exception as e:
+            # The batch request itself failed: every grant not answered yet failed with it
+            logger.error(f"Failed to send batch permission request: {str(e)}")
+            for file_id in chunk:
+                if file_id not in granted:
+                    errors[file_id] = e
+            continue
+        logger.info(f"Shared {len(chunk)} files in one batch request")
+    
+    if rate_limited:
+        logger.warning(f"{len(rate_limited)} grants were rate limited, sending them again")
+        get_rate_limiter('drive').pause(
+            max(backoff_delay(0, retry_after_seconds(error)) for error in rate_limited.values())
+        )
+    for file_id in rate_limited:
+        try:
+            _execute(lambda service: service.permissions().create(fileId=file_id, body=PUBLIC_READER_PERMISSION))
+        except Exception as e:
+            logger.error(f"Failed to share file {file_id}: {str(e)}")
+            errors[file_id] = e
+    
+    return errors
+
+
+def _file_info(file_id: str, filename: str) -> Dict[str, str]:
+    """Build the file information returned for an uploaded file."""
+    # Generate shareable URL
+    shareable_url = f"https://drive.google.com/file/d/{file_id}/view"
+    
+    return {
+        'file_id': file_id,
+        'shareable_url': shareable_url,
+        'filename': filename
+    }
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -137,13 +733,81 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Returns:
         dict: JSON response containing the shareable URL and file info
     """
+    set_deadline(context)
     try:
         logger.info(f"Received event keys: {list(event.keys())}")
         
+        # page_capture found the page visually unchanged: reuse the previous upload
+        if event.get('unchanged') and event.get('shareable_url'):
+            logger.info(f"Skipping upload of unchanged page: {event.get('url')}")
+            return {
+                'statusCode': 200,
+                'shareable_url': event['shareable_url'],
+                'file_id': event.get('file_id'),
+                'unchanged': True,
+                'body': json.dumps({
+                    'shareable_url': event['shareable_url'],
+                    'file_id': event.get('file_id'),
+                    'unchanged': True,
+                    'message': 'Page unchanged, reused previous upload'
+                })
+            }
+        
+        # Several images are uploaded together and shared with one batch request
+        if 'images' in event:
+            return _handle_batch_upload(event.get('images') or [], event)
+        
         # Extract image data from the event
         image_data_b64 = event.get('imageData', '')
-        filename = event.get('filename', 'screenshot.png')
+        image_key = event.get('imageKey')
+        image_path = event.get('imagePath')
         folder_id = event.get('folderId')  # Optional folder ID
+        filename = _source_filename(event)
+        mime_type = event.get('mimeType')
+        
+        # Images stored by page_capture are streamed from the object store
+        if image_key:
+            storage_location = event.get('storageLocation') or os.environ.get(STORAGE_LOCATION_ENV)
+            if not storage_location:
+                logger.warning("Image key given without a storage location")
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({
+                        'error': 'Storage location not found for image key',
+                        'shareable_url': None
+                    })
+                }
+            return _upload_and_respond(
+                lambda: upload_from_object_store(storage_location, image_key, filename, folder_id, mime_type),
+                event
+            )
+        
+        # Local files in the scratch directory (local runs, tests) are streamed from disk
+        if image_path and not image_data_b64:
+            try:
+                image_path = _scratch_file_path(image_path)
+            except ValueError as e:
+                logger.warning(str(e))
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({
+                        'error': str(e),
+                        'shareable_url': None
+                    })
+                }
+            if not os.path.isfile(image_path):
+                logger.warning(f"Image file not found: {image_path}")
+                return {
+                    'statusCode': 400,
+                    'body': json.dumps({
+                        'error': f'Image file not found: {image_path}',
+                        'shareable_url': None
+                    })
+                }
+            return _upload_and_respond(
+                lambda: upload_file_to_drive(image_path, filename, folder_id, mime_type),
+                event
+            )
         
         if not image_data_b64:
             logger.warning("No image data found in event")
@@ -169,44 +833,196 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 })
             }
         
+        filename, mime_type = _file_type(image_data[:MAGIC_HEADER_SIZE], filename, mime_type)
+        
         # Upload to Google Drive
-        try:
-            file_info = upload_image_to_drive(image_data, filename, folder_id)
-            logger.info(f"Image uploaded successfully: {file_info}")
-            
-            # Return success response
-            response = {
+        return _upload_and_respond(
+            lambda: upload_image_to_drive(image_data, filename, folder_id, mime_type),
+            event
+        )
+        
+    except Exception as e:
+        logger.error(f"Error processing event: {str(e)}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'error': f'Internal server error: {str(e)}',
+                'shareable_url': None
+            })
+        }
+
+
+def _source_filename(image: Dict[str, Any]) -> Optional[str]:
+    """
+    Return the filename of an image entry: its filename, or the basename of
+    its imageKey or imagePath.
+    """
+    source = image.get('imageKey') or image.get('imagePath')
+    return image.get('filename') or (os.path.basename(source) if source else None)
+
+
+def _handle_batch_upload(images: List[Dict[str, Any]], event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Upload a list of images and build the batch response.
+    
+    Each entry takes the same fields as a single-image event (imageData,
+    imageKey or imagePath, filename, mimeType, unchanged/shareable_url, url and
+    perceptualHash); folderId and storageLocation may be set on the event.
+    
+    Args:
+        images: List of image entries
+        event: Event data
+    
+    Returns:
+        dict: JSON response with a result entry per image
+    """
+    if not images:
+        logger.warning("No images found in event")
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'error': 'Images not found in input',
+                'results': []
+            })
+        }
+    
+    results = [None] * len(images)
+    pending = []
+    
+    for index, image in enumerate(images):
+        if image.get('unchanged') and image.get('shareable_url'):
+            results[index] = {
                 'statusCode': 200,
-                'shareable_url': file_info['shareable_url'],
-                'file_id': file_info['file_id'],
-                'filename': file_info['filename'],
-                'body': json.dumps({
-                    'shareable_url': file_info['shareable_url'],
-                    'file_id': file_info['file_id'],
-                    'filename': file_info['filename'],
-                    'message': 'Image uploaded to Google Drive successfully'
-                })
+                'shareable_url': image['shareable_url'],
+                'file_id': image.get('file_id'),
+                'unchanged': True
             }
-            
-            logger.info(f"Returning response with shareable URL: {file_info['shareable_url']}")
-            return response
-            
+            continue
+        
+        filename, mime_type = _source_filename(image), image.get('mimeType')
+        try:
+            # Streams are opened one at a time during the upload, so only one image is held at once
+            if image.get('imageKey'):
+                storage_location = (image.get('storageLocation') or event.get('storageLocation')
+                                    or os.environ.get(STORAGE_LOCATION_ENV))
+                if not storage_location:
+                    raise ValueError('Storage location not found for image key')
+                store = get_object_store(storage_location)
+                source = lambda store=store, key=image['imageKey']: store.open(key)
+            elif image.get('imagePath') and not image.get('imageData'):
+                image_path = _scratch_file_path(image['imagePath'])
+                if not os.path.isfile(image_path):
+                    raise ValueError(f'Image file not found: {image_path}')
+                source = lambda path=image_path: open(path, 'rb')
+            elif image.get('imageData'):
+                source = lambda data=image['imageData']: contextlib.nullcontext(io.BytesIO(base64.b64decode(data)))
+            else:
+                raise ValueError('Image data not found in input')
         except Exception as e:
-            logger.error(f"Failed to upload to Google Drive: {str(e)}")
-            return {
+            logger.warning(f"Skipping image {index}: {str(e)}")
+            results[index] = {'statusCode': 400, 'error': str(e), 'shareable_url': None}
+            continue
+        pending.append((index, (source, filename, mime_type)))
+    
+    if pending:
+        uploaded = upload_streams_to_drive([upload for _, upload in pending], event.get('folderId'))
+    else:
+        uploaded = []
+    
+    for (index, _), file_info in zip(pending, uploaded):
+        if isinstance(file_info, Exception):
+            results[index] = {
                 'statusCode': 500,
-                'body': json.dumps({
-                    'error': f'Failed to upload to Google Drive: {str(e)}',
-                    'shareable_url': None
-                })
+                'error': f'Failed to upload to Google Drive: {str(file_info)}',
+                'shareable_url': None
             }
+            continue
+        _update_capture_index(dict(event, **images[index]), file_info)
+        results[index] = dict(file_info, statusCode=200)
+    
+    uploaded_count = sum(1 for result in results if result['statusCode'] == 200)
+    logger.info(f"Uploaded {uploaded_count} of {len(images)} images")
+    
+    return {
+        'statusCode': 200,
+        'results': results,
+        'uploadedCount': uploaded_count,
+        'failedCount': len(results) - uploaded_count,
+        'body': json.dumps({
+            'results': results,
+            'uploadedCount': uploaded_count,
+            'failedCount': len(results) - uploaded_count,
+            'message': 'Images uploaded to Google Drive'
+        })
+    }
+
+
+def _upload_and_respond(upload, event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run an upload and build the Lambda response.
+    
+    Args:
+        upload: Callable performing the upload and returning file info
+        event: Event data (used to update the capture index)
+    
+    Returns:
+        dict: JSON response containing the shareable URL and file info
+    """
+    try:
+        file_info = upload()
+        logger.info(f"Image uploaded successfully: {file_info}")
+        _update_capture_index(event, file_info)
+        
+        # Return success response
+        response = {
+            'statusCode': 200,
+            'shareable_url': file_info['shareable_url'],
+            'file_id': file_info['file_id'],
+            'filename': file_info['filename'],
+            'body': json.dumps({
+                'shareable_url': file_info['shareable_url'],
+                'file_id': file_info['file_id'],
+                'filename': file_info['filename'],
+                'message': 'Image uploaded to Google Drive successfully'
+            })
+        }
+        if file_info.get('deduplicated'):
+            response['deduplicated'] = True
+        
+        logger.info(f"Returning response with shareable URL: {file_info['shareable_url']}")
+        return response
         
     except Exception as e:
-        logger.error(f"Error processing event: {str(e)}")
+        logger.error(f"Failed to upload to Google Drive: {str(e)}")
         return {
             'statusCode': 500,
             'body': json.dumps({
-                'error': f'Internal server error: {str(e)}',
+                'error': f'Failed to upload to Google Drive: {str(e)}',
                 'shareable_url': None
             })
-        }
\ No newline at end of file
+        }
+
+
+def _update_capture_index(event: Dict[str, Any], file_info: Dict[str, str]) -> None:
+    """
+    Remember the uploaded screenshot's perceptual hash for the page URL.
+    
+    Args:
+        event: Event data with url and perceptualHash from page_capture
+        file_info: Result of the upload
+    """
+    index_location = event.get('indexLocation') or os.environ.get(INDEX_LOCATION_ENV)
+    if not index_location or not event.get('url') or not event.get('perceptualHash'):
+        return
+    
+    try:
+        save_capture_record(
+            index_location,
+            event['url'],
+            event['perceptualHash'],
+            file_info['shareable_url'],
+            file_info['file_id']
+        )
+    except Exception as e:
+        # A stale index only costs a redundant upload next time
+        logger.warning(f"Failed to update capture index: {str(e)}")
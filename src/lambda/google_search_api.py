@@ -1,17 +1,35 @@
 """
 Lambda function to perform Google Custom Search API requests and return top 5 URLs.
 """
+import hashlib
 import json
 import logging
 import os
+import time
+import unicodedata
 import urllib.parse
 import urllib.request
 import urllib.error
+from collections import OrderedDict
+
+from object_store import get_object_store
+from rate_limiter import call_with_retries, set_deadline
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Search results are cached for this many seconds (0 disables the cache)
+CACHE_TTL_ENV = 'SEARCH_CACHE_TTL_SECONDS'
+# Results kept in memory per container
+CACHE_MAX_ENTRIES_ENV = 'SEARCH_CACHE_MAX_ENTRIES'
+DEFAULT_CACHE_MAX_ENTRIES = 128
+# Persistent tier shared by containers (s3://bucket/prefix, or a local directory such as /tmp/search-cache)
+CACHE_LOCATION_ENV = 'SEARCH_CACHE_LOCATION'
+
+# Cache key -> (expiry time, search results), least recently used first
+_result_cache = OrderedDict()
+
 
 def lambda_handler(event, context):
     """
@@ -24,6 +42,7 @@ def lambda_handler(event, context):
     Returns:
         dict: JSON response containing top 5 search result URLs
     """
+    set_deadline(context)
     try:
         logger.info(f"Received event: {json.dumps(event)}")
         
@@ -103,10 +122,108 @@ def lambda_handler(event, context):
         }
 
 
+def normalize_query(search_word):
+    """
+    Normalize a search word for use in the cache key.
+    
+    Full-width characters, letter case and repeated whitespace do not
+    change the results, so they do not change the key either.
+    
+    Args:
+        search_word (str): The search term
+    
+    Returns:
+        str: Normalized search term
+    """
+    return ' '.join(unicodedata.normalize('NFKC', search_word).casefold().split())
+
+
+def _cache_key(search_word, search_engine_id, num):
+    # The API key only authorizes the request and is left out of the key
+    params = {'cx': search_engine_id, 'num': num, 'q': normalize_query(search_word)}
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_cached_results(cache_key):
+    """
+    Return unexpired cached search results, checking memory, then the persistent tier.
+    
+    Args:
+        cache_key (str): Key from _cache_key
+    
+    Returns:
+        dict: Cached search results, or None
+    """
+    now = time.time()
+    entry = _result_cache.get(cache_key)
+    if entry is not None:
+        if entry[0] > now:
+            _result_cache.move_to_end(cache_key)
+            return entry[1]
+        del _result_cache[cache_key]
+    
+    location = os.environ.get(CACHE_LOCATION_ENV)
+    if not location:
+        return None
+    try:
+        data = get_object_store(location).get(f"search-cache/{cache_key}.json")
+        record = json.loads(data.decode('utf-8')) if data else None
+        if not record:
+            return None
+        expires_at, results = float(record['expiresAt']), record['results']
+    except Exception as e:
+        # Unreadable or malformed records are a cache miss
+        logger.warning(f"Failed to read search cache: {str(e)}")
+        return None
+    if expires_at <= now or not isinstance(results, dict):
+        return None
+    _remember_results(cache_key, expires_at, results)
+    return results
+
+
+def cache_results(cache_key, search_word, results, ttl):
+    """
+    Cache search results in memory and, if configured, in the persistent tier.
+    
+    Args:
+        cache_key (str): Key from _cache_key
+        search_word (str): The search term, stored for inspection
+        results (dict): Search results from Google API
+        ttl (int): Seconds the results stay valid
+    """
+    expires_at = time.time() + ttl
+    _remember_results(cache_key, expires_at, results)
+    
+    location = os.environ.get(CACHE_LOCATION_ENV)
+    if not location:
+        return
+    record = {'searchWord': search_word, 'expiresAt': expires_at, 'results': results}
+    try:
+        get_object_store(location).put(
+            f"search-cache/{cache_key}.json",
+            json.dumps(record).encode('utf-8'),
+            content_type='application/json'
+        )
+    except Exception as e:
+        # The memory tier still serves this container
+        logger.warning(f"Failed to write search cache: {str(e)}")
+
+
+def _remember_results(cache_key, expires_at, results):
+    _result_cache[cache_key] = (expires_at, results)
+    _result_cache.move_to_end(cache_key)
+    max_entries = int(os.environ.get(CACHE_MAX_ENTRIES_ENV, DEFAULT_CACHE_MAX_ENTRIES))
+    while len(_result_cache) > max_entries:
+        _result_cache.popitem(last=False)
+
+
 def perform_google_search(search_word, api_key, search_engine_id):
     """
     Perform a Google Custom Search API request.
     
+    With SEARCH_CACHE_TTL_SECONDS set, results of the same normalized
+    search word and parameters are served from the cache until they expire.
+    
     Args:
         search_word (str): The search term
         api_key (str): Google API key
@@ -116,6 +233,14 @@ def perform_google_search(search_word, api_key, search_engine_id):
         dict: Search results from Google API, or None if error
     """
     try:
+        ttl = int(os.environ.get(CACHE_TTL_ENV) or 0)
+        cache_key = _cache_key(search_word, search_engine_id, 5) if ttl > 0 else None
+        if cache_key:
+            cached = get_cached_results(cache_key)
+            if cached is not None:
+                logger.info("Returning cached Google search results")
+                return cached
+        
         # Construct the API URL
         base_url = "https://www.googleapis.com/customsearch/v1"
         params = {
@@ -130,16 +255,21 @@ def perform_google_search(search_word, api_key, search_engine_id):
         
         logger.info(f"Making request to Google Custom Search API")
         
-        # Make the HTTP request
-        request = urllib.request.Request(url)
-        with urllib.request.urlopen(request, timeout=30) as response:
-            if response.status == 200:
-                result = json.loads(response.read().decode('utf-8'))
-                logger.info("Successfully received Google search results")
-                return result
-            else:
-                logger.error(f"Google API returned status code: {response.status}")
-                return None
+        # Make the HTTP request within the Custom Search rate limit
+        def send():
+            request = urllib.request.Request(url)
+            with urllib.request.urlopen(request, timeout=30) as response:
+                if response.status != 200:
+                    logger.error(f"Google API returned status code: {response.status}")
+                    return None
+                return json.loads(response.read().decode('utf-8'))
+        
+        result = call_with_retries('search', send)
+        if result is not None:
+            logger.info("Successfully received Google search results")
+            if cache_key:
+                cache_results(cache_key, search_word, result, ttl)
+        return result
                 
     except urllib.error.HTTPError as e:
         logger.error(f"HTTP error during Google search: {e.code} - {e.reason}")
@@ -0,0 +1,132 @@
+"""
+Offline rendering of archived HTML snapshots.
+
+A snapshot is stored in an object store under its key as::
+
+    <key>/index.html       HTML of the page (assets may be inlined as data: URLs)
+    <key>/manifest.json    Optional {"assets": {"<original URL>": {"key": ..., "contentType": ...}}}
+
+The HTML is rendered with page.setContent() and every subresource request
+is answered from the archive or aborted, so re-captures need no network
+and give the same result every time.
+"""
+import asyncio
+import html
+import json
+import logging
+import re
+from typing import Any, Dict, Optional
+
+from object_store import get_object_store
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SNAPSHOT_LOCATION_ENV = 'CAPTURE_SNAPSHOT_LOCATION'
+
+_HEAD_TAG = re.compile(r'<head[^>]*>', re.IGNORECASE)
+_BASE_TAG = re.compile(r'<base\s', re.IGNORECASE)
+
+
+class HtmlSnapshot:
+    """
+    An archived page: its HTML, original URL and archived assets.
+
+    Args:
+        html: HTML of the page
+        url: Original page URL, used to resolve relative asset URLs
+        assets: Original asset URL -> dict with key and contentType
+        store: Object store holding the assets
+    """
+
+    def __init__(self, html: str, url: str, assets: Optional[Dict[str, Dict[str, str]]] = None, store=None):
+        self.html = html
+        self.url = url
+        self.assets = assets or {}
+        self.store = store
+
+    def html_with_base(self) -> str:
+        """Return the HTML with a <base> tag so relative URLs resolve to the original site."""
+        if not self.url or _BASE_TAG.search(self.html):
+            return self.html
+        base_tag = f'<base href="{html.escape(self.url, quote=True)}">'
+        match = _HEAD_TAG.search(self.html)
+        if match:
+            return self.html[:match.end()] + base_tag + self.html[match.end():]
+        return base_tag + self.html
+
+    def asset(self, url: str):
+        """
+        Return the archived body and content type of an asset.
+
+        Returns:
+            tuple: (bytes, content_type), or None if the asset is not archived
+        """
+        entry = self.assets.get(url)
+        if not entry or self.store is None:
+            return None
+        body = self.store.get(entry['key'])
+        if body is None:
+            return None
+        return body, entry.get('contentType', 'application/octet-stream')
+
+
+def load_snapshot(location: str, snapshot_key: str, url: str) -> HtmlSnapshot:
+    """
+    Load a snapshot from an object store.
+
+    Args:
+        location: s3://bucket/prefix or a local directory
+        snapshot_key: Key prefix of the snapshot
+        url: Original page URL
+
+    Returns:
+        HtmlSnapshot
+    """
+    store = get_object_store(location)
+    snapshot_key = snapshot_key.rstrip('/')
+    html = store.get(f"{snapshot_key}/index.html")
+    if html is None:
+        raise FileNotFoundError(f"Snapshot not found: {store.uri(snapshot_key + '/index.html')}")
+
+    manifest_data = store.get(f"{snapshot_key}/manifest.json")
+    manifest = json.loads(manifest_data) if manifest_data else {}
+    return HtmlSnapshot(html.decode('utf-8'), url, manifest.get('assets'), store)
+
+
+async def render_snapshot(page, snapshot: HtmlSnapshot, timeout_ms: int = 30000) -> Dict[str, Any]:
+    """
+    Render a snapshot in a page without network access.
+
+    Args:
+        page: pyppeteer Page
+        snapshot: Snapshot to render
+        timeout_ms: Maximum time to wait for the document to finish loading
+
+    Returns:
+        dict: servedAssets and missingAssets request counts
+    """
+    stats = {'servedAssets': 0, 'missingAssets': 0}
+
+    def on_request(request):
+        if request.url.startswith('data:'):
+            asyncio.ensure_future(request.continue_())
+            return
+        asset = snapshot.asset(request.url)
+        if asset is None:
+            stats['missingAssets'] += 1
+            asyncio.ensure_future(request.abort('blockedbyclient'))
+            return
+        body, content_type = asset
+        stats['servedAssets'] += 1
+        asyncio.ensure_future(request.respond({'status': 200, 'contentType': content_type, 'body': body}))
+
+    await page.setRequestInterception(True)
+    page.on('request', on_request)
+    await page.setContent(snapshot.html_with_base())
+    await page.waitForFunction("document.readyState === 'complete'", {'timeout': timeout_ms})
+
+    logger.info(f"Rendered snapshot of {snapshot.url} "
+                f"({stats['servedAssets']} assets served, {stats['missingAssets']} missing)")
+    return stats
@@ -0,0 +1,287 @@
+"""
+Image post-processing for captured screenshots.
+
+Re-encodes a screenshot to PNG, WebP or JPEG with optional downscaling and
+palette quantization, derives thumbnails from the same decoded bitmap, and
+stitches tiled captures into one PNG.
+"""
+import logging
+import os
+import struct
+import zlib
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Pillow is provided by the Lambda layer
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    PIL_AVAILABLE = False
+
+# format name -> (Pillow format, MIME type, file extension)
+IMAGE_FORMATS = {
+    'png': ('PNG', 'image/png', '.png'),
+    'webp': ('WEBP', 'image/webp', '.webp'),
+    'jpeg': ('JPEG', 'image/jpeg', '.jpg')
+}
+
+DEFAULT_QUALITY = 80
+
+# Largest width or height the WebP format can hold
+WEBP_MAX_DIMENSION = 16383
+
+# Bytes needed to recognize an encoded image by its signature
+MAGIC_HEADER_SIZE = 12
+
+
+def normalize_format(output_format):
+    """
+    Normalize an output format name.
+
+    Args:
+        output_format: Format name such as 'png', 'WebP' or 'jpg'
+
+    Returns:
+        str: Key of IMAGE_FORMATS
+    """
+    output_format = (output_format or 'png').lower()
+    if output_format == 'jpg':
+        output_format = 'jpeg'
+    if output_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format: {output_format}")
+    return output_format
+
+
+def mime_type_for_format(output_format):
+    """Return the MIME type for an output format name."""
+    return IMAGE_FORMATS[normalize_format(output_format)][1]
+
+
+def detect_mime_type(header):
+    """
+    Detect an image's MIME type from its leading bytes.
+
+    Args:
+        header: At least the first MAGIC_HEADER_SIZE bytes of the file
+
+    Returns:
+        str: MIME type, or None if the signature is not recognized
+    """
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    return None
+
+
+def encode_image(source_path, output_format='png', quality=DEFAULT_QUALITY, max_width=None,
+                 max_height=None, palette_colors=None, thumbnail_sizes=None):
+    """
+    Re-encode an image file and write optional thumbnails.
+
+    The source is decoded once; the main image and every thumbnail are
+    derived from that bitmap. The source file is replaced when the output
+    path differs from it.
+
+    Args:
+        source_path: Path of the image to encode
+        output_format: 'png', 'webp' or 'jpeg'
+        quality: Lossy quality (1-100) for WebP and JPEG
+        max_width: Optional maximum width; the image is downscaled to fit
+        max_height: Optional maximum height; the image is downscaled to fit
+        palette_colors: Optional palette size for quantization (PNG/WebP only)
+        thumbnail_sizes: Optional list of (width, height) bounding boxes
+
+    Returns:
+        dict: imagePath, mimeType, width, height, sizeBytes and thumbnails
+    """
+    if not PIL_AVAILABLE:
+        raise ImportError("Pillow is required for image encoding")
+
+    output_format = normalize_format(output_format)
+    _, mime_type, extension = IMAGE_FORMATS[output_format]
+    stem = os.path.splitext(source_path)[0]
+    output_path = stem + extension
+
+    with Image.open(source_path) as source:
+        source.load()
+        image = source.convert('RGBA' if source.mode in ('RGBA', 'LA', 'P') and output_format != 'jpeg' else 'RGB')
+
+    if max_width or max_height:
+        image.thumbnail((max_width or image.width, max_height or image.height), Image.LANCZOS)
+
+    if output_format == 'webp' and max(image.size) > WEBP_MAX_DIMENSION:
+        logger.warning(f"{image.width}x{image.height} exceeds the WebP size limit, encoding as PNG instead")
+        output_format = 'png'
+        _, mime_type, extension = IMAGE_FORMATS[output_format]
+        output_path = stem + extension
+
+    _save(image, output_path, output_format, quality, palette_colors)
+
+    thumbnails = []
+    for width, height in thumbnail_sizes or []:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((width, height), Image.LANCZOS)
+        thumbnail_path = f"{stem}_thumb_{width}x{height}{extension}"
+        _save(thumbnail, thumbnail_path, output_format, quality, palette_colors)
+        thumbnails.append({
+            'path': thumbnail_path,
+            'mimeType': mime_type,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+            'sizeBytes': os.path.getsize(thumbnail_path)
+        })
+
+    if output_path != source_path:
+        os.remove(source_path)
+
+    size_bytes = os.path.getsize(output_path)
+    logger.info(f"Encoded {output_path} as {output_format} {image.width}x{image.height} ({size_bytes} bytes)")
+
+    return {
+        'imagePath': output_path,
+        'mimeType': mime_type,
+        'width': image.width,
+        'height': image.height,
+        'sizeBytes': size_bytes,
+        'thumbnails': thumbnails
+    }
+
+
+def _save(image, path, output_format, quality, palette_colors):
+    """
+    Save an image with format-specific encoder settings.
+    """
+    pil_format = IMAGE_FORMATS[output_format][0]
+
+    if palette_colors and output_format != 'jpeg':
+        image = image.quantize(colors=int(palette_colors))
+
+    if output_format == 'png':
+        image.save(path, pil_format, optimize=True)
+    elif output_format == 'webp':
+        image.save(path, pil_format, quality=int(quality), method=4)
+    else:
+        image.save(path, pil_format, quality=int(quality), optimize=True, progressive=True)
+
+
+def compute_dhash(image_path, hash_size=8):
+    """
+    Compute a difference hash (dHash) of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale grid and
+    each bit records whether a pixel is brighter than its right neighbour, so
+    visually identical renders give the same hash regardless of encoding.
+
+    Args:
+        image_path: Path of the image
+        hash_size: Grid size; the hash has hash_size ** 2 bits
+
+    Returns:
+        str: Hash as a hex string
+    """
+    if not PIL_AVAILABLE:
+        raise ImportError("Pillow is required for perceptual hashing")
+
+    with Image.open(image_path) as image:
+        # draft() lets JPEG decode at reduced size; other formats ignore it
+        image.draft('L', ((hash_size + 1) * 4, hash_size * 4))
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def _png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+def stitch_tiles(tiles, output_path, width, flush_bytes=256 * 1024):
+    """
+    Stitch vertical screenshot strips into one PNG, row by row.
+
+    The PNG is written as a zlib stream while tiles are decoded one at a
+    time, so memory stays near one tile however tall the result is.
+
+    Args:
+        tiles: List of dicts with path, height (rows to keep) and offset
+            (rows to skip at the top of the strip)
+        output_path: Destination PNG path
+        width: Width of the result; strips are cropped or padded to it
+        flush_bytes: Compressed bytes buffered before an IDAT chunk is written
+
+    Returns:
+        dict: imagePath, width, height and sizeBytes
+    """
+    if not PIL_AVAILABLE:
+        raise ImportError("Pillow is required for stitching tiles")
+
+    height = sum(tile['height'] for tile in tiles)
+    compressor = zlib.compressobj(6)
+    buffered = []
+    buffered_size = 0
+
+    with open(output_path, 'wb') as output:
+        output.write(b'\x89PNG\r\n\x1a\n')
+        output.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+
+        for tile in tiles:
+            with Image.open(tile['path']) as strip:
+                offset = tile.get('offset', 0)
+                rows = strip.convert('RGB').crop((0, offset, width, offset + tile['height'])).tobytes()
+            stride = width * 3
+            for start in range(0, len(rows), stride):
+                # Filter type 0 (None) before every scanline
+                data = compressor.compress(b'\x00' + rows[start:start + stride])
+                if data:
+                    buffered.append(data)
+                    buffered_size += len(data)
+                if buffered_size >= flush_bytes:
+                    output.write(_png_chunk(b'IDAT', b''.join(buffered)))
+                    buffered, buffered_size = [], 0
+            del rows
+
+        buffered.append(compressor.flush())
+        output.write(_png_chunk(b'IDAT', b''.join(buffered)))
+        output.write(_png_chunk(b'IEND', b''))
+
+    return {
+        'imagePath': output_path,
+        'width': width,
+        'height': height,
+        'sizeBytes': os.path.getsize(output_path)
+    }
+
+
+def crop_tile(tile_path, offset, height, width):
+    """
+    Crop a screenshot strip in place to the rows it contributes.
+
+    Args:
+        tile_path: PNG strip to crop
+        offset: Rows to skip at the top
+        height: Rows to keep
+        width: Width to keep
+    """
+    if not PIL_AVAILABLE:
+        raise ImportError("Pillow is required for cropping tiles")
+
+    with Image.open(tile_path) as strip:
+        if offset == 0 and strip.size == (width, height):
+            return
+        cropped = strip.crop((0, offset, width, offset + height))
+    cropped.save(tile_path, 'PNG', optimize=True)
@@ -0,0 +1,224 @@
+"""
+Object storage helpers shared by the Lambda functions.
+
+Locations are either ``s3://bucket/prefix`` (requires boto3) or a local
+directory path, which acts as a stand-in for S3 in tests and local runs.
+"""
+import logging
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Optional
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# boto3 is provided by the Lambda runtime but is optional for local runs
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    boto3 = None
+    BOTO3_AVAILABLE = False
+
+
+class LocalObjectStore:
+    """
+    Object store backed by a local directory.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def uri(self, key: str) -> str:
+        """Return a location string identifying the object."""
+        return self._path(key)
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        """
+        Store bytes under the given key.
+
+        Args:
+            key: Object key, using '/' as separator
+            data: Bytes to store
+            content_type: Optional MIME type (unused for local storage)
+
+        Returns:
+            str: Location of the stored object
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary name first so readers never see partial objects
+        temp_path = f"{path}.partial"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return path
+
+    def put_file(self, key: str, file_path: str, content_type: Optional[str] = None) -> str:
+        """
+        Store the contents of a local file under the given key.
+
+        Args:
+            key: Object key, using '/' as separator
+            file_path: Path of the file to store
+            content_type: Optional MIME type (unused for local storage)
+
+        Returns:
+            str: Location of the stored object
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.partial"
+        shutil.copyfile(file_path, temp_path)
+        os.replace(temp_path, path)
+        return path
+
+    def open(self, key: str) -> BinaryIO:
+        """
+        Open an object for streaming reads.
+
+        Returns:
+            Seekable binary file object; the caller closes it
+        """
+        return open(self._path(key), 'rb')
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the object's bytes, or None if it does not exist."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        """Return True if an object is stored under the key."""
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str) -> None:
+        """Delete an object; missing objects are ignored."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3ObjectStore:
+    """
+    Object store backed by an S3 bucket and key prefix.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', client=None):
+        if client is None:
+            if not BOTO3_AVAILABLE:
+                raise ImportError("boto3 is required for S3 object storage")
+            client = boto3.client('s3')
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def uri(self, key: str) -> str:
+        """Return a location string identifying the object."""
+        return f"s3://{self.bucket}/{self._key(key)}"
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        """
+        Store bytes under the given key.
+
+        Args:
+            key: Object key relative to the store prefix
+            data: Bytes to store
+            content_type: Optional MIME type for the object
+
+        Returns:
+            str: Location of the stored object
+        """
+        params = {'Bucket': self.bucket, 'Key': self._key(key), 'Body': data}
+        if content_type:
+            params['ContentType'] = content_type
+        self.client.put_object(**params)
+        return self.uri(key)
+
+    def put_file(self, key: str, file_path: str, content_type: Optional[str] = None) -> str:
+        """
+        Upload a local file under the given key using chunked transfers.
+
+        Args:
+            key: Object key relative to the store prefix
+            file_path: Path of the file to upload
+            content_type: Optional MIME type for the object
+
+        Returns:
+            str: Location of the stored object
+        """
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_file(file_path, self.bucket, self._key(key), ExtraArgs=extra_args)
+        return self.uri(key)
+
+    def open(self, key: str) -> BinaryIO:
+        """
+        Open an object for streaming reads.
+
+        The object is downloaded in chunks to a temporary file under /tmp,
+        because consumers such as Drive uploads need a seekable stream.
+
+        Returns:
+            Seekable binary file object; the caller closes it
+        """
+        temp_file = tempfile.TemporaryFile(dir=tempfile.gettempdir())
+        try:
+            self.client.download_fileobj(self.bucket, self._key(key), temp_file)
+            temp_file.seek(0)
+        except Exception:
+            temp_file.close()
+            raise
+        return temp_file
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the object's bytes, or None if it does not exist."""
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body'].read()
+        except Exception as e:
+            error_code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if error_code in ('NoSuchKey', '404'):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        """Return True if an object is stored under the key."""
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception:
+            return False
+
+    def delete(self, key: str) -> None:
+        """Delete an object; missing objects are ignored."""
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+def get_object_store(location: str):
+    """
+    Create an object store for the given location.
+
+    Args:
+        location: ``s3://bucket/prefix`` or a local directory path
+
+    Returns:
+        LocalObjectStore or S3ObjectStore
+    """
+    if not location:
+        raise ValueError("Object store location not specified")
+
+    if location.startswith('s3://'):
+        bucket, _, prefix = location[len('s3://'):].partition('/')
+        return S3ObjectStore(bucket, prefix)
+
+    return LocalObjectStore(location)
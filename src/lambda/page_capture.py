@@ -7,19 +7,66 @@ import os
 import base64
 import subprocess
 import tempfile
+from datetime import datetime
 from urllib.parse import urlparse
 
+from browser_manager import get_browser_manager
+from capture_index import DEDUPE_THRESHOLD_ENV, DEFAULT_DEDUPE_THRESHOLD, INDEX_LOCATION_ENV, find_unchanged_capture
+from html_snapshot import SNAPSHOT_LOCATION_ENV, load_snapshot
+from image_processing import PIL_AVAILABLE, compute_dhash, encode_image, normalize_format
+from object_store import get_object_store
+from page_readiness import readiness_options
+from page_text import DEFAULT_MAX_TEXT_CHARS
+from tiled_capture import tiling_options
+from resource_policy import ResourcePolicy
+from scratch_space import get_scratch_space
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Capture engine: 'browser' uses the shared headless browser, 'placeholder' draws a test image
+CAPTURE_ENGINE_ENV = 'CAPTURE_ENGINE'
+
+# Parallel tabs for multi-URL captures; derived from the function memory unless set
+MAX_TABS_ENV = 'CAPTURE_MAX_TABS'
+BROWSER_BASE_MEMORY_MB = 200
+TAB_MEMORY_MB = 100
+MAX_TABS_LIMIT = 8
+
+# When set (s3://bucket/prefix or a local directory), images are handed to the
+# uploader by object key instead of base64 data in the state payload
+STORAGE_LOCATION_ENV = 'IMAGE_STORAGE_LOCATION'
+
+# Resource blocking for browser captures: 'default' or a JSON policy (see resource_policy)
+RESOURCE_POLICY_ENV = 'CAPTURE_RESOURCE_POLICY'
+
+# Adaptive readiness for browser captures: 'adaptive' or a JSON dict of page_readiness options
+READINESS_ENV = 'CAPTURE_READINESS'
+
+# Combined mode: also return the rendered title and main text as a scrapedData item
+EXTRACT_TEXT_ENV = 'CAPTURE_EXTRACT_TEXT'
+
+# Tiled capture for very tall pages: 'stitch', 'tiles' or a JSON dict of tiled_capture options
+TILING_ENV = 'CAPTURE_TILING'
+
+# Default image post-processing settings; overridden per event by 'imageOptions'
+IMAGE_OPTION_ENVS = {
+    'format': 'CAPTURE_IMAGE_FORMAT',
+    'quality': 'CAPTURE_IMAGE_QUALITY',
+    'maxWidth': 'CAPTURE_MAX_WIDTH',
+    'maxHeight': 'CAPTURE_MAX_HEIGHT',
+    'paletteColors': 'CAPTURE_PALETTE_COLORS',
+    'thumbnails': 'CAPTURE_THUMBNAIL_SIZES'
+}
+
 
 def lambda_handler(event, context):
     """
     Lambda handler to capture screenshots of web pages.
     
     Args:
-        event: Event data containing URL to capture
+        event: Event data containing URL (or list of URLs) to capture
         context: Lambda context object
     
     Returns:
@@ -28,6 +75,12 @@ def lambda_handler(event, context):
     try:
         logger.info(f"Received event: {json.dumps(event)}")
         
+        settings = _capture_settings(event)
+        
+        # A list of URLs is captured in one invocation, sharing one browser
+        if 'urls' in event:
+            return _handle_batch_capture(event.get('urls') or [], context, settings, event.get('searchWord'))
+        
         # Extract URL from the event
         url = event.get('url', '')
         
@@ -43,12 +96,8 @@ def lambda_handler(event, context):
             }
         
         # Validate URL format
-        try:
-            parsed_url = urlparse(url)
-            if not parsed_url.scheme or not parsed_url.netloc:
-                raise ValueError("Invalid URL format")
-        except Exception as e:
-            logger.error(f"Invalid URL format: {url}, error: {str(e)}")
+        if not _is_valid_url(url):
+            logger.error(f"Invalid URL format: {url}")
             return {
                 'statusCode': 400,
                 'body': json.dumps({
@@ -61,22 +110,23 @@ def lambda_handler(event, context):
         logger.info(f"Capturing screenshot for URL: {url}")
         
         # Capture the page screenshot
-        image_path, image_data = capture_page_screenshot(url, context)
+        capture = capture_page(url, context, settings)
+        image_path = capture['imagePath']
         
         logger.info(f"Screenshot captured successfully: {image_path}")
         
+        # The image is in the response or the object store now; free /tmp
+        scratch = get_scratch_space()
+        scratch.release(_artifact_paths(capture))
+        capture['scratchUsage'] = scratch.usage()
+        
         # Return success response
-        response = {
-            'statusCode': 200,
-            'url': url,
-            'imagePath': image_path,
-            'imageData': image_data,
-            'body': json.dumps({
-                'url': url,
-                'imagePath': image_path,
-                'message': 'Page screenshot captured successfully'
-            })
-        }
+        response = dict(capture, statusCode=200, url=url)
+        response['body'] = json.dumps(dict(
+            {key: value for key, value in capture.items() if key != 'imageData'},
+            url=url,
+            message='Page screenshot captured successfully'
+        ))
         
         logger.info(f"Returning response with image path: {image_path}")
         return response
@@ -93,9 +143,454 @@ def lambda_handler(event, context):
         }
 
 
+def _handle_batch_capture(urls, context, settings=None, search_word=None):
+    """
+    Capture a list of URLs and build the batch response.
+    
+    Args:
+        urls: List of URLs to capture
+        context: Lambda context object
+        settings: Capture settings from _capture_settings
+        search_word: The event's searchWord, passed on with scrapedData
+    
+    Returns:
+        dict: JSON response with a result entry per URL
+    """
+    if not urls:
+        logger.warning("No URLs found in event")
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'error': 'URLs not found in input',
+                'results': []
+            })
+        }
+    
+    logger.info(f"Capturing screenshots for {len(urls)} URLs")
+    
+    results = capture_page_screenshots(urls, context, settings)
+    captured_count = sum(1 for result in results if result['statusCode'] == 200)
+    
+    logger.info(f"Captured {captured_count} of {len(urls)} screenshots")
+    
+    scratch = get_scratch_space()
+    for result in results:
+        if result['statusCode'] == 200:
+            scratch.release(_artifact_paths(result))
+    
+    response = {
+        'statusCode': 200,
+        'results': results,
+        'capturedCount': captured_count,
+        'failedCount': len(results) - captured_count,
+        'body': json.dumps({
+            'results': [
+                {key: value for key, value in result.items() if key != 'imageData'}
+                for result in results
+            ],
+            'capturedCount': captured_count,
+            'failedCount': len(results) - captured_count,
+            'scratchUsage': scratch.usage(),
+            'message': 'Page screenshots captured'
+        })
+    }
+    response['scratchUsage'] = scratch.usage()
+    
+    # Combined mode: the rendered texts can feed data_processor directly
+    if (settings or {}).get('extractText'):
+        response['scrapedData'] = [result['scrapedItem'] for result in results if result.get('scrapedItem')]
+        response['searchWord'] = search_word
+    
+    return response
+
+
+def _is_valid_url(url):
+    """
+    Check that a URL has a scheme and host.
+    
+    Args:
+        url: URL to validate
+    
+    Returns:
+        bool: True if the URL can be captured
+    """
+    try:
+        parsed_url = urlparse(url)
+        return bool(parsed_url.scheme and parsed_url.netloc)
+    except Exception:
+        return False
+
+
+def _use_browser_engine():
+    """Return True if captures should use the headless browser."""
+    return os.environ.get(CAPTURE_ENGINE_ENV, 'placeholder') == 'browser'
+
+
+def _max_concurrent_tabs(context):
+    """
+    Decide how many tabs may be open at once for a multi-URL capture.
+    
+    Args:
+        context: Lambda context object (memory_limit_in_mb is used if present)
+    
+    Returns:
+        int: Number of parallel tabs (at least 1)
+    """
+    configured = os.environ.get(MAX_TABS_ENV)
+    if configured:
+        return max(1, int(configured))
+    
+    memory_mb = int(getattr(context, 'memory_limit_in_mb', 0) or 0)
+    if not memory_mb:
+        return 1
+    
+    return max(1, min(MAX_TABS_LIMIT, (memory_mb - BROWSER_BASE_MEMORY_MB) // TAB_MEMORY_MB))
+
+
+def _capture_settings(event):
+    """
+    Collect per-invocation capture settings from the event and environment.
+    
+    Args:
+        event: Event data
+    
+    Returns:
+        dict: imageOptions, storageLocation, indexLocation, dedupeThreshold,
+            resourcePolicy, readiness, extractText, tiling, snapshotKey and
+            snapshotLocation
+    """
+    resource_policy = event.get('resourcePolicy') or os.environ.get(RESOURCE_POLICY_ENV)
+    if isinstance(resource_policy, str) and resource_policy != 'default':
+        resource_policy = json.loads(resource_policy)
+    
+    readiness = event.get('readiness') or os.environ.get(READINESS_ENV)
+    if isinstance(readiness, str) and readiness != 'adaptive':
+        readiness = json.loads(readiness)
+    
+    extract_text = event.get('extractText', os.environ.get(EXTRACT_TEXT_ENV, ''))
+    if isinstance(extract_text, str):
+        extract_text = extract_text.lower() in ('true', '1', 'yes')
+    
+    tiling = event.get('tiling') or os.environ.get(TILING_ENV)
+    if isinstance(tiling, str) and tiling not in ('stitch', 'tiles'):
+        tiling = json.loads(tiling)
+    
+    return {
+        'resourcePolicy': resource_policy,
+        'readiness': readiness,
+        'extractText': extract_text,
+        'tiling': tiling,
+        'snapshotKey': event.get('snapshotKey'),
+        'snapshotLocation': event.get('snapshotLocation') or os.environ.get(SNAPSHOT_LOCATION_ENV),
+        'imageOptions': _image_options(event),
+        'storageLocation': event.get('storageLocation') or os.environ.get(STORAGE_LOCATION_ENV),
+        'indexLocation': event.get('indexLocation') or os.environ.get(INDEX_LOCATION_ENV),
+        'dedupeThreshold': int(
+            event.get('dedupeThreshold', os.environ.get(DEDUPE_THRESHOLD_ENV, DEFAULT_DEDUPE_THRESHOLD))
+        )
+    }
+
+
+def _browser_options(settings):
+    """
+    Build BrowserManager capture options from the capture settings.
+    
+    Args:
+        settings: Capture settings from _capture_settings
+    
+    Returns:
+        dict: Options for BrowserManager.capture
+    """
+    settings = settings or {}
+    options = {}
+    if settings.get('resourcePolicy'):
+        options['resourcePolicy'] = ResourcePolicy.from_config(settings['resourcePolicy'])
+    if settings.get('readiness'):
+        options['readiness'] = readiness_options(settings['readiness'])
+    if settings.get('extractText'):
+        options['extractText'] = DEFAULT_MAX_TEXT_CHARS
+    if settings.get('tiling'):
+        if PIL_AVAILABLE:
+            options['tiling'] = tiling_options(settings['tiling'])
+        else:
+            logger.warning("Pillow not available, capturing full page in one screenshot")
+    return options
+
+
+def _image_options(event):
+    """
+    Collect image post-processing options from the environment and event.
+    
+    Args:
+        event: Event data; 'imageOptions' overrides the environment defaults
+    
+    Returns:
+        dict: format, quality, maxWidth, maxHeight, paletteColors, thumbnails
+    """
+    options = {}
+    for key, env_name in IMAGE_OPTION_ENVS.items():
+        value = os.environ.get(env_name)
+        if value:
+            options[key] = value
+    
+    # Thumbnail sizes from the environment look like "320x240,160x120"
+    if isinstance(options.get('thumbnails'), str):
+        options['thumbnails'] = [
+            [int(part) for part in size.lower().split('x')]
+            for size in options['thumbnails'].split(',') if size.strip()
+        ]
+    
+    options.update(event.get('imageOptions') or {})
+    options['format'] = normalize_format(options.get('format'))
+    return options
+
+
+def _post_process_image(image_path, image_options=None):
+    """
+    Run the image encoding stage on a captured PNG.
+    
+    The stage is skipped for plain PNG output, and falls back to the
+    original PNG when Pillow is not available.
+    
+    Args:
+        image_path: Path of the captured PNG
+        image_options: Options from _image_options
+    
+    Returns:
+        dict: imagePath, mimeType and thumbnails
+    """
+    image_options = image_options or {}
+    output_format = image_options.get('format', 'png')
+    needs_encoding = output_format != 'png' or any(
+        image_options.get(key) for key in ('maxWidth', 'maxHeight', 'paletteColors', 'thumbnails')
+    )
+    
+    if not needs_encoding:
+        return {'imagePath': image_path, 'mimeType': 'image/png', 'thumbnails': []}
+    
+    if not PIL_AVAILABLE:
+        logger.warning("Pillow not available, keeping original PNG screenshot")
+        return {'imagePath': image_path, 'mimeType': 'image/png', 'thumbnails': []}
+    
+    encoded = encode_image(
+        image_path,
+        output_format=output_format,
+        quality=int(image_options.get('quality') or 80),
+        max_width=int(image_options['maxWidth']) if image_options.get('maxWidth') else None,
+        max_height=int(image_options['maxHeight']) if image_options.get('maxHeight') else None,
+        palette_colors=image_options.get('paletteColors'),
+        thumbnail_sizes=[tuple(size) for size in image_options.get('thumbnails') or []]
+    )
+    return {
+        'imagePath': encoded['imagePath'],
+        'mimeType': encoded['mimeType'],
+        'thumbnails': encoded['thumbnails']
+    }
+
+
+def _check_unchanged(url, processed, settings):
+    """
+    Compare the screenshot with the last uploaded one for the same URL.
+    
+    Adds perceptualHash and unchanged to the capture result; for unchanged
+    pages the previous shareable_url and file_id are reused.
+    
+    Args:
+        url: Captured page URL
+        processed: Result of _post_process_image
+        settings: Capture settings from _capture_settings
+    
+    Returns:
+        bool: True if the page looks the same as the indexed screenshot
+    """
+    index_location = settings.get('indexLocation')
+    if not index_location:
+        return False
+    
+    if not PIL_AVAILABLE:
+        logger.warning("Pillow not available, skipping screenshot dedupe")
+        return False
+    
+    processed['perceptualHash'] = compute_dhash(processed['imagePath'])
+    processed['indexLocation'] = index_location
+    try:
+        previous = find_unchanged_capture(
+            index_location, url, processed['perceptualHash'], settings.get('dedupeThreshold', 0)
+        )
+    except Exception as e:
+        # An unreadable index only costs a redundant upload
+        logger.warning(f"Failed to read capture index, treating page as changed: {str(e)}")
+        previous = None
+    processed['unchanged'] = previous is not None
+    if previous:
+        processed['shareable_url'] = previous['shareable_url']
+        processed['file_id'] = previous['file_id']
+    return processed['unchanged']
+
+
+def _artifact_paths(capture):
+    """
+    List the local files of a capture result (image, thumbnails and tiles).
+    """
+    paths = [capture.get('imagePath')]
+    paths.extend(thumbnail['path'] for thumbnail in capture.get('thumbnails') or [])
+    paths.extend(tile['path'] for tile in capture.get('tiles') or [])
+    return paths
+
+
+def _finish_capture(image_path, url, settings=None, browser_result=None):
+    """
+    Post-process a captured PNG and hand it over to the next state.
+    
+    With a storage location the image (and its thumbnails and tiles) are
+    written to the object store and only the key is returned; otherwise the
+    image is returned as base64. Unchanged pages return neither.
+    
+    Args:
+        image_path: Path of the captured PNG
+        url: Captured page URL
+        settings: Capture settings from _capture_settings
+        browser_result: Result of BrowserManager.capture; its extra fields
+            (resourceStats, readiness, tiles, ...) are added to the result
+    
+    Returns:
+        dict: imagePath, imageData (or imageKey), mimeType and thumbnails
+    """
+    settings = settings or {}
+    processed = {'imagePath': image_path}
+    stored = []
+    try:
+        # Re-encoding and hashing decode the whole bitmap, which stitched
+        # captures of very tall pages are meant to avoid
+        stitched = ((browser_result or {}).get('tiling') or {}).get('mode') == 'stitch'
+        if stitched:
+            logger.info("Keeping stitched capture as PNG without re-encoding or dedupe")
+            processed = {'imagePath': image_path, 'mimeType': 'image/png', 'thumbnails': []}
+        else:
+            processed = _post_process_image(image_path, settings.get('imageOptions'))
+        processed.update({key: value for key, value in (browser_result or {}).items() if key != 'imagePath'})
+        
+        if not stitched and _check_unchanged(url, processed, settings):
+            processed['imageData'] = None
+            return processed
+        
+        storage_location = settings.get('storageLocation')
+        if storage_location:
+            store = get_object_store(storage_location)
+            prefix = f"screenshots/{datetime.utcnow().strftime('%Y-%m-%d')}"
+            processed['imageKey'] = f"{prefix}/{os.path.basename(processed['imagePath'])}"
+            processed['storageLocation'] = storage_location
+            store.put_file(processed['imageKey'], processed['imagePath'], content_type=processed['mimeType'])
+            stored.append(processed['imageKey'])
+            for thumbnail in processed['thumbnails']:
+                thumbnail['key'] = f"{prefix}/{os.path.basename(thumbnail['path'])}"
+                store.put_file(thumbnail['key'], thumbnail['path'], content_type=thumbnail['mimeType'])
+                stored.append(thumbnail['key'])
+            for tile in processed.get('tiles') or []:
+                tile['key'] = f"{prefix}/{os.path.basename(tile['path'])}"
+                store.put_file(tile['key'], tile['path'], content_type='image/png')
+                stored.append(tile['key'])
+            processed['imageData'] = None
+            logger.info(f"Stored screenshot as {store.uri(processed['imageKey'])}")
+            return processed
+        
+        with open(processed['imagePath'], 'rb') as image_file:
+            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+        
+        processed['imageData'] = image_data
+        return processed
+    
+    except Exception:
+        # Nothing of a capture that cannot be handed over is kept, except
+        # the captured PNG, which the caller owns
+        for key in stored:
+            store.delete(key)
+        get_scratch_space().release(path for path in _artifact_paths(processed) if path != image_path)
+        raise
+
+
+def capture_page_screenshots(urls, context=None, settings=None):
+    """
+    Capture several URLs, in parallel tabs when the browser engine is used.
+    
+    Args:
+        urls (list): URLs to capture
+        context: Lambda context object (optional)
+        settings: Capture settings from _capture_settings (optional)
+    
+    Returns:
+        list: Result dict per URL (url, statusCode, imagePath, imageData/imageKey, mimeType, error)
+    """
+    request_id = context.aws_request_id if context and hasattr(context, 'aws_request_id') else 'test'
+    scratch = get_scratch_space()
+    results = [None] * len(urls)
+    targets = []
+    
+    for index, url in enumerate(urls):
+        if not _is_valid_url(url):
+            results[index] = {
+                'url': url,
+                'statusCode': 400,
+                'error': f'Invalid URL format: {url}',
+                'imagePath': None,
+                'imageData': None
+            }
+            continue
+        image_path = scratch.path(f"screenshot_{request_id}_{index}.png")
+        targets.append((index, url, image_path))
+    
+    if _use_browser_engine():
+        manager = get_browser_manager()
+        outcomes = manager.run(manager.capture_many(
+            [(url, image_path) for _, url, image_path in targets],
+            max_tabs=_max_concurrent_tabs(context),
+            options=_browser_options(settings)
+        ))
+    else:
+        outcomes = []
+        for _, url, image_path in targets:
+            try:
+                create_placeholder_image(image_path, url)
+                outcomes.append({'imagePath': image_path})
+            except Exception as e:
+                outcomes.append(e)
+    
+    for (index, url, image_path), outcome in zip(targets, outcomes):
+        scratch.track(image_path)
+        if isinstance(outcome, Exception):
+            logger.error(f"Failed to capture {url}: {str(outcome)}")
+            results[index] = {
+                'url': url,
+                'statusCode': 500,
+                'error': f'Capture failed: {str(outcome)}',
+                'imagePath': None,
+                'imageData': None
+            }
+            continue
+        
+        try:
+            result = _finish_capture(image_path, url, settings, outcome)
+        except Exception as e:
+            # One URL failing to encode or store does not fail the batch
+            logger.error(f"Failed to finish capture of {url}: {str(e)}")
+            scratch.release([image_path] + _artifact_paths(outcome))
+            results[index] = {
+                'url': url,
+                'statusCode': 500,
+                'error': f'Capture failed: {str(e)}',
+                'imagePath': None,
+                'imageData': None
+            }
+            continue
+        scratch.track(*_artifact_paths(result))
+        results[index] = dict(result, url=url, statusCode=200)
+    
+    return results
+
+
 def capture_page_screenshot(url, context=None):
     """
-    Capture a screenshot of the specified URL using Puppeteer.
+    Capture a screenshot of the specified URL as PNG.
     
     Args:
         url (str): URL to capture
@@ -104,24 +599,52 @@ def capture_page_screenshot(url, context=None):
     Returns:
         tuple: (image_path, base64_image_data)
     """
-    # Create temporary file for the screenshot
-    temp_dir = '/tmp'
+    capture = capture_page(url, context)
+    return capture['imagePath'], capture['imageData']
+
+
+def capture_page(url, context=None, settings=None):
+    """
+    Capture a screenshot of the specified URL and run the encoding stage.
+    
+    With ``CAPTURE_ENGINE=browser`` the page is rendered by the headless
+    browser kept alive across warm invocations; otherwise a placeholder
+    image is generated. With a snapshotKey setting the archived HTML
+    snapshot is rendered instead of the live URL.
+    
+    Args:
+        url (str): URL to capture
+        context: Lambda context object (optional)
+        settings: Capture settings from _capture_settings (optional)
+        
+    Returns:
+        dict: imagePath, imageData (base64) or imageKey, mimeType and thumbnails
+    """
+    # Create temporary file for the screenshot in the tracked scratch space
+    scratch = get_scratch_space()
     timestamp = context.aws_request_id if context and hasattr(context, 'aws_request_id') else 'test'
     image_filename = f"screenshot_{timestamp}.png"
-    image_path = os.path.join(temp_dir, image_filename)
+    image_path = scratch.path(image_filename)
     
     try:
-        # For now, we'll implement a placeholder that creates a simple image
-        # In a real Lambda deployment, this would use Puppeteer with Chrome/Chromium
-        create_placeholder_image(image_path, url)
-        
-        # Read the image and encode as base64
-        with open(image_path, 'rb') as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
+        browser_result = {}
+        if _use_browser_engine():
+            options = _browser_options(settings)
+            if settings and settings.get('snapshotKey'):
+                options['snapshot'] = load_snapshot(settings.get('snapshotLocation'), settings['snapshotKey'], url)
+            manager = get_browser_manager()
+            browser_result = manager.run(manager.capture(url, image_path, options))
+        else:
+            create_placeholder_image(image_path, url)
+        scratch.track(image_path)
         
-        return image_path, image_data
+        capture = _finish_capture(image_path, url, settings, browser_result)
+        scratch.track(*_artifact_paths(capture))
+        return capture
         
     except Exception as e:
+        # Leftovers stay tracked and are evicted when over budget
+        scratch.track(image_path)
         logger.error(f"Failed to capture screenshot: {str(e)}")
         raise
 
@@ -175,45 +698,3 @@ def create_placeholder_image(image_path, url):
         logger.error(f"Failed to create placeholder image: {str(e)}")
         raise
 
-
-# TODO: Real Puppeteer implementation would look like this:
-"""
-def capture_page_screenshot_puppeteer(url):
-    '''
-    Real implementation using Puppeteer.
-    This would require:
-    1. Puppeteer npm package
-    2. Chrome/Chromium binary (via Lambda layer or bundled)
-    3. Node.js subprocess call or pyppeteer
-    '''
-    
-    # Example with pyppeteer (Python port of Puppeteer)
-    import asyncio
-    from pyppeteer import launch
-    
-    async def capture():
-        browser = await launch({
-            'headless': True,
-            'args': [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu',
-                '--no-first-run',
-                '--no-zygote',
-                '--single-process'
-            ]
-        })
-        
-        page = await browser.newPage()
-        await page.setViewport({'width': 1280, 'height': 720})
-        await page.goto(url, {'waitUntil': 'networkidle2'})
-        
-        screenshot_path = f'/tmp/screenshot_{context.aws_request_id}.png'
-        await page.screenshot({'path': screenshot_path, 'fullPage': True})
-        
-        await browser.close()
-        return screenshot_path
-    
-    return asyncio.get_event_loop().run_until_complete(capture())
-"""
\ No newline at end of file
@@ -0,0 +1,117 @@
+"""
+Adaptive page-readiness detection for browser captures.
+
+Instead of waiting for network idle, which never comes on pages that poll
+or stream, the page is sampled after DOMContentLoaded and the capture
+proceeds as soon as the DOM stops changing, the layout stops moving, or a
+hard deadline passes.
+"""
+import asyncio
+import logging
+from typing import Any, Dict
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_READINESS = {
+    # No DOM mutations and no pending images for this long
+    'quietMs': 500,
+    # Document size and pending image count unchanged for this long
+    'layoutStableMs': 1500,
+    # Capture anyway after this long
+    'deadlineMs': 10000,
+    'pollMs': 100
+}
+
+# Counts DOM mutations from the moment it is installed (idempotent)
+INSTALL_SCRIPT = """() => {
+    if (window.__captureReadiness) {
+        return;
+    }
+    const state = window.__captureReadiness = {mutations: 0};
+    new MutationObserver(records => { state.mutations += records.length; }).observe(
+        document, {childList: true, subtree: true, attributes: true, characterData: true});
+}"""
+
+SNAPSHOT_SCRIPT = """() => {
+    const root = document.documentElement;
+    const state = window.__captureReadiness || {mutations: 0};
+    return {
+        mutations: state.mutations,
+        width: root ? root.scrollWidth : 0,
+        height: root ? root.scrollHeight : 0,
+        pendingImages: Array.from(document.images).filter(image => !image.complete).length
+    };
+}"""
+
+
+def readiness_options(config) -> Dict[str, Any]:
+    """
+    Build readiness options from event or environment configuration.
+
+    Args:
+        config: 'adaptive' (or True) for the defaults, or a dict overriding
+            quietMs, layoutStableMs, deadlineMs and pollMs
+
+    Returns:
+        dict: Complete readiness options
+    """
+    options = dict(DEFAULT_READINESS)
+    if isinstance(config, dict):
+        options.update({key: int(value) for key, value in config.items() if key in DEFAULT_READINESS})
+    return options
+
+
+async def wait_until_ready(page, options=None) -> Dict[str, Any]:
+    """
+    Wait until the page looks visually stable.
+
+    Signals, checked in order on every poll:
+        - 'dom-quiet': no DOM mutations for quietMs and no images loading
+        - 'layout-stable': document size and loading images unchanged for
+          layoutStableMs, even if the DOM keeps changing (tickers, clocks)
+        - 'deadline': deadlineMs elapsed (pages that keep growing)
+
+    Args:
+        page: pyppeteer Page, after navigation reached DOMContentLoaded
+        options: Options from readiness_options
+
+    Returns:
+        dict: signal (which condition fired) and waitedMs
+    """
+    options = options or DEFAULT_READINESS
+    loop = asyncio.get_event_loop()
+    started_at = loop.time()
+
+    await page.evaluate(INSTALL_SCRIPT)
+
+    mutations = None
+    layout = None
+    last_mutation_at = started_at
+    last_layout_change_at = started_at
+
+    while True:
+        snapshot = await page.evaluate(SNAPSHOT_SCRIPT)
+        now = loop.time()
+
+        current_layout = (snapshot['width'], snapshot['height'], snapshot['pendingImages'])
+        if mutations is not None and snapshot['mutations'] != mutations:
+            last_mutation_at = now
+        if layout is not None and current_layout != layout:
+            last_layout_change_at = now
+        mutations, layout = snapshot['mutations'], current_layout
+
+        if (now - last_mutation_at) * 1000 >= options['quietMs'] and snapshot['pendingImages'] == 0:
+            signal = 'dom-quiet'
+        elif (now - last_layout_change_at) * 1000 >= options['layoutStableMs']:
+            signal = 'layout-stable'
+        elif (now - started_at) * 1000 >= options['deadlineMs']:
+            signal = 'deadline'
+        else:
+            await asyncio.sleep(options['pollMs'] / 1000)
+            continue
+
+        waited_ms = int((now - started_at) * 1000)
+        logger.info(f"Page ready after {waited_ms}ms ({signal})")
+        return {'signal': signal, 'waitedMs': waited_ms}
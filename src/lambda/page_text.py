@@ -0,0 +1,57 @@
+"""
+Rendered text extraction for browser captures.
+
+Reads the title and main text from the page already loaded for the
+screenshot, in the same shape as a web_scraper ``scrapedData`` item, so one
+page load feeds both data_processor and the Drive upload.
+"""
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Keeps the item well inside the Step Functions payload limit
+DEFAULT_MAX_TEXT_CHARS = 20000
+
+# Prefers the page's main content region over navigation and footers
+EXTRACT_TEXT_SCRIPT = """() => {
+    const main = document.querySelector('main, article, [role="main"]') || document.body;
+    return {
+        title: document.title || '',
+        content: main ? main.innerText : ''
+    };
+}"""
+
+
+def _normalize_whitespace(text: str) -> str:
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+
+async def extract_page_text(page, url: str, max_chars: int = DEFAULT_MAX_TEXT_CHARS) -> Dict[str, Any]:
+    """
+    Extract the rendered title and main text of a loaded page.
+
+    Args:
+        page: pyppeteer Page after navigation
+        url: URL of the page
+        max_chars: Maximum length of the returned content
+
+    Returns:
+        dict: title, url, content and timestamp (a scrapedData item)
+    """
+    extracted = await page.evaluate(EXTRACT_TEXT_SCRIPT)
+    content = _normalize_whitespace(extracted.get('content'))
+    if len(content) > max_chars:
+        logger.info(f"Truncating page text of {url} from {len(content)} to {max_chars} characters")
+        content = content[:max_chars]
+
+    return {
+        'title': _normalize_whitespace(extracted.get('title')),
+        'url': url,
+        'content': content,
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    }
@@ -0,0 +1,384 @@
+"""
+Quota-aware rate limiting for the Google API clients.
+
+Sheets, Drive and Custom Search each have per-minute quotas. Calls made
+through call_with_retries() first take a token from the API's bucket,
+and calls rejected with a rate-limit error are retried after the
+``Retry-After`` delay or an exponential backoff with jitter.
+
+Rates are configured per API in requests per minute::
+
+    GOOGLE_API_RATE_LIMITS=sheets=60,drive=600,search=100
+
+APIs without a rate are not throttled ahead of time but still back off
+when rejected. With ``GOOGLE_API_RATE_STORE`` set, the containers also
+share a per-minute request counter, kept in a DynamoDB table
+(``dynamodb://<table>``, requires boto3) or a local directory, which acts
+as a stand-in in tests and local runs.
+
+Handlers call set_deadline() with their Lambda context, so that a wait
+that would outlast the invocation fails fast with RateLimitTimeout
+instead of letting Lambda time out.
+"""
+import fcntl
+import json
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# boto3 is provided by the Lambda runtime but is optional for local runs
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    boto3 = None
+    BOTO3_AVAILABLE = False
+
+RATE_LIMITS_ENV = 'GOOGLE_API_RATE_LIMITS'
+RATE_STORE_ENV = 'GOOGLE_API_RATE_STORE'
+MAX_RETRIES_ENV = 'GOOGLE_API_MAX_RETRIES'
+DEFAULT_MAX_RETRIES = 5
+
+# Seconds of requests a container may send in a burst
+BURST_SECONDS = 10
+
+# Quota window of the shared counter
+WINDOW_SECONDS = 60
+
+# Backoff: base * 2^attempt seconds with full jitter, capped
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 32
+
+# Waits must end this long before the invocation's deadline, leaving time to respond
+DEADLINE_RESERVE_SECONDS = 5
+
+# Reasons Google APIs give for quota errors sent with status 403
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded')
+
+# API name -> RateLimiter, kept for the container's lifetime
+_limiters = {}
+
+# Wall-clock time at which the current invocation times out, if known
+_deadline = None
+
+
+class RateLimitTimeout(Exception):
+    """Raised when waiting for the rate limit would outlast the invocation."""
+
+
+def set_deadline(context: Any) -> None:
+    """
+    Remember when the current invocation times out.
+
+    Args:
+        context: Lambda context object; without get_remaining_time_in_millis
+            waits are not limited
+    """
+    global _deadline
+    remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+    remaining_ms = remaining_ms() if callable(remaining_ms) else None
+    _deadline = time.time() + remaining_ms / 1000.0 if isinstance(remaining_ms, (int, float)) else None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at a steady rate.
+
+    Args:
+        rate_per_minute: Tokens added per minute
+        capacity: Maximum tokens held (burst size)
+        clock: Monotonic clock in seconds
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def take(self, tokens: float = 1) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            float: 0 if taken, otherwise seconds until enough tokens are available
+        """
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+class LocalCounterStore:
+    """
+    Shared request counters backed by a local directory.
+
+    Each API has a JSON file holding the current window and its count,
+    updated under an exclusive file lock.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def take(self, name: str, window: int, amount: int, limit: int) -> bool:
+        """
+        Add amount to the counter of a window unless that would exceed limit.
+
+        Returns:
+            bool: True if counted, False if the window is full
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, f"{name}.json")
+        with open(path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                counter = json.loads(content) if content else {}
+                count = counter.get('count', 0) if counter.get('window') == window else 0
+                if count + amount > limit:
+                    return False
+                f.seek(0)
+                f.truncate()
+                json.dump({'window': window, 'count': count + amount}, f)
+                return True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class DynamoDbCounterStore:
+    """
+    Shared request counters backed by a DynamoDB table.
+
+    The table has the string partition key ``counterKey``; items expire
+    through the ``expiresAt`` TTL attribute.
+    """
+
+    def __init__(self, table: str, client=None):
+        if client is None:
+            if not BOTO3_AVAILABLE:
+                raise ImportError("boto3 is required for DynamoDB counter stores")
+            client = boto3.client('dynamodb')
+        self.table = table
+        self.client = client
+
+    def take(self, name: str, window: int, amount: int, limit: int) -> bool:
+        """
+        Add amount to the counter of a window unless that would exceed limit.
+
+        Returns:
+            bool: True if counted, False if the window is full
+        """
+        try:
+            self.client.update_item(
+                TableName=self.table,
+                Key={'counterKey': {'S': f"{name}#{window}"}},
+                UpdateExpression='ADD #count :amount SET #expires = :expires',
+                ConditionExpression='attribute_not_exists(#count) OR #count <= :remaining',
+                ExpressionAttributeNames={'#count': 'requestCount', '#expires': 'expiresAt'},
+                ExpressionAttributeValues={
+                    ':amount': {'N': str(amount)},
+                    ':remaining': {'N': str(limit - amount)},
+                    ':expires': {'N': str((window + 2) * WINDOW_SECONDS)}
+                }
+            )
+            return True
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+
+def get_counter_store(location: str):
+    """
+    Create a counter store for the given location.
+
+    Args:
+        location: dynamodb://<table> or a local directory path
+
+    Returns:
+        LocalCounterStore or DynamoDbCounterStore
+    """
+    if not location:
+        raise ValueError("Counter store location not specified")
+
+    if location.startswith('dynamodb://'):
+        return DynamoDbCounterStore(location[len('dynamodb://'):])
+
+    return LocalCounterStore(location)
+
+
+class RateLimiter:
+    """
+    Rate limiter of one API: a local token bucket and an optional shared counter.
+
+    Args:
+        name: API name (e.g. 'sheets')
+        rate_per_minute: Allowed requests per minute, or None for no limit
+        store: Optional shared counter store
+        clock: Wall clock in seconds (default time.time)
+        sleep: Function used to wait (default time.sleep)
+    """
+
+    def __init__(self, name: str, rate_per_minute: Optional[float] = None, store=None,
+                 clock: Optional[Callable[[], float]] = None, sleep: Optional[Callable[[float], None]] = None):
+        self.name = name
+        self.rate = rate_per_minute
+        self.store = store
+        self.clock = clock or time.time
+        self.sleep = sleep or time.sleep
+        self.bucket = TokenBucket(rate_per_minute, max(1.0, rate_per_minute * BURST_SECONDS / 60.0),
+                                  self.clock) if rate_per_minute else None
+        self.paused_until = 0.0
+
+    def acquire(self, tokens: int = 1) -> None:
+        """
+        Wait until tokens requests may be sent.
+
+        Requests larger than the burst size (e.g. a large batch) are
+        admitted in burst-sized parts, so they wait but always get through.
+        """
+        remaining = tokens
+        while remaining > 0:
+            part = remaining
+            if self.bucket is not None:
+                part = min(part, max(1, int(self.bucket.capacity)))
+            self._acquire(part)
+            remaining -= part
+
+    def _acquire(self, tokens: int) -> None:
+        while True:
+            wait = max(0.0, self.paused_until - self.clock())
+            if not wait and self.bucket is not None:
+                wait = self.bucket.take(tokens)
+            if not wait:
+                break
+            self._wait(wait)
+
+        if self.store is None or not self.rate:
+            return
+        while True:
+            now = self.clock()
+            window = int(now // WINDOW_SECONDS)
+            if self.store.take(self.name, window, tokens, max(tokens, int(self.rate))):
+                return
+            # Jitter spreads the containers waiting for the next window
+            wait = (window + 1) * WINDOW_SECONDS - now + random.uniform(0, BACKOFF_BASE_SECONDS)
+            logger.info(f"{self.name} quota of this minute is used up, waiting {wait:.1f}s")
+            self._wait(wait)
+
+    def _wait(self, seconds: float) -> None:
+        if _deadline is not None and self.clock() + seconds > _deadline - DEADLINE_RESERVE_SECONDS:
+            raise RateLimitTimeout(f"{self.name} rate limit wait of {seconds:.1f}s exceeds the remaining time")
+        self.sleep(seconds)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request of this container for the given time."""
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+def _rate_limits() -> Dict[str, float]:
+    limits = {}
+    for entry in (os.environ.get(RATE_LIMITS_ENV) or '').split(','):
+        if '=' in entry:
+            name, rate = entry.split('=', 1)
+            limits[name.strip()] = float(rate)
+    return limits
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """Return the container's rate limiter of an API, created from the environment."""
+    if name not in _limiters:
+        location = os.environ.get(RATE_STORE_ENV)
+        _limiters[name] = RateLimiter(
+            name, _rate_limits().get(name), get_counter_store(location) if location else None
+        )
+    return _limiters[name]
+
+
+def _status(error: Exception) -> Optional[int]:
+    # googleapiclient HttpError has resp.status, urllib HTTPError has code
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return int(status) if status is not None else getattr(error, 'code', None)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Return True for errors rejecting a request because of a rate or quota limit."""
+    status = _status(error)
+    if status == 429:
+        return True
+    if status == 403:
+        content = getattr(error, 'content', b'') or b''
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', 'replace')
+        return any(reason in content for reason in RATE_LIMIT_REASONS)
+    return False
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Return the delay requested by the Retry-After header of an error, if any."""
+    headers = getattr(error, 'resp', None) or getattr(error, 'headers', None)
+    if headers is None:
+        return None
+    value = headers.get('retry-after') or headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Return the delay before retry number attempt (starting at 0).
+
+    A Retry-After delay is honoured with a little jitter added; otherwise
+    the delay is drawn from an exponential backoff with full jitter.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, BACKOFF_BASE_SECONDS)
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def call_with_retries(name: str, func: Callable[[], Any], tokens: int = 1) -> Any:
+    """
+    Call an API within its rate limit, retrying calls rejected by a rate limit.
+
+    Args:
+        name: API name ('sheets', 'drive' or 'search')
+        func: Callable sending the request
+        tokens: Number of requests the call sends (e.g. the size of a batch)
+
+    Returns:
+        Return value of func
+    """
+    limiter = get_rate_limiter(name)
+    max_retries = int(os.environ.get(MAX_RETRIES_ENV, DEFAULT_MAX_RETRIES))
+    attempt = 0
+    while True:
+        limiter.acquire(tokens)
+        try:
+            return func()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, retry_after_seconds(e))
+            logger.warning(f"{name} API rate limit hit, retrying in {delay:.1f}s: {str(e)}")
+            limiter.pause(delay)
+            attempt += 1
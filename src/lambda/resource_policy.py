@@ -0,0 +1,214 @@
+"""
+Request interception policy for browser captures.
+
+Blocks resources that don't affect screenshots (ads, trackers, web fonts,
+media, third-party scripts) by resource type or URL pattern, with
+per-domain overrides, and counts what was blocked and loaded.
+"""
+import asyncio
+import fnmatch
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_BLOCKED_TYPES = ('font', 'media')
+
+# Common ad and tracking hosts (fnmatch patterns against the full request URL)
+DEFAULT_BLOCKED_PATTERNS = (
+    '*://*.doubleclick.net/*',
+    '*://*.googlesyndication.com/*',
+    '*://*.google-analytics.com/*',
+    '*://*.googletagmanager.com/*',
+    '*://*.googleadservices.com/*',
+    '*://*.amazon-adsystem.com/*',
+    '*://*.facebook.net/*',
+    '*://*.scorecardresearch.com/*',
+    '*://*.hotjar.com/*',
+    '*://*.criteo.com/*'
+)
+
+
+# Public suffixes of two labels, under which each registered domain is its own
+# site (a small built-in subset of the Public Suffix List)
+MULTI_LABEL_SUFFIXES = frozenset((
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp', 'ed.jp', 'gr.jp', 'lg.jp', 'ad.jp',
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'ltd.uk', 'plc.uk', 'me.uk', 'net.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au',
+    'co.nz', 'co.kr', 'or.kr', 'co.in', 'com.cn', 'com.tw', 'com.hk', 'com.sg', 'com.br'
+))
+
+
+def _host(url: str) -> str:
+    try:
+        return (urlparse(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+def _site(host: str) -> str:
+    """Return the registered domain of a host (example.com, example.co.jp)."""
+    labels = host.split('.')
+    length = 3 if '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 2
+    return '.'.join(labels[-length:])
+
+
+def _same_site(host_a: str, host_b: str) -> bool:
+    """Treat hosts with the same registered domain as the same site."""
+    return _site(host_a) == _site(host_b)
+
+
+class ResourcePolicy:
+    """
+    Decides which subresource requests a capture should load.
+
+    Args:
+        blocked_types: Resource types to block (e.g. 'font', 'media', 'image')
+        blocked_patterns: fnmatch patterns matched against request URLs
+        allowed_patterns: Patterns that are never blocked (checked first)
+        block_third_party_scripts: Block scripts from other sites than the page
+        domain_overrides: Page domain -> dict of settings replacing the above
+    """
+
+    def __init__(self, blocked_types: Iterable[str] = (), blocked_patterns: Iterable[str] = (),
+                 allowed_patterns: Iterable[str] = (), block_third_party_scripts: bool = False,
+                 domain_overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.blocked_types = set(blocked_types)
+        self.blocked_patterns = tuple(blocked_patterns)
+        self.allowed_patterns = tuple(allowed_patterns)
+        self.block_third_party_scripts = block_third_party_scripts
+        self.domain_overrides = {domain.lower(): override for domain, override in (domain_overrides or {}).items()}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build a policy from event or environment configuration.
+
+        Args:
+            config: 'default' for the built-in policy, or a dict with
+                blockedTypes, blockedPatterns, allowedPatterns,
+                blockThirdPartyScripts and domainOverrides
+
+        Returns:
+            ResourcePolicy
+        """
+        if config == 'default':
+            return cls(DEFAULT_BLOCKED_TYPES, DEFAULT_BLOCKED_PATTERNS, block_third_party_scripts=True)
+
+        return cls(
+            blocked_types=config.get('blockedTypes', ()),
+            blocked_patterns=config.get('blockedPatterns', ()),
+            allowed_patterns=config.get('allowedPatterns', ()),
+            block_third_party_scripts=config.get('blockThirdPartyScripts', False),
+            domain_overrides=config.get('domainOverrides')
+        )
+
+    def for_page(self, page_url: str) -> 'ResourcePolicy':
+        """
+        Return the policy with the override for the page's domain applied.
+
+        An override for 'example.com' also applies to its subdomains.
+        """
+        host = _host(page_url)
+        for domain, override in self.domain_overrides.items():
+            if host == domain or host.endswith('.' + domain):
+                return ResourcePolicy(
+                    blocked_types=override.get('blockedTypes', self.blocked_types),
+                    blocked_patterns=override.get('blockedPatterns', self.blocked_patterns),
+                    allowed_patterns=override.get('allowedPatterns', self.allowed_patterns),
+                    block_third_party_scripts=override.get('blockThirdPartyScripts', self.block_third_party_scripts)
+                )
+        return self
+
+    def block_reason(self, request_url: str, resource_type: str, page_url: str) -> Optional[str]:
+        """
+        Decide whether a request should be blocked.
+
+        Args:
+            request_url: URL of the subresource
+            resource_type: Browser resource type (document, script, image, font, ...)
+            page_url: URL of the page being captured
+
+        Returns:
+            str: Reason for blocking ('type', 'pattern', 'third-party-script'), or None to allow
+        """
+        if resource_type == 'document':
+            return None
+        if any(fnmatch.fnmatch(request_url, pattern) for pattern in self.allowed_patterns):
+            return None
+        if resource_type in self.blocked_types:
+            return 'type'
+        if any(fnmatch.fnmatch(request_url, pattern) for pattern in self.blocked_patterns):
+            return 'pattern'
+        if (self.block_third_party_scripts and resource_type == 'script'
+                and not _same_site(_host(request_url), _host(page_url))):
+            return 'third-party-script'
+        return None
+
+
+class ResourceStats:
+    """
+    Per-capture counts of blocked and loaded resources.
+
+    Blocked requests are aborted before they are sent, so only their count
+    is known; loaded bytes come from response Content-Length headers.
+    """
+
+    def __init__(self):
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+        self.blocked_requests = 0
+        self.blocked_by_type = Counter()
+        self.blocked_by_reason = Counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'allowedRequests': self.allowed_requests,
+            'allowedBytes': self.allowed_bytes,
+            'blockedRequests': self.blocked_requests,
+            'blockedByType': dict(self.blocked_by_type),
+            'blockedByReason': dict(self.blocked_by_reason)
+        }
+
+
+async def install_resource_policy(page, policy: ResourcePolicy, page_url: str) -> ResourceStats:
+    """
+    Enable request interception on a page and apply the policy.
+
+    Must be called before navigation.
+
+    Args:
+        page: pyppeteer Page
+        policy: Policy to apply
+        page_url: URL about to be loaded (selects the domain override)
+
+    Returns:
+        ResourceStats: Updated as the page loads
+    """
+    policy = policy.for_page(page_url)
+    stats = ResourceStats()
+
+    def on_request(request):
+        reason = policy.block_reason(request.url, request.resourceType, page_url)
+        if reason:
+            stats.blocked_requests += 1
+            stats.blocked_by_type[request.resourceType] += 1
+            stats.blocked_by_reason[reason] += 1
+            asyncio.ensure_future(request.abort('blockedbyclient'))
+        else:
+            stats.allowed_requests += 1
+            asyncio.ensure_future(request.continue_())
+
+    def on_response(response):
+        length = (response.headers or {}).get('content-length', '')
+        if length.isdigit():
+            stats.allowed_bytes += int(length)
+
+    await page.setRequestInterception(True)
+    page.on('request', on_request)
+    page.on('response', on_response)
+    return stats
@@ -1,14 +1,51 @@
 """
 Lambda function to handle final results and save/format output.
 """
+import gzip
+import io
 import json
 import logging
+import os
+import uuid
 from datetime import datetime
 
+from object_store import get_object_store
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Optional archive encoders - used when packaged in the Lambda layer
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pyarrow = None
+    PYARROW_AVAILABLE = False
+
+# Archive location (s3://bucket/prefix or local directory); archiving is off when unset
+ARCHIVE_LOCATION_ENV = 'RESULTS_ARCHIVE_LOCATION'
+ARCHIVE_FORMAT_ENV = 'RESULTS_ARCHIVE_FORMAT'
+
+ARCHIVE_FORMATS = ('parquet', 'ndjson.zst', 'ndjson.gz')
+
+_ARCHIVE_CONTENT_TYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'ndjson.zst': 'application/zstd',
+    'ndjson.gz': 'application/gzip'
+}
+
+# Fixed column order so every part file has the same schema
+_ARCHIVE_COLUMNS = ('title', 'url', 'content', 'timestamp', 'relevanceScore', 'wordCount', 'processedAt')
+
 
 def lambda_handler(event, context):
     """
@@ -60,11 +97,21 @@ def lambda_handler(event, context):
             }
         }
         
-        # In a real implementation, this is where you might:
-        # - Save results to a database
-        # - Send results to an S3 bucket
-        # - Send notifications via SNS
-        # - Update a dashboard
+        # Archive every processed item (not just the top 10) when configured
+        archive_location = event.get('archiveLocation') or os.environ.get(ARCHIVE_LOCATION_ENV)
+        if archive_location:
+            try:
+                final_results['metadata']['archive'] = archive_processed_items(
+                    search_word,
+                    processed_data,
+                    archive_location,
+                    archive_format=event.get('archiveFormat') or os.environ.get(ARCHIVE_FORMAT_ENV, 'auto'),
+                    processed_at=final_results['processedAt']
+                )
+            except Exception as archive_error:
+                # The archive is a secondary output; don't fail the run because of it
+                logger.error(f"Failed to archive results: {str(archive_error)}")
+                final_results['metadata']['archive'] = None
         
         logger.info(f"Successfully handled results: {item_count} items processed")
         
@@ -122,4 +169,134 @@ def _get_top_relevance_score(processed_data):
     if not processed_data:
         return 0.0
     
-    return max(item.get('relevanceScore', 0) for item in processed_data)
\ No newline at end of file
+    return max(item.get('relevanceScore', 0) for item in processed_data)
+
+
+def archive_processed_items(search_word, processed_data, location, archive_format='auto',
+                            processed_at=None, run_id=None):
+    """
+    Write processed items as a compressed file into a day-partitioned archive.
+    
+    Each run writes its own part file under ``dt=YYYY-MM-DD/``, so appending
+    a run never rewrites earlier data and works the same on S3 and local disk.
+    
+    Args:
+        search_word: Search word the items belong to
+        processed_data: List of processed items
+        location: Archive root (s3://bucket/prefix or local directory)
+        archive_format: 'parquet', 'ndjson.zst', 'ndjson.gz' or 'auto'
+        processed_at: ISO timestamp of the run (defaults to now)
+        run_id: Identifier used in the part file name (defaults to a UUID)
+    
+    Returns:
+        dict: Archive information (location, format, partition, record count)
+    """
+    archive_format = _resolve_archive_format(archive_format)
+    processed_at = processed_at or datetime.utcnow().isoformat() + 'Z'
+    run_id = run_id or uuid.uuid4().hex
+    
+    rows = [_archive_row(search_word, processed_at, item) for item in processed_data]
+    
+    if archive_format == 'parquet':
+        data = _encode_parquet(rows)
+    else:
+        data = _encode_ndjson(rows, archive_format)
+    
+    partition = f"dt={processed_at[:10]}"
+    timestamp = processed_at.replace('-', '').replace(':', '').split('.')[0].rstrip('Z')
+    key = f"{partition}/part-{timestamp}-{run_id}.{archive_format}"
+    
+    store = get_object_store(location)
+    archive_uri = store.put(key, data, content_type=_ARCHIVE_CONTENT_TYPES[archive_format])
+    
+    logger.info(f"Archived {len(rows)} items to {archive_uri} ({len(data)} bytes)")
+    
+    return {
+        'location': archive_uri,
+        'format': archive_format,
+        'partition': partition,
+        'recordCount': len(rows),
+        'sizeBytes': len(data)
+    }
+
+
+def _resolve_archive_format(archive_format):
+    """
+    Resolve the requested archive format against the installed encoders.
+    
+    Args:
+        archive_format: Requested format or 'auto'
+    
+    Returns:
+        str: Archive format to use
+    """
+    if archive_format == 'auto':
+        if PYARROW_AVAILABLE:
+            return 'parquet'
+        if ZSTD_AVAILABLE:
+            return 'ndjson.zst'
+        return 'ndjson.gz'
+    
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unsupported archive format: {archive_format}")
+    if archive_format == 'parquet' and not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for parquet archives")
+    if archive_format == 'ndjson.zst' and not ZSTD_AVAILABLE:
+        raise ImportError("zstandard is required for zstd archives")
+    
+    return archive_format
+
+
+def _archive_row(search_word, run_processed_at, item):
+    """
+    Build a flat archive row from a processed item.
+    
+    Args:
+        search_word: Search word of the run
+        run_processed_at: ISO timestamp of the run
+        item: Processed item
+    
+    Returns:
+        dict: Archive row
+    """
+    row = {'searchWord': search_word, 'runProcessedAt': run_processed_at}
+    for column in _ARCHIVE_COLUMNS:
+        row[column] = item.get(column)
+    return row
+
+
+def _encode_ndjson(rows, archive_format):
+    """
+    Encode rows as compressed newline-delimited JSON.
+    
+    Args:
+        rows: List of archive rows
+        archive_format: 'ndjson.zst' or 'ndjson.gz'
+    
+    Returns:
+        bytes: Compressed NDJSON
+    """
+    payload = ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
+    
+    if archive_format == 'ndjson.zst':
+        return zstandard.ZstdCompressor(level=10).compress(payload)
+    
+    # mtime=0 keeps the output deterministic for identical input
+    return gzip.compress(payload, compresslevel=6, mtime=0)
+
+
+def _encode_parquet(rows):
+    """
+    Encode rows as a zstd-compressed Parquet file.
+    
+    Args:
+        rows: List of archive rows
+    
+    Returns:
+        bytes: Parquet file contents
+    """
+    columns = ('searchWord', 'runProcessedAt') + _ARCHIVE_COLUMNS
+    table = pyarrow.table({column: [row[column] for row in rows] for column in columns})
+    buffer = io.BytesIO()
+    pyarrow.parquet.write_table(table, buffer, compression='zstd')
+    return buffer.getvalue()
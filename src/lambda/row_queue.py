@@ -0,0 +1,194 @@
+"""
+Message queues for write-behind sheet recording.
+
+Locations are either an SQS queue URL (``https://sqs.<region>.amazonaws.com/...``,
+requires boto3) or a local directory path, which acts as a stand-in for SQS
+in tests and local runs. Messages are JSON-serializable dicts.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# boto3 is provided by the Lambda runtime but is optional for local runs
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    boto3 = None
+    BOTO3_AVAILABLE = False
+
+# SQS sends, receives and deletes at most 10 messages per call
+SQS_BATCH_LIMIT = 10
+
+# Seconds a received message stays hidden before it can be received again
+DEFAULT_VISIBILITY_TIMEOUT = 30
+
+
+class LocalQueue:
+    """
+    Queue backed by a local directory.
+
+    Each message is a JSON file. Receiving moves it to ``inflight/`` until it
+    is deleted; messages left there longer than the visibility timeout are
+    received again, like SQS.
+    """
+
+    def __init__(self, root: str, visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT):
+        self.root = root
+        self.inflight = os.path.join(root, 'inflight')
+        self.visibility_timeout = visibility_timeout
+
+    def send(self, messages: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add messages to the queue.
+
+        Returns:
+            int: Number of messages sent
+        """
+        os.makedirs(self.root, exist_ok=True)
+        count = 0
+        for message in messages:
+            name = f"{time.time_ns():020d}-{uuid.uuid4().hex}.json"
+            partial_path = os.path.join(self.root, name + '.partial')
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                json.dump(message, f)
+            os.replace(partial_path, os.path.join(self.root, name))
+            count += 1
+        return count
+
+    def receive(self, max_messages: int = SQS_BATCH_LIMIT) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Receive up to max_messages messages, hiding them from other receivers.
+
+        Returns:
+            list: (receipt, message) tuples
+        """
+        self._restore_expired()
+        if not os.path.isdir(self.root):
+            return []
+        os.makedirs(self.inflight, exist_ok=True)
+
+        received = []
+        for name in sorted(os.listdir(self.root)):
+            if len(received) >= max_messages:
+                break
+            if not name.endswith('.json'):
+                continue
+            receipt = os.path.join(self.inflight, name)
+            try:
+                os.replace(os.path.join(self.root, name), receipt)
+            except FileNotFoundError:
+                # Received by a concurrent consumer
+                continue
+            os.utime(receipt)
+            with open(receipt, encoding='utf-8') as f:
+                received.append((receipt, json.load(f)))
+        return received
+
+    def delete(self, receipts: Iterable[str]) -> None:
+        """Delete received messages."""
+        for receipt in receipts:
+            try:
+                os.remove(receipt)
+            except FileNotFoundError:
+                pass
+
+    def _restore_expired(self):
+        if not os.path.isdir(self.inflight):
+            return
+        expires = time.time() - self.visibility_timeout
+        for name in os.listdir(self.inflight):
+            path = os.path.join(self.inflight, name)
+            try:
+                if os.path.getmtime(path) < expires:
+                    os.replace(path, os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+
+class SqsQueue:
+    """
+    Queue backed by an SQS queue.
+    """
+
+    def __init__(self, queue_url: str, client=None):
+        if client is None:
+            if not BOTO3_AVAILABLE:
+                raise ImportError("boto3 is required for SQS queues")
+            client = boto3.client('sqs')
+        self.queue_url = queue_url
+        self.client = client
+
+    def send(self, messages: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add messages to the queue, up to 10 per SendMessageBatch call.
+
+        Returns:
+            int: Number of messages sent
+        """
+        messages = list(messages)
+        for start in range(0, len(messages), SQS_BATCH_LIMIT):
+            chunk = messages[start:start + SQS_BATCH_LIMIT]
+            response = self.client.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {'Id': str(index), 'MessageBody': json.dumps(message)}
+                    for index, message in enumerate(chunk)
+                ]
+            )
+            if response.get('Failed'):
+                raise RuntimeError(f"Failed to send {len(response['Failed'])} messages to {self.queue_url}")
+        return len(messages)
+
+    def receive(self, max_messages: int = SQS_BATCH_LIMIT) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Receive up to max_messages (at most 10) messages without waiting.
+
+        Returns:
+            list: (receipt handle, message) tuples
+        """
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, SQS_BATCH_LIMIT),
+            WaitTimeSeconds=0
+        )
+        return [
+            (message['ReceiptHandle'], json.loads(message['Body']))
+            for message in response.get('Messages', [])
+        ]
+
+    def delete(self, receipts: Iterable[str]) -> None:
+        """Delete received messages, up to 10 per DeleteMessageBatch call."""
+        receipts = list(receipts)
+        for start in range(0, len(receipts), SQS_BATCH_LIMIT):
+            chunk = receipts[start:start + SQS_BATCH_LIMIT]
+            self.client.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(index), 'ReceiptHandle': receipt} for index, receipt in enumerate(chunk)]
+            )
+
+
+def get_queue(location: str):
+    """
+    Create a queue for the given location.
+
+    Args:
+        location: SQS queue URL or a local directory path
+
+    Returns:
+        LocalQueue or SqsQueue
+    """
+    if not location:
+        raise ValueError("Queue location not specified")
+
+    if location.startswith('https://'):
+        return SqsQueue(location)
+
+    return LocalQueue(location)
@@ -0,0 +1,135 @@
+"""
+Scratch space manager for files written to /tmp.
+
+Warm Lambda containers keep /tmp between invocations, so every artifact a
+capture writes is tracked here: artifacts are deleted once the invocation
+has handed them off, and the least recently used ones are evicted when the
+tracked total exceeds a size budget (e.g. files left by failed captures).
+"""
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SCRATCH_DIR_ENV = 'SCRATCH_DIR'
+SCRATCH_BUDGET_ENV = 'SCRATCH_BUDGET_MB'
+DEFAULT_SCRATCH_DIR = '/tmp'
+# Half of the default 512 MB ephemeral storage, leaving room for the browser profile
+DEFAULT_SCRATCH_BUDGET_MB = 256
+
+
+class ScratchSpace:
+    """
+    Tracks artifact files and keeps their total size under a budget.
+
+    Args:
+        root: Directory artifacts are written to
+        budget_bytes: Maximum total size of tracked artifacts
+    """
+
+    def __init__(self, root: str = DEFAULT_SCRATCH_DIR, budget_bytes: int = DEFAULT_SCRATCH_BUDGET_MB * 1024 * 1024):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()
+        self.peak_bytes = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+
+    def path(self, filename: str) -> str:
+        """Return the path for a new artifact in the scratch directory."""
+        return os.path.join(self.root, filename)
+
+    @property
+    def tracked_bytes(self) -> int:
+        return sum(self._entries.values())
+
+    def track(self, *paths: Optional[str]):
+        """
+        Record artifacts (or refresh their size and recency).
+
+        Missing paths are ignored. Older artifacts are evicted if the budget
+        is exceeded; the artifacts just tracked are never evicted here.
+        """
+        for path in paths:
+            if not path or not os.path.exists(path):
+                continue
+            self._entries[path] = os.path.getsize(path)
+            self._entries.move_to_end(path)
+
+        tracked_bytes = self.tracked_bytes
+        self.peak_bytes = max(self.peak_bytes, tracked_bytes)
+        if tracked_bytes > self.budget_bytes:
+            self._evict(protected=set(paths))
+
+    def _evict(self, protected):
+        for path in list(self._entries):
+            if self.tracked_bytes <= self.budget_bytes:
+                break
+            if path in protected:
+                continue
+            size = self._entries.pop(path)
+            self._remove(path)
+            self.evicted_files += 1
+            self.evicted_bytes += size
+            logger.info(f"Evicted scratch file {path} ({size} bytes)")
+
+    def release(self, paths: Iterable[Optional[str]]):
+        """Delete artifacts that are no longer needed."""
+        for path in paths:
+            if not path:
+                continue
+            self._entries.pop(path, None)
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove scratch file {path}: {str(e)}")
+
+    def usage(self) -> Dict[str, Any]:
+        """
+        Report scratch usage for sizing ephemeral storage.
+
+        Returns:
+            dict: trackedFiles, trackedBytes, peakBytes, budgetBytes,
+                evictedFiles, evictedBytes and the directory's freeBytes
+        """
+        try:
+            free_bytes = shutil.disk_usage(self.root).free
+        except OSError:
+            free_bytes = None
+        return {
+            'trackedFiles': len(self._entries),
+            'trackedBytes': self.tracked_bytes,
+            'peakBytes': self.peak_bytes,
+            'budgetBytes': self.budget_bytes,
+            'evictedFiles': self.evicted_files,
+            'evictedBytes': self.evicted_bytes,
+            'freeBytes': free_bytes
+        }
+
+
+_scratch_space = None
+
+
+def get_scratch_space() -> ScratchSpace:
+    """
+    Return the container-wide scratch space, creating it on first use.
+    """
+    global _scratch_space
+    if _scratch_space is None:
+        budget_mb = int(os.environ.get(SCRATCH_BUDGET_ENV, DEFAULT_SCRATCH_BUDGET_MB))
+        _scratch_space = ScratchSpace(
+            root=os.environ.get(SCRATCH_DIR_ENV, DEFAULT_SCRATCH_DIR),
+            budget_bytes=budget_mb * 1024 * 1024
+        )
+    return _scratch_space
@@ -0,0 +1,122 @@
+"""
+Index of the sheet shards a recording range has rolled over to.
+
+sheets_url_recorder moves writes to a new tab or spreadsheet when a sheet
+reaches its row threshold or a new date partition starts. The index keeps,
+per original spreadsheet and range, the list of shards with the dates of
+the rows they hold, so readers know where to look for a date range.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from object_store import get_object_store
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Index location (s3://bucket/prefix or local directory); shards are tracked per container when unset
+SHARD_INDEX_LOCATION_ENV = 'SHEETS_SHARD_INDEX_LOCATION'
+
+
+def _index_key(spreadsheet_id: str, sheet_range: str) -> str:
+    digest = hashlib.sha256(f"{spreadsheet_id}|{sheet_range}".encode('utf-8')).hexdigest()
+    return f"shards/{digest}.json"
+
+
+def load_shard_index(location: str, spreadsheet_id: str, sheet_range: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the shard index of a recording range.
+
+    Args:
+        location: Index location
+        spreadsheet_id: Original spreadsheet ID
+        sheet_range: Original range in A1 notation
+
+    Returns:
+        dict: Index (spreadsheetId, sheetRange, shards, updatedAt) or None
+    """
+    data = get_object_store(location).get(_index_key(spreadsheet_id, sheet_range))
+    return json.loads(data.decode('utf-8')) if data else None
+
+
+def save_shard_index(location: str, spreadsheet_id: str, sheet_range: str,
+                     shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Store the shard list of a recording range.
+
+    Each shard has spreadsheetId, sheetRange, partition, sequence,
+    firstTimestamp, lastTimestamp and, once closed, rowCount.
+
+    Returns:
+        dict: Stored index
+    """
+    index = {
+        'spreadsheetId': spreadsheet_id,
+        'sheetRange': sheet_range,
+        'shards': shards,
+        'updatedAt': datetime.utcnow().isoformat() + 'Z'
+    }
+    get_object_store(location).put(
+        _index_key(spreadsheet_id, sheet_range),
+        json.dumps(index).encode('utf-8'),
+        content_type='application/json'
+    )
+    return index
+
+
+def merge_shards(shards: List[Dict[str, Any]], stored_shards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge shards stored by other containers into a shard list, in place.
+
+    Shards are matched by partition and sequence. Unknown shards are added,
+    and known ones take the stored rowCount and the later lastTimestamp.
+    The list is then ordered by partition and sequence.
+
+    Returns:
+        list: The merged shard list
+    """
+    by_key = {(shard['partition'], shard['sequence']): shard for shard in shards}
+    for stored in stored_shards:
+        shard = by_key.get((stored.get('partition'), stored.get('sequence')))
+        if shard is None:
+            shards.append(dict(stored))
+            continue
+        if 'rowCount' in stored:
+            shard['rowCount'] = max(shard.get('rowCount', 0), stored['rowCount'])
+        if stored.get('lastTimestamp') and (not shard.get('lastTimestamp')
+                                            or stored['lastTimestamp'] > shard['lastTimestamp']):
+            shard['lastTimestamp'] = stored['lastTimestamp']
+    shards.sort(key=lambda shard: (shard['partition'] or '', shard['sequence']))
+    return shards
+
+
+def find_shards(index: Dict[str, Any], start: str, end: str) -> List[Dict[str, Any]]:
+    """
+    Return the shards that may hold rows timestamped between start and end.
+
+    Open shards (without lastTimestamp) match any range from their first
+    timestamp on, limited to their date partition if they have one.
+
+    Args:
+        index: Index from load_shard_index
+        start: Earliest ISO 8601 timestamp (or date prefix) of interest
+        end: Latest ISO 8601 timestamp (or date prefix) of interest
+
+    Returns:
+        list: Matching shards in creation order
+    """
+    matches = []
+    for shard in index.get('shards', []):
+        first = shard.get('firstTimestamp') or ''
+        last = shard.get('lastTimestamp')
+        partition = shard.get('partition')
+        if partition and (partition < start[:len(partition)] or partition > end[:len(partition)]):
+            continue
+        # Open shards have no last timestamp yet
+        if first[:len(end)] <= end and (last is None or last[:len(start)] >= start):
+            matches.append(shard)
+    return matches
@@ -0,0 +1,189 @@
+"""
+Lambda function that drains the write-behind queue of sheets_url_recorder.
+
+Runs on a schedule: receives queued rows, sorts them into a deterministic
+order and writes each spreadsheet's rows with one Sheets call. When that
+call fails, the rows are written range by range so that one bad range
+(e.g. a deleted tab) does not hold back the others. Rows are deleted from
+the queue only after their write succeeded; failed rows become visible
+again and are retried by a later run (and end up in the dead-letter queue
+after repeated failures).
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, List, Tuple
+
+from rate_limiter import set_deadline
+from row_queue import SQS_BATCH_LIMIT, get_queue
+from sheets_url_recorder import WRITE_MODE_ENV, WRITE_MODES, WRITE_QUEUE_ENV, get_sheets_service, write_rows
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Maximum rows drained per run
+MAX_ROWS_ENV = 'SHEETS_AGGREGATOR_MAX_ROWS'
+DEFAULT_MAX_ROWS = 5000
+
+# Receiving stops when less than this much of the invocation time is left
+RESERVED_TIME_MS = 10000
+
+
+def drain_queue(queue, max_rows: int, context=None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Receive queued rows until the queue is empty, max_rows is reached or
+    the invocation is about to time out.
+
+    Returns:
+        list: (receipt, message) tuples
+    """
+    received = []
+    while len(received) < max_rows:
+        remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+        if remaining_ms and remaining_ms() < RESERVED_TIME_MS:
+            logger.info("Stopping receive to leave time for writing")
+            break
+        messages = queue.receive(min(SQS_BATCH_LIMIT, max_rows - len(received)))
+        if not messages:
+            break
+        received.extend(messages)
+    return received
+
+
+def _sort_key(message: Dict[str, Any]):
+    # Rows are written in capture order (timestamp, then URL) within each sheet
+    row = message['row']
+    return (message['spreadsheet_id'], message['sheet_range'], str(row[0]), str(row[1]) if len(row) > 1 else '')
+
+
+def flush_rows(service, received: List[Tuple[str, Dict[str, Any]]], mode: str = 'append') -> Dict[str, Any]:
+    """
+    Write received rows, one Sheets call per spreadsheet and write mode
+    (per sheet when upserting), falling back to one call per range when
+    that fails.
+
+    Args:
+        service: Google Sheets service object
+        received: (receipt, message) tuples from drain_queue
+        mode: Write mode of sheets_url_recorder.write_rows for rows queued
+            without their own write_mode
+
+    Returns:
+        dict: written receipts, failed row count and malformed receipts
+    """
+    malformed = []
+    by_target = {}
+    for receipt, message in received:
+        row_mode = message.get('write_mode') or mode
+        if (not message.get('spreadsheet_id') or not message.get('sheet_range') or not message.get('row')
+                or row_mode not in WRITE_MODES):
+            logger.warning(f"Dropping malformed queued row: {json.dumps(message)}")
+            malformed.append(receipt)
+            continue
+        by_target.setdefault((message['spreadsheet_id'], row_mode), []).append((receipt, message))
+
+    written = []
+    failed_count = 0
+    for spreadsheet_id, row_mode in sorted(by_target):
+        entries = sorted(by_target[(spreadsheet_id, row_mode)], key=lambda entry: _sort_key(entry[1]))
+        failed = _write_entries(service, spreadsheet_id, entries, row_mode, written)
+        ranges = sorted({message['sheet_range'] for _, message in failed})
+        if len(ranges) < 2:
+            failed_count += len(failed)
+            continue
+
+        logger.warning(f"Writing {len(ranges)} ranges of {spreadsheet_id} one by one")
+        for sheet_range in ranges:
+            range_entries = [entry for entry in failed if entry[1]['sheet_range'] == sheet_range]
+            failed_count += len(_write_entries(service, spreadsheet_id, range_entries, row_mode, written))
+
+    return {'written': written, 'failedCount': failed_count, 'malformed': malformed}
+
+
+def _write_entries(service, spreadsheet_id: str, entries: List[Tuple[str, Dict[str, Any]]], mode: str,
+                   written: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Write the rows of queued entries with one write_rows call.
+
+    Receipts of written rows are added to written.
+
+    Returns:
+        list: Entries whose rows were not written
+    """
+    rows_by_range = {}
+    for _, message in entries:
+        rows_by_range.setdefault(message['sheet_range'], []).append(message['row'])
+
+    counts = write_rows(service, spreadsheet_id, rows_by_range, mode)
+    if counts is None:
+        return entries
+    # Rows routed to shards that failed are the same objects as the queued rows
+    failed_ids = {id(row) for row in counts.get('failedRows', [])}
+    written.extend(receipt for receipt, message in entries if id(message['row']) not in failed_ids)
+    return [entry for entry in entries if id(entry[1]['row']) in failed_ids]
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler to flush queued sheet rows.
+
+    Args:
+        event: Optional writeQueue and maxRows overrides
+        context: Lambda context object
+
+    Returns:
+        dict: JSON response with written, failed and dropped row counts
+    """
+    set_deadline(context)
+    try:
+        queue_location = (event or {}).get('writeQueue') or os.environ.get(WRITE_QUEUE_ENV)
+        if not queue_location:
+            logger.warning("No write queue configured")
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'error': 'Write queue not configured',
+                    'success': False
+                })
+            }
+
+        # Check the service first so rows are not hidden from other runs for nothing
+        service = get_sheets_service()
+        if not service:
+            return {
+                'statusCode': 503,
+                'body': json.dumps({
+                    'error': 'Google Sheets service unavailable',
+                    'success': False
+                })
+            }
+
+        max_rows = int((event or {}).get('maxRows') or os.environ.get(MAX_ROWS_ENV, DEFAULT_MAX_ROWS))
+        queue = get_queue(queue_location)
+        received = drain_queue(queue, max_rows, context)
+        result = flush_rows(service, received, os.environ.get(WRITE_MODE_ENV, 'append'))
+        queue.delete(result['written'] + result['malformed'])
+
+        written_count = len(result['written'])
+        logger.info(f"Flushed {written_count} of {len(received)} queued rows "
+                    f"({result['failedCount']} failed, {len(result['malformed'])} malformed)")
+
+        summary = {
+            'writtenCount': written_count,
+            'failedCount': result['failedCount'],
+            'droppedCount': len(result['malformed']),
+            'success': result['failedCount'] == 0
+        }
+        return dict(summary, statusCode=200 if summary['success'] else 500,
+                    body=json.dumps(dict(summary, message='Queued rows flushed')))
+
+    except Exception as e:
+        logger.error(f"Error flushing queued rows: {str(e)}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'error': f'Internal server error: {str(e)}',
+                'success': False
+            })
+        }
@@ -4,7 +4,12 @@ Lambda function to record URLs to Google Sheets.
 import json
 import logging
 import os
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, List, Optional
+
+from rate_limiter import call_with_retries, set_deadline
+from row_queue import get_queue
+from shard_index import SHARD_INDEX_LOCATION_ENV, load_shard_index, merge_shards, save_shard_index
 
 # Configure logging
 logger = logging.getLogger()
@@ -18,6 +23,48 @@ except ImportError:
     logger.warning("Google APIs not available. Install google-api-python-client for full functionality.")
     GOOGLE_APIS_AVAILABLE = False
 
+# Columns written after the timestamp and URL when additional data is given
+ADDITIONAL_DATA_COLUMNS = ['filename', 'file_id', 'file_size', 'description']
+
+# Queue location (SQS queue URL or local directory); when set, rows are put
+# on the queue and written by sheets_row_aggregator instead of directly
+WRITE_QUEUE_ENV = 'SHEETS_WRITE_QUEUE'
+
+# 'append' adds every row; 'upsert' updates the row already holding the URL
+# and 'skip-existing' leaves it alone, so retries and repeat sweeps add no duplicates
+WRITE_MODE_ENV = 'SHEETS_WRITE_MODE'
+WRITE_MODES = ('append', 'upsert', 'skip-existing')
+
+# Optional cell (e.g. 'Meta!A1') whose value is changed to invalidate every
+# cached URL index, e.g. after rows were sorted or deleted by hand
+INDEX_VERSION_CELL_ENV = 'SHEETS_INDEX_VERSION_CELL'
+
+# Column holding the URL (B, after the timestamp)
+URL_COLUMN = 'B'
+
+# Sheet title -> numeric sheet ID per spreadsheet, kept for the container's lifetime
+_sheet_ids = {}
+
+# (spreadsheet ID, sheet title) -> UrlIndex, kept for the container's lifetime
+_url_indexes = {}
+
+# Rollover: writes move to a new shard once a sheet holds this many rows
+# (grid rows, which count towards the spreadsheet cell limit) ...
+ROLLOVER_ROWS_ENV = 'SHEETS_ROLLOVER_ROWS'
+# ... and/or when a new date partition starts ('day' or 'month')
+PARTITION_ENV = 'SHEETS_PARTITION'
+PARTITION_LENGTHS = {'day': len('2024-01-01'), 'month': len('2024-01')}
+# Shards are new tabs of the spreadsheet or new spreadsheets
+SHARD_TARGET_ENV = 'SHEETS_SHARD_TARGET'
+SHARD_TARGETS = ('tab', 'spreadsheet')
+
+# (spreadsheet ID, sheet title) -> row count, read once from the sheet's last
+# filled row and then advanced by this container's writes
+_sheet_row_counts = {}
+
+# (spreadsheet ID, original range) -> shard list, kept for the container's lifetime
+_shard_indexes = {}
+
 
 def get_sheets_service():
     """
@@ -43,13 +90,20 @@ def get_sheets_service():
             scopes=['https://www.googleapis.com/auth/spreadsheets']
         )
         
-        service = build('sheets', 'v4', credentials=credentials)
+        # Static discovery (the bundled document) is already the 2.x default and
+        # is pinned here explicitly; cache_discovery=False skips the unused file cache
+        service = build('sheets', 'v4', credentials=credentials, static_discovery=True, cache_discovery=False)
         return service
     except Exception as e:
         logger.error(f"Failed to create Google Sheets service: {str(e)}")
         return None
 
 
+def _execute(request):
+    """Execute a Sheets API request within the Sheets rate limit, retrying rate-limit errors."""
+    return call_with_retries('sheets', request.execute)
+
+
 def write_url_to_sheet(service, spreadsheet_id: str, sheet_range: str, url: str, additional_data: Optional[Dict] = None) -> bool:
     """
     Write URL and additional data to Google Sheets.
@@ -70,27 +124,19 @@ def write_url_to_sheet(service, spreadsheet_id: str, sheet_range: str, url: str,
     
     try:
         # Prepare the data row
-        import datetime
-        timestamp = datetime.datetime.utcnow().isoformat() + 'Z'
-        
-        row_data = [timestamp, url]
-        
-        # Add additional data if provided
-        if additional_data:
-            for key in ['filename', 'file_id', 'file_size', 'description']:
-                row_data.append(additional_data.get(key, ''))
+        row_data = build_row(url, additional_data)
         
         # Append the data to the sheet
         body = {
             'values': [row_data]
         }
         
-        result = service.spreadsheets().values().append(
+        result = _execute(service.spreadsheets().values().append(
             spreadsheetId=spreadsheet_id,
             range=sheet_range,
             valueInputOption='RAW',
             body=body
-        ).execute()
+        ))
         
         logger.info(f"Successfully wrote URL to sheet. Updated range: {result.get('updates', {}).get('updatedRange')}")
         return True
@@ -100,6 +146,625 @@ def write_url_to_sheet(service, spreadsheet_id: str, sheet_range: str, url: str,
         return False
 
 
+def build_row(url: str, additional_data: Optional[Dict] = None) -> List[Any]:
+    """
+    Build the sheet row for a URL: timestamp, URL and additional data columns.
+    
+    Args:
+        url: The URL to record
+        additional_data: Optional dictionary with additional data to record
+    
+    Returns:
+        list: Cell values of the row
+    """
+    import datetime
+    timestamp = datetime.datetime.utcnow().isoformat() + 'Z'
+    
+    row_data = [timestamp, url]
+    
+    # Add additional data if provided
+    if additional_data:
+        for key in ADDITIONAL_DATA_COLUMNS:
+            row_data.append(additional_data.get(key, ''))
+    return row_data
+
+
+def write_rows_to_sheet(service, spreadsheet_id: str, sheet_range: str, rows: List[List[Any]]) -> bool:
+    """
+    Append several rows to one sheet with a single values().append call.
+    
+    Args:
+        service: Google Sheets service object
+        spreadsheet_id: The ID of the target spreadsheet
+        sheet_range: The range in A1 notation (e.g., 'Sheet1!A:F')
+        rows: Rows built with build_row
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not service:
+        logger.error("Google Sheets service not available")
+        return False
+    
+    try:
+        result = _execute(service.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range=sheet_range,
+            valueInputOption='RAW',
+            body={'values': rows}
+        ))
+        
+        logger.info(f"Successfully wrote {len(rows)} rows to sheet. "
+                    f"Updated range: {result.get('updates', {}).get('updatedRange')}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Failed to write rows to sheet: {str(e)}")
+        return False
+
+
+def write_rows_to_sheets(service, spreadsheet_id: str, rows_by_range: Dict[str, List[List[Any]]]) -> bool:
+    """
+    Append rows to several sheets of a spreadsheet with one batchUpdate call.
+    
+    Each range's sheet receives an appendCells request; the sheet IDs are
+    looked up once per spreadsheet and cached, and looked up again when a
+    sheet is not in the cache.
+    
+    Args:
+        service: Google Sheets service object
+        spreadsheet_id: The ID of the target spreadsheet
+        rows_by_range: Range in A1 notation -> rows built with build_row
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not service:
+        logger.error("Google Sheets service not available")
+        return False
+    
+    try:
+        requests = []
+        for sheet_range, rows in rows_by_range.items():
+            requests.append({
+                'appendCells': {
+                    'sheetId': _sheet_id(service, spreadsheet_id, _sheet_title(sheet_range)),
+                    'rows': [{'values': [_cell(value) for value in row]} for row in rows],
+                    'fields': 'userEnteredValue'
+                }
+            })
+        
+        _execute(service.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={'requests': requests}
+        ))
+        
+        row_count = sum(len(rows) for rows in rows_by_range.values())
+        logger.info(f"Successfully wrote {row_count} rows to {len(requests)} sheets")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Failed to write rows to sheets: {str(e)}")
+        return False
+
+
+def _get_sheet_ids(service, spreadsheet_id: str) -> Dict[str, int]:
+    """Return the sheet title -> sheet ID map of a spreadsheet, cached per container."""
+    if spreadsheet_id not in _sheet_ids:
+        spreadsheet = _execute(service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields='sheets.properties(sheetId,title)'
+        ))
+        _sheet_ids[spreadsheet_id] = {
+            sheet['properties']['title']: sheet['properties']['sheetId']
+            for sheet in spreadsheet.get('sheets', [])
+        }
+    return _sheet_ids[spreadsheet_id]
+
+
+def _sheet_id(service, spreadsheet_id: str, title: str) -> int:
+    """
+    Return the ID of a sheet, reloading the cached sheet IDs once if the
+    title is unknown (the tab may have been added by hand or by another
+    container's rollover since they were cached).
+    
+    Raises:
+        ValueError: If the spreadsheet has no sheet with the title
+    """
+    sheet_ids = _get_sheet_ids(service, spreadsheet_id)
+    if title not in sheet_ids:
+        _sheet_ids.pop(spreadsheet_id, None)
+        sheet_ids = _get_sheet_ids(service, spreadsheet_id)
+    if title not in sheet_ids:
+        raise ValueError(f"Sheet not found: {title}")
+    return sheet_ids[title]
+
+
+def _sheet_title(sheet_range: str) -> str:
+    """Return the sheet title of an A1 range such as 'Sheet1!A:F' or "'My sheet'!A:F"."""
+    title = sheet_range.split('!', 1)[0]
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title
+
+
+def _cell(value: Any) -> Dict[str, Any]:
+    """Convert a value to CellData, keeping it as entered like valueInputOption RAW."""
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': '' if value is None else str(value)}}
+
+
+class UrlIndex:
+    """
+    URL -> row number map of one sheet.
+    
+    Args:
+        rows: URL -> 1-based row number
+        row_count: Number of rows the index was built from
+        version: Value of the version cell when the index was built
+    """
+    
+    def __init__(self, rows: Dict[str, int], row_count: int, version: Any = None):
+        self.rows = rows
+        self.row_count = row_count
+        self.version = version
+
+
+def _a1_title(title: str) -> str:
+    """Quote a sheet title for use in an A1 range."""
+    return "'" + title.replace("'", "''") + "'"
+
+
+def get_url_index(service, spreadsheet_id: str, title: str) -> UrlIndex:
+    """
+    Return the URL index of a sheet, reading the URL column only when needed.
+    
+    A cached index is reused while the sheet still ends where it did: the
+    last indexed row is filled and the row after it is empty (one small
+    read). It is also dropped when the optional version cell changes.
+    
+    Args:
+        service: Google Sheets service object
+        spreadsheet_id: The ID of the spreadsheet
+        title: Title of the sheet
+    
+    Returns:
+        UrlIndex
+    """
+    key = (spreadsheet_id, title)
+    index = _url_indexes.get(key)
+    
+    version_cell = os.environ.get(INDEX_VERSION_CELL_ENV)
+    version = None
+    if version_cell:
+        version = _read_values(service, spreadsheet_id, version_cell)
+    
+    if index is not None and index.version == version and _index_ends_at(service, spreadsheet_id, title, index):
+        return index
+    
+    column = _read_values(service, spreadsheet_id, f"{_a1_title(title)}!{URL_COLUMN}:{URL_COLUMN}", 'COLUMNS')
+    urls = column[0] if column else []
+    rows = {}
+    for row_number, url in enumerate(urls, start=1):
+        # The first row holding a URL wins, matching later updates to one row
+        if url and url not in rows:
+            rows[url] = row_number
+    
+    index = UrlIndex(rows, len(urls), version)
+    _url_indexes[key] = index
+    logger.info(f"Loaded URL index of {title}: {len(rows)} URLs in {len(urls)} rows")
+    return index
+
+
+def _index_ends_at(service, spreadsheet_id: str, title: str, index: UrlIndex) -> bool:
+    """Return True if the sheet still has exactly index.row_count rows."""
+    first = max(index.row_count, 1)
+    values = _read_values(service, spreadsheet_id, f"{_a1_title(title)}!A{first}:A{index.row_count + 1}")
+    filled = [bool(row and row[0] not in ('', None)) for row in values]
+    filled += [False] * (index.row_count + 2 - first - len(filled))
+    if index.row_count == 0:
+        return not filled[0]
+    return filled[0] and not filled[1]
+
+
+def _read_values(service, spreadsheet_id: str, value_range: str, major_dimension: str = 'ROWS') -> List[List[Any]]:
+    return _execute(service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=value_range,
+        majorDimension=major_dimension
+    )).get('values', [])
+
+
+def upsert_rows(service, spreadsheet_id: str, sheet_range: str, rows: List[List[Any]],
+                mode: str = 'upsert') -> Optional[Dict[str, int]]:
+    """
+    Write rows to a sheet without duplicating URLs already in it.
+    
+    Rows whose URL is in the sheet are updated in place ('upsert') or
+    skipped ('skip-existing'); the others are appended with one call.
+    Updates are sent with one values().batchUpdate call.
+    
+    Args:
+        service: Google Sheets service object
+        spreadsheet_id: The ID of the target spreadsheet
+        sheet_range: The range in A1 notation (e.g., 'Sheet1!A:F')
+        rows: Rows built with build_row
+        mode: 'upsert' or 'skip-existing'
+    
+    Returns:
+        dict: appendedCount, updatedCount and existingCount, or None on failure
+    """
+    if not service:
+        logger.error("Google Sheets service not available")
+        return None
+    
+    try:
+        title = _sheet_title(sheet_range)
+        index = get_url_index(service, spreadsheet_id, title)
+        
+        updates = {}
+        new_rows = {}
+        existing_count = 0
+        for row in rows:
+            url = row[1]
+            row_number = index.rows.get(url)
+            if row_number is None:
+                # A URL repeated within the batch is written once, with its latest data
+                new_rows[url] = row
+            elif mode == 'upsert':
+                updates[row_number] = row
+            else:
+                existing_count += 1
+        
+        if updates:
+            _execute(service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={
+                    'valueInputOption': 'RAW',
+                    'data': [
+                        {'range': f"{_a1_title(title)}!A{row_number}", 'values': [row]}
+                        for row_number, row in sorted(updates.items())
+                    ]
+                }
+            ))
+        
+        if new_rows:
+            result = _execute(service.spreadsheets().values().append(
+                spreadsheetId=spreadsheet_id,
+                range=sheet_range,
+                valueInputOption='RAW',
+                body={'values': list(new_rows.values())}
+            ))
+            if not _index_appended_rows(index, list(new_rows), result.get('updates', {}).get('updatedRange')):
+                # Unknown position: rebuild on next use
+                _url_indexes.pop((spreadsheet_id, title), None)
+        
+        counts = {'appendedCount': len(new_rows), 'updatedCount': len(updates), 'existingCount': existing_count}
+        logger.info(f"Wrote rows to {title}: {counts}")
+        return counts
+        
+    except Exception as e:
+        logger.error(f"Failed to upsert rows to sheet: {str(e)}")
+        # The sheet may have changed under the index
+        _url_indexes.pop((spreadsheet_id, _sheet_title(sheet_range)), None)
+        return None
+
+
+def _index_appended_rows(index: UrlIndex, urls: List[str], updated_range: Optional[str]) -> bool:
+    """
+    Add appended URLs to the index using the range reported by append.
+    
+    Returns:
+        bool: False if the range could not be parsed
+    """
+    match = re.search(r'![A-Z]+(\d+)', updated_range or '')
+    if not match:
+        return False
+    first_row = int(match.group(1))
+    for offset, url in enumerate(urls):
+        index.rows[url] = first_row + offset
+    index.row_count = max(index.row_count, first_row + len(urls) - 1)
+    return True
+
+
+def write_rows(service, spreadsheet_id: str, rows_by_range: Dict[str, List[List[Any]]],
+               mode: str = 'append') -> Optional[Dict[str, int]]:
+    """
+    Write rows to one or more sheets of a spreadsheet in the given write mode.
+    
+    With rollover configured, rows are first routed to their shards. In
+    'append' mode one range is written with one append and several with
+    one batchUpdate; the other modes upsert each sheet with upsert_rows.
+    Each target spreadsheet is written separately; when only some of them
+    fail, the rows of the failed ones are returned in failedRows (the same
+    row objects as passed in) so that only those are retried.
+    
+    Returns:
+        dict: appendedCount, updatedCount, existingCount and, after a partial
+        failure, failedRows; None if nothing was written
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f"Unsupported write mode: {mode}")
+    
+    totals = {'appendedCount': 0, 'updatedCount': 0, 'existingCount': 0}
+    failed_rows = []
+    routed = route_rows(service, spreadsheet_id, rows_by_range)
+    for target_id, target_rows in routed.items():
+        counts = _write_spreadsheet_rows(service, target_id, target_rows, mode)
+        if counts is None:
+            failed_rows.extend(row for rows in target_rows.values() for row in rows)
+            continue
+        for key, value in counts.items():
+            totals[key] += value
+    
+    if failed_rows:
+        if len(failed_rows) == sum(len(rows) for rows in rows_by_range.values()):
+            return None
+        logger.warning(f"Failed to write {len(failed_rows)} rows to their shards")
+        totals['failedRows'] = failed_rows
+    return totals
+
+
+def _write_spreadsheet_rows(service, spreadsheet_id: str, rows_by_range: Dict[str, List[List[Any]]],
+                            mode: str) -> Optional[Dict[str, int]]:
+    """Write rows to the sheets of one spreadsheet; see write_rows."""
+    if mode == 'append':
+        if len(rows_by_range) == 1:
+            (sheet_range, rows), = rows_by_range.items()
+            success = write_rows_to_sheet(service, spreadsheet_id, sheet_range, rows)
+        else:
+            success = write_rows_to_sheets(service, spreadsheet_id, rows_by_range)
+        if not success:
+            return None
+        for sheet_range, rows in rows_by_range.items():
+            _count_appended_rows(spreadsheet_id, sheet_range, len(rows))
+        return {
+            'appendedCount': sum(len(rows) for rows in rows_by_range.values()),
+            'updatedCount': 0,
+            'existingCount': 0
+        }
+    
+    totals = {'appendedCount': 0, 'updatedCount': 0, 'existingCount': 0}
+    for sheet_range, rows in rows_by_range.items():
+        counts = upsert_rows(service, spreadsheet_id, sheet_range, rows, mode)
+        if counts is None:
+            return None
+        _count_appended_rows(spreadsheet_id, sheet_range, counts['appendedCount'])
+        for key, value in counts.items():
+            totals[key] += value
+    return totals
+
+
+def _count_appended_rows(spreadsheet_id: str, sheet_range: str, count: int) -> None:
+    # Counts not read from the grid yet will include these rows when they are read
+    key = (spreadsheet_id, _sheet_title(sheet_range))
+    if key in _sheet_row_counts:
+        _sheet_row_counts[key] += count
+
+
+def _rollover_settings() -> Optional[Dict[str, Any]]:
+    """Return the rollover settings from the environment, or None if rollover is off."""
+    max_rows = int(os.environ.get(ROLLOVER_ROWS_ENV) or 0)
+    partition = os.environ.get(PARTITION_ENV) or None
+    target = os.environ.get(SHARD_TARGET_ENV) or 'tab'
+    if partition is not None and partition not in PARTITION_LENGTHS:
+        raise ValueError(f"Unsupported sheet partition: {partition}")
+    if target not in SHARD_TARGETS:
+        raise ValueError(f"Unsupported shard target: {target}")
+    if not max_rows and not partition:
+        return None
+    return {'maxRows': max_rows, 'partition': partition, 'target': target}
+
+
+def route_rows(service, spreadsheet_id: str,
+               rows_by_range: Dict[str, List[List[Any]]]) -> Dict[str, Dict[str, List[List[Any]]]]:
+    """
+    Route rows to the shards of their ranges.
+    
+    Without rollover every row stays in its range. Otherwise each row goes
+    to the latest shard of its date partition, and a new shard is opened
+    when that one has reached the row threshold.
+    
+    Args:
+        service: Google Sheets service object
+        spreadsheet_id: The ID of the original spreadsheet
+        rows_by_range: Original range -> rows built with build_row
+    
+    Returns:
+        dict: Spreadsheet ID -> range -> rows
+    """
+    settings = _rollover_settings()
+    if settings is None:
+        return {spreadsheet_id: rows_by_range}
+    
+    routed = {}
+    # Rows routed to each sheet in this call; row counts only grow once they are written
+    pending = {}
+    for sheet_range, rows in rows_by_range.items():
+        shards = _get_shards(spreadsheet_id, sheet_range)
+        for row in sorted(rows, key=lambda row: str(row[0])):
+            shard = _shard_for_row(service, spreadsheet_id, sheet_range, shards, row, settings, pending)
+            routed.setdefault(shard['spreadsheetId'], {}).setdefault(shard['sheetRange'], []).append(row)
+    return routed
+
+
+def _get_shards(spreadsheet_id: str, sheet_range: str) -> List[Dict[str, Any]]:
+    """Return the shard list of a range, loading the shared index once per container."""
+    key = (spreadsheet_id, sheet_range)
+    if key not in _shard_indexes:
+        location = os.environ.get(SHARD_INDEX_LOCATION_ENV)
+        index = load_shard_index(location, spreadsheet_id, sheet_range) if location else None
+        _shard_indexes[key] = index['shards'] if index else []
+    return _shard_indexes[key]
+
+
+def _shard_for_row(service, spreadsheet_id: str, sheet_range: str, shards: List[Dict[str, Any]],
+                   row: List[Any], settings: Dict[str, Any], pending: Dict[Any, int]) -> Dict[str, Any]:
+    """Return the shard a row is written to, opening a new one if needed."""
+    timestamp = str(row[0])
+    partition = timestamp[:PARTITION_LENGTHS[settings['partition']]] if settings['partition'] else None
+    
+    shard = next((shard for shard in reversed(shards) if shard['partition'] == partition), None)
+    if shard is None:
+        shard = _open_shard(service, spreadsheet_id, sheet_range, shards, partition, 1, timestamp, settings, pending)
+    elif settings['maxRows'] and _shard_row_count(service, shard, pending) >= settings['maxRows']:
+        shard = _open_shard(service, spreadsheet_id, sheet_range, shards, partition,
+                            shard['sequence'] + 1, timestamp, settings, pending)
+    
+    if not shard.get('lastTimestamp') or timestamp > shard['lastTimestamp']:
+        shard['lastTimestamp'] = timestamp
+    key = (shard['spreadsheetId'], _sheet_title(shard['sheetRange']))
+    pending[key] = pending.get(key, 0) + 1
+    return shard
+
+
+def _shard_row_count(service, shard: Dict[str, Any], pending: Dict[Any, int]) -> int:
+    key = (shard['spreadsheetId'], _sheet_title(shard['sheetRange']))
+    if key not in _sheet_row_counts:
+        # The last filled row, not the grid size: a blank new sheet has 1000 grid rows
+        column = _read_values(service, shard['spreadsheetId'], f"{_a1_title(key[1])}!A:A")
+        _sheet_row_counts[key] = len(column)
+    return _sheet_row_counts[key] + pending.get(key, 0)
+
+
+def _open_shard(service, spreadsheet_id: str, sheet_range: str, shards: List[Dict[str, Any]],
+                partition: Optional[str], sequence: int, timestamp: str,
+                settings: Dict[str, Any], pending: Dict[Any, int]) -> Dict[str, Any]:
+    """
+    Create the shard for a partition and sequence number and record it in the index.
+    
+    The first unpartitioned shard is the original range itself. Shard tab
+    names are derived from the partition and sequence, so containers that
+    roll over at the same time end up on the same tab.
+    """
+    base_title = _sheet_title(sheet_range)
+    cells = sheet_range.split('!', 1)[1] if '!' in sheet_range else 'A:F'
+    title = ' '.join(part for part in (base_title, partition) if part)
+    if sequence > 1:
+        title += f" ({sequence})"
+    
+    if title == base_title:
+        target_id, target_title = spreadsheet_id, base_title
+    elif settings['target'] == 'spreadsheet':
+        target_id, target_title = _create_shard_spreadsheet(service, spreadsheet_id, title, base_title), base_title
+    else:
+        _ensure_sheet(service, spreadsheet_id, title)
+        target_id, target_title = spreadsheet_id, title
+    
+    # Close the shard being rolled over
+    for shard in shards:
+        if shard['partition'] == partition and shard['sequence'] == sequence - 1:
+            shard['rowCount'] = _shard_row_count(service, shard, pending)
+    
+    shard = {
+        'spreadsheetId': target_id,
+        'sheetRange': f"{_a1_title(target_title)}!{cells}",
+        'partition': partition,
+        'sequence': sequence,
+        'firstTimestamp': timestamp,
+        # Tracked in memory while open; stored once the shard is closed
+        'lastTimestamp': None,
+        'createdAt': timestamp
+    }
+    shards.append(shard)
+    logger.info(f"Rolled {sheet_range} over to {shard['sheetRange']} in {target_id}")
+    
+    location = os.environ.get(SHARD_INDEX_LOCATION_ENV)
+    if location:
+        try:
+            # Other containers may have opened or closed shards since the index was loaded
+            stored = load_shard_index(location, spreadsheet_id, sheet_range)
+            merge_shards(shards, stored['shards'] if stored else [])
+            save_shard_index(location, spreadsheet_id, sheet_range, [
+                shard if 'rowCount' in shard else dict(shard, lastTimestamp=None) for shard in shards
+            ])
+        except Exception as e:
+            # Shard names are deterministic, so other containers still find the tab
+            logger.warning(f"Failed to update shard index: {str(e)}")
+    return shard
+
+
+def _ensure_sheet(service, spreadsheet_id: str, title: str) -> None:
+    """Add a tab to a spreadsheet unless it already exists."""
+    if title in _get_sheet_ids(service, spreadsheet_id):
+        return
+    try:
+        response = _execute(service.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={'requests': [{'addSheet': {'properties': {
+                'title': title,
+                # Appends grow the grid, so its row count tracks the rows written
+                'gridProperties': {'rowCount': 1}
+            }}}]}
+        ))
+    except Exception as e:
+        if 'already exists' not in str(e):
+            raise
+        # Added by another container in the meantime
+        _sheet_ids.pop(spreadsheet_id, None)
+        _get_sheet_ids(service, spreadsheet_id)
+        return
+    properties = response['replies'][0]['addSheet']['properties']
+    _sheet_ids[spreadsheet_id][title] = properties['sheetId']
+    _sheet_row_counts[(spreadsheet_id, title)] = 0
+
+
+def _create_shard_spreadsheet(service, spreadsheet_id: str, title: str, sheet_title: str) -> str:
+    """Create a spreadsheet for a shard and return its ID."""
+    spreadsheet = _execute(service.spreadsheets().create(
+        body={
+            'properties': {'title': f"{spreadsheet_id} {title}"},
+            'sheets': [{'properties': {'title': sheet_title, 'gridProperties': {'rowCount': 1}}}]
+        },
+        fields='spreadsheetId,sheets.properties(sheetId,title)'
+    ))
+    shard_id = spreadsheet['spreadsheetId']
+    _sheet_ids[shard_id] = {
+        sheet['properties']['title']: sheet['properties']['sheetId']
+        for sheet in spreadsheet.get('sheets', [])
+    }
+    _sheet_row_counts[(shard_id, sheet_title)] = 0
+    return shard_id
+
+
+def enqueue_rows(queue_location: str, spreadsheet_id: str, rows_by_range: Dict[str, List[List[Any]]],
+                 mode: Optional[str] = None) -> int:
+    """
+    Put rows on the write-behind queue for sheets_row_aggregator.
+    
+    Args:
+        queue_location: SQS queue URL or local directory
+        spreadsheet_id: The ID of the target spreadsheet
+        rows_by_range: Range in A1 notation -> rows built with build_row
+        mode: Write mode requested by the event; the aggregator's
+            SHEETS_WRITE_MODE applies when None
+    
+    Returns:
+        int: Number of rows queued
+    """
+    if mode is not None and mode not in WRITE_MODES:
+        raise ValueError(f"Unsupported write mode: {mode}")
+    
+    messages = [
+        dict({'spreadsheet_id': spreadsheet_id, 'sheet_range': sheet_range, 'row': row},
+             **({'write_mode': mode} if mode else {}))
+        for sheet_range, rows in rows_by_range.items()
+        for row in rows
+    ]
+    count = get_queue(queue_location).send(messages)
+    logger.info(f"Queued {count} rows for spreadsheet {spreadsheet_id}")
+    return count
+
+
+def _queued_response(spreadsheet_id: str, queued_count: int, **fields) -> Dict[str, Any]:
+    """Build the response for rows handed to the write-behind queue."""
+    result = dict(fields, spreadsheet_id=spreadsheet_id, queuedCount=queued_count, queued=True, success=True)
+    return dict(result, statusCode=200, body=json.dumps(dict(result, message='URLs queued for recording')))
+
+
 def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
     """
     Lambda handler to record URLs to Google Sheets.
@@ -111,9 +776,29 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
     Returns:
         dict: JSON response indicating success or failure
     """
+    set_deadline(context)
     try:
         logger.info(f"Received event: {json.dumps(event)}")
         
+        # Several URLs are recorded with one write
+        if 'rows' in event:
+            return _handle_batch_record(event.get('rows') or [], event)
+        
+        # The uploader reused an earlier upload; its row is already recorded
+        if event.get('unchanged'):
+            logger.info("Skipping sheet write for unchanged page")
+            return {
+                'statusCode': 200,
+                'url': event.get('url') or event.get('shareable_url'),
+                'success': True,
+                'skipped': True,
+                'body': json.dumps({
+                    'message': 'Page unchanged, sheet write skipped',
+                    'success': True,
+                    'skipped': True
+                })
+            }
+        
         # Extract required parameters from the event
         url = event.get('url', '')
         spreadsheet_id = event.get('spreadsheet_id', '')
@@ -141,6 +826,13 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
         
         logger.info(f"Recording URL: {url} to spreadsheet: {spreadsheet_id}")
         
+        # Write-behind mode: the aggregator writes the row later
+        queue_location = event.get('writeQueue') or os.environ.get(WRITE_QUEUE_ENV)
+        if queue_location:
+            row = build_row(url, event.get('additional_data', {}))
+            enqueue_rows(queue_location, spreadsheet_id, {sheet_range: [row]}, event.get('writeMode'))
+            return _queued_response(spreadsheet_id, 1, url=url)
+        
         # Get Google Sheets service
         service = get_sheets_service()
         if not service:
@@ -156,7 +848,13 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
         additional_data = event.get('additional_data', {})
         
         # Write URL to sheet
-        success = write_url_to_sheet(service, spreadsheet_id, sheet_range, url, additional_data)
+        write_mode = event.get('writeMode') or os.environ.get(WRITE_MODE_ENV, 'append')
+        counts = None
+        if write_mode == 'append' and _rollover_settings() is None:
+            success = write_url_to_sheet(service, spreadsheet_id, sheet_range, url, additional_data)
+        else:
+            counts = write_rows(service, spreadsheet_id, {sheet_range: [build_row(url, additional_data)]}, write_mode)
+            success = counts is not None
         
         if success:
             response = {
@@ -171,6 +869,8 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
                     'success': True
                 })
             }
+            if counts:
+                response.update(counts)
             logger.info(f"Successfully recorded URL to spreadsheet")
             return response
         else:
@@ -190,4 +890,104 @@ def lambda_handler(event: Dict[str, Any], context) -> Dict[str, Any]:
                 'error': f'Internal server error: {str(e)}',
                 'success': False
             })
-        }
\ No newline at end of file
+        }
+
+
+def _handle_batch_record(rows: List[Dict[str, Any]], event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Record a list of URLs and build the batch response.
+    
+    Each entry takes url (or shareable_url, as in google_drive_uploader batch
+    results), additional_data (or its filename/file_id/file_size/description
+    fields), an optional sheet_range and unchanged. Rows for one range are
+    written with a single append; rows for several ranges with a single
+    batchUpdate.
+    
+    Args:
+        rows: List of row entries
+        event: Event data with spreadsheet_id and the default sheet_range
+    
+    Returns:
+        dict: JSON response with recorded and skipped counts
+    """
+    spreadsheet_id = event.get('spreadsheet_id', '')
+    default_range = event.get('sheet_range', 'Sheet1!A:F')
+    write_mode = event.get('writeMode') or os.environ.get(WRITE_MODE_ENV, 'append')
+    
+    if not spreadsheet_id:
+        logger.warning("No spreadsheet ID found in event")
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'error': 'Spreadsheet ID not found in input',
+                'success': False
+            })
+        }
+    
+    rows_by_range = {}
+    skipped_count = 0
+    for entry in rows:
+        url = entry.get('url') or entry.get('shareable_url')
+        # Unchanged pages are already recorded; entries without a URL failed upstream
+        if entry.get('unchanged') or not url:
+            skipped_count += 1
+            continue
+        additional_data = entry.get('additional_data') or {
+            key: entry[key] for key in ADDITIONAL_DATA_COLUMNS if key in entry
+        }
+        rows_by_range.setdefault(entry.get('sheet_range') or default_range, []).append(
+            build_row(url, additional_data)
+        )
+    
+    recorded_count = sum(len(range_rows) for range_rows in rows_by_range.values())
+    
+    # Write-behind mode: the aggregator writes the rows later
+    queue_location = event.get('writeQueue') or os.environ.get(WRITE_QUEUE_ENV)
+    if queue_location:
+        queued_count = (enqueue_rows(queue_location, spreadsheet_id, rows_by_range, event.get('writeMode'))
+                        if rows_by_range else 0)
+        return _queued_response(spreadsheet_id, queued_count, skippedCount=skipped_count)
+    
+    counts = None
+    if rows_by_range:
+        # Get Google Sheets service
+        service = get_sheets_service()
+        if not service:
+            return {
+                'statusCode': 503,
+                'body': json.dumps({
+                    'error': 'Google Sheets service unavailable',
+                    'success': False
+                })
+            }
+        
+        counts = write_rows(service, spreadsheet_id, rows_by_range, write_mode)
+        
+        if counts is None:
+            return {
+                'statusCode': 500,
+                'body': json.dumps({
+                    'error': 'Failed to record URLs to spreadsheet',
+                    'success': False
+                })
+            }
+    
+    # Rows of shards that failed while others were written; only these need a retry
+    failed_rows = counts.pop('failedRows', []) if counts else []
+    recorded_count -= len(failed_rows)
+    
+    logger.info(f"Recorded {recorded_count} URLs, skipped {skipped_count}, failed {len(failed_rows)}")
+    result = {
+        'spreadsheet_id': spreadsheet_id,
+        'recordedCount': recorded_count,
+        'skippedCount': skipped_count,
+        'success': not failed_rows
+    }
+    if failed_rows:
+        result['failedCount'] = len(failed_rows)
+        result['failedUrls'] = [row[1] for row in failed_rows]
+    # Upsert modes report how many rows were appended, updated or already present
+    if counts and write_mode != 'append':
+        result.update(counts)
+    message = 'URLs recorded successfully' if not failed_rows else 'Some URLs could not be recorded'
+    return dict(result, statusCode=200, body=json.dumps(dict(result, message=message)))
@@ -0,0 +1,112 @@
+"""
+Tiled full-page capture for very tall pages.
+
+A full-page screenshot of a long page is one huge bitmap inside the
+browser and again when it is decoded. Here the page is scrolled one
+viewport at a time and each strip is captured separately; strips are then
+either stitched row by row into a PNG (image_processing.stitch_tiles) or
+kept as separate tiles, so peak memory stays near one tile.
+"""
+import logging
+import os
+import shutil
+from typing import Any, Dict
+
+from image_processing import PIL_AVAILABLE, crop_tile, stitch_tiles
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TILING_MODES = ('stitch', 'tiles')
+
+# Stops runaway captures of infinitely scrolling pages
+DEFAULT_MAX_TILES = 50
+
+PAGE_METRICS_SCRIPT = """() => ({
+    pageHeight: document.documentElement.scrollHeight,
+    viewportWidth: window.innerWidth,
+    viewportHeight: window.innerHeight
+})"""
+
+SCROLL_SCRIPT = """y => {
+    window.scrollTo(0, y);
+    return window.scrollY;
+}"""
+
+
+def tiling_options(config) -> Dict[str, Any]:
+    """
+    Build tiling options from event or environment configuration.
+
+    Args:
+        config: 'stitch' or 'tiles', or a dict with mode and maxTiles
+
+    Returns:
+        dict: mode and maxTiles
+    """
+    if isinstance(config, str):
+        config = {'mode': config}
+    mode = config.get('mode', 'stitch')
+    if mode not in TILING_MODES:
+        raise ValueError(f"Unsupported tiling mode: {mode}")
+    return {'mode': mode, 'maxTiles': int(config.get('maxTiles', DEFAULT_MAX_TILES))}
+
+
+async def capture_tiles(page, image_path: str, options=None) -> Dict[str, Any]:
+    """
+    Capture a loaded page in viewport-height strips.
+
+    In 'stitch' mode the strips are combined into image_path. In 'tiles'
+    mode every strip is saved as ``<stem>_tile_<n>.png`` and the first one
+    is also copied to image_path as the main image.
+
+    Args:
+        page: pyppeteer Page after navigation
+        image_path: Destination of the (stitched or first) PNG
+        options: Options from tiling_options
+
+    Returns:
+        dict: mode, tileCount, pageHeight, plus tiles (path, top, height)
+            in 'tiles' mode
+    """
+    if not PIL_AVAILABLE:
+        raise ImportError("Pillow is required for tiled capture")
+
+    options = options or tiling_options('stitch')
+    metrics = await page.evaluate(PAGE_METRICS_SCRIPT)
+    width = metrics['viewportWidth']
+    tile_height = metrics['viewportHeight']
+    page_height = min(metrics['pageHeight'], tile_height * options['maxTiles'])
+    stem = os.path.splitext(image_path)[0]
+
+    tiles = []
+    for index, top in enumerate(range(0, page_height, tile_height)):
+        # The last scroll is clamped by the browser, so the strip may start above top
+        scroll_y = await page.evaluate(SCROLL_SCRIPT, top)
+        tile_path = f"{stem}_tile_{index}.png"
+        await page.screenshot({'path': tile_path})
+        tiles.append({
+            'path': tile_path,
+            'top': top,
+            'height': min(tile_height, page_height - top),
+            'offset': top - scroll_y
+        })
+
+    result = {'mode': options['mode'], 'tileCount': len(tiles), 'pageHeight': page_height}
+
+    if options['mode'] == 'stitch':
+        try:
+            stitch_tiles(tiles, image_path, width)
+        finally:
+            for tile in tiles:
+                os.remove(tile['path'])
+        logger.info(f"Stitched {len(tiles)} tiles into {image_path} ({width}x{page_height})")
+        return result
+
+    for tile in tiles:
+        crop_tile(tile['path'], tile.pop('offset'), tile['height'], width)
+    shutil.copyfile(tiles[0]['path'], image_path)
+    result['tiles'] = tiles
+    logger.info(f"Captured {len(tiles)} tiles for {image_path}")
+    return result
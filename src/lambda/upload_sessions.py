@@ -0,0 +1,66 @@
+"""
+Persisted state of resumable Drive uploads.
+
+The session URI and confirmed byte count of a large upload are saved after
+every chunk, so a retried invocation (e.g. a Step Functions retry) resumes
+the same session instead of sending the whole file again.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from object_store import get_object_store
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Session location (s3://bucket/prefix or local directory); uploads are not resumable across invocations when unset
+SESSION_LOCATION_ENV = 'UPLOAD_SESSION_LOCATION'
+
+
+def _session_key(session_id: str) -> str:
+    return f"sessions/{hashlib.sha256(session_id.encode('utf-8')).hexdigest()}.json"
+
+
+def load_upload_session(location: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the saved session of an upload.
+
+    Args:
+        location: Session location
+        session_id: Identity of the uploaded content (e.g. its object key)
+
+    Returns:
+        dict: Session (uri, progress, size, updatedAt) or None
+    """
+    data = get_object_store(location).get(_session_key(session_id))
+    return json.loads(data.decode('utf-8')) if data else None
+
+
+def save_upload_session(location: str, session_id: str, uri: str, progress: int, size: int) -> Dict[str, Any]:
+    """
+    Save the session URI and confirmed progress of an upload.
+
+    Returns:
+        dict: Stored session
+    """
+    session = {
+        'uri': uri,
+        'progress': progress,
+        'size': size,
+        'updatedAt': datetime.utcnow().isoformat() + 'Z'
+    }
+    get_object_store(location).put(
+        _session_key(session_id),
+        json.dumps(session).encode('utf-8'),
+        content_type='application/json'
+    )
+    return session
+
+
+def clear_upload_session(location: str, session_id: str) -> None:
+    """Remove the saved session of a finished or abandoned upload."""
+    get_object_store(location).delete(_session_key(session_id))
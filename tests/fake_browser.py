@@ -0,0 +1,344 @@
+"""
+In-process stand-ins for a pyppeteer browser and a local HTTP server.
+
+The fake browser loads pages over real HTTP with urllib, so capture code
+can be exercised end to end against a local server without Chromium or
+network access.
+"""
+import asyncio
+import html.parser
+import http.server
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+# Pillow renders viewport screenshots for tiled captures when available
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# 1x1 PNG used as the fake screenshot output
+FAKE_PNG = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde'
+    b'\x00\x00\x00\x0cIDATx\x9cc\xf8\xff\xff?\x00\x05\xfe\x02\xfe\r\xefF\xb8\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+
+
+class _SubresourceParser(html.parser.HTMLParser):
+    """Collect (url, resourceType) pairs referenced by a document."""
+
+    TAG_TYPES = {'img': 'image', 'script': 'script', 'video': 'media', 'audio': 'media', 'iframe': 'document'}
+
+    def __init__(self):
+        super().__init__()
+        self.resources = []
+        self.base_href = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'base' and attrs.get('href') and self.base_href is None:
+            self.base_href = attrs['href']
+        elif tag == 'link' and attrs.get('href'):
+            rel = attrs.get('rel', '')
+            if rel == 'stylesheet':
+                self.resources.append((attrs['href'], 'stylesheet'))
+            elif rel == 'preload' and attrs.get('as') == 'font':
+                self.resources.append((attrs['href'], 'font'))
+        elif tag in self.TAG_TYPES and attrs.get('src'):
+            self.resources.append((attrs['src'], self.TAG_TYPES[tag]))
+
+
+class _TextParser(html.parser.HTMLParser):
+    """Collect the title and the text of main/article (or body) like innerText."""
+
+    MAIN_TAGS = ('main', 'article')
+    SKIPPED_TAGS = ('script', 'style', 'head')
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []
+        self.title = ''
+        self.body_text = []
+        self.main_text = []
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.stack:
+            while self.stack.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        if 'title' in self.stack:
+            self.title += data
+        elif not any(tag in self.SKIPPED_TAGS for tag in self.stack):
+            self.body_text.append(data)
+            if any(tag in self.MAIN_TAGS for tag in self.stack):
+                self.main_text.append(data)
+
+
+class FakeRequest:
+    """Intercepted request passed to 'request' listeners."""
+
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resourceType = resource_type
+        self.outcome = None
+
+    async def abort(self, error_code='failed'):
+        self.outcome = 'aborted'
+
+    async def continue_(self, overrides=None):
+        self.outcome = 'continued'
+
+    async def respond(self, response):
+        self.outcome = 'responded'
+        self.response = response
+
+
+class FakeResponse:
+    """Response passed to 'response' listeners."""
+
+    def __init__(self, url, status, headers):
+        self.url = url
+        self.status = status
+        self.headers = headers
+
+
+class FakePage:
+    """Minimal pyppeteer Page replacement."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.viewport = None
+        self.url = None
+        self.content = None
+        self.closed = False
+        self.intercepting = False
+        self.listeners = {}
+        self.requested = []
+        self.loaded_at = None
+        self.scroll_y = 0
+
+    async def setViewport(self, viewport):
+        self.viewport = viewport
+
+    async def setRequestInterception(self, enabled):
+        self.intercepting = enabled
+
+    def on(self, event, callback):
+        self.listeners.setdefault(event, []).append(callback)
+
+    def _emit(self, event, payload):
+        for callback in self.listeners.get(event, []):
+            callback(payload)
+
+    async def _fetch(self, url):
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read()
+            headers = {key.lower(): value for key, value in response.headers.items()}
+        self._emit('response', FakeResponse(url, 200, headers))
+        return body
+
+    async def goto(self, url, options=None):
+        self.browser._check_alive()
+        # Yield like a real network wait so concurrent pages interleave
+        await asyncio.sleep(0.01)
+        self.content = (await self._fetch(url)).decode('utf-8')
+        self.url = url
+        self.loaded_at = time.monotonic()
+        self.browser.loaded_urls.append(url)
+        await self._load_subresources(url)
+
+    async def setContent(self, html):
+        self.browser._check_alive()
+        await asyncio.sleep(0.01)
+        self.content = html
+        self.url = 'about:blank'
+        self.loaded_at = time.monotonic()
+        await self._load_subresources(self.url)
+
+    async def waitForFunction(self, page_function, options=None, *args):
+        self.browser._check_alive()
+        return True
+
+    async def _load_subresources(self, url):
+        parser = _SubresourceParser()
+        parser.feed(self.content)
+        for src, resource_type in parser.resources:
+            resource_url = urllib.parse.urljoin(parser.base_href or url, src)
+            request = FakeRequest(resource_url, resource_type)
+            self._emit('request', request)
+            if self.intercepting:
+                # Let listeners' abort()/continue_() futures run
+                await asyncio.sleep(0)
+                if request.outcome != 'continued':
+                    continue
+            self.requested.append(resource_url)
+            if resource_url.startswith('http://127.0.0.1'):
+                try:
+                    await self._fetch(resource_url)
+                except Exception:
+                    pass
+
+    async def evaluate(self, script, *args):
+        """
+        Answer the text extraction script from the loaded HTML, and the
+        readiness, page metrics and scroll scripts from the browser's
+        dom_activity.
+
+        dom_activity(elapsed_seconds) returns the page state (mutations,
+        width, height, pendingImages) at that time since navigation.
+        """
+        self.browser._check_alive()
+        if 'MutationObserver' in script:
+            return None
+        if 'innerText' in script:
+            parser = _TextParser()
+            parser.feed(self.content)
+            return {'title': parser.title, 'content': ' '.join(parser.main_text or parser.body_text)}
+        if 'innerHeight' in script:
+            return {
+                'pageHeight': self._page_height(),
+                'viewportWidth': self.viewport['width'],
+                'viewportHeight': self.viewport['height']
+            }
+        if 'scrollTo' in script:
+            self.scroll_y = max(0, min(args[0], self._page_height() - self.viewport['height']))
+            return self.scroll_y
+        return self.browser.dom_activity(time.monotonic() - self.loaded_at)
+
+    def _page_height(self):
+        return self.browser.dom_activity(time.monotonic() - self.loaded_at)['height']
+
+    async def screenshot(self, options=None):
+        self.browser._check_alive()
+        options = options or {}
+        if not options.get('fullPage') and Image is not None:
+            # Viewport screenshot whose rows encode their document y (gray = y % 256)
+            width, height = self.viewport['width'], self.viewport['height']
+            rows = bytes((self.scroll_y + y) % 256 for y in range(height) for _ in range(width))
+            Image.frombytes('L', (width, height), rows).save(options['path'], 'PNG')
+            with open(options['path'], 'rb') as f:
+                return f.read()
+        if 'path' in options:
+            with open(options['path'], 'wb') as f:
+                f.write(FAKE_PNG)
+        return FAKE_PNG
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserContext:
+    """Minimal pyppeteer incognito BrowserContext replacement."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self.closed = False
+
+    async def newPage(self):
+        self.browser._check_alive()
+        page = FakePage(self.browser)
+        self.pages.append(page)
+        self.browser.open_pages += 1
+        self.browser.max_open_pages = max(self.browser.max_open_pages, self.browser.open_pages)
+        return page
+
+    async def close(self):
+        if not self.closed:
+            self.browser.open_pages -= len(self.pages)
+        self.closed = True
+        for page in self.pages:
+            page.closed = True
+
+
+def static_page(elapsed):
+    """DOM activity of a page that is fully rendered on load."""
+    return {'mutations': 0, 'width': 1280, 'height': 720, 'pendingImages': 0}
+
+
+class FakeBrowser:
+    """Minimal pyppeteer Browser replacement that can be made to crash."""
+
+    def __init__(self, dom_activity=None):
+        self.dom_activity = dom_activity or static_page
+        self.crashed = False
+        self.closed = False
+        self.contexts = []
+        self.loaded_urls = []
+        self.open_pages = 0
+        self.max_open_pages = 0
+
+    def _check_alive(self):
+        if self.crashed or self.closed:
+            raise ConnectionError('Browser has disconnected')
+
+    async def version(self):
+        self._check_alive()
+        return 'HeadlessChrome/fake'
+
+    async def createIncognitoBrowserContext(self):
+        self._check_alive()
+        browser_context = FakeBrowserContext(self)
+        self.contexts.append(browser_context)
+        return browser_context
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeLauncher:
+    """Launcher coroutine function that records every browser it creates."""
+
+    def __init__(self, dom_activity=None):
+        self.dom_activity = dom_activity
+        self.browsers = []
+
+    async def __call__(self):
+        browser = FakeBrowser(self.dom_activity)
+        self.browsers.append(browser)
+        return browser
+
+
+class LocalHTTPServer:
+    """Serve a dict of path -> HTML on 127.0.0.1 in a background thread."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        pages_ref = pages
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages_ref.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
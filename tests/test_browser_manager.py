@@ -0,0 +1,131 @@
+"""
+Unit tests for browser_manager module.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from browser_manager import BrowserManager, PYPPETEER_AVAILABLE
+from fake_browser import FakeLauncher, LocalHTTPServer, FAKE_PNG
+
+
+class TestBrowserManager(unittest.TestCase):
+    """Test cases for BrowserManager."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.launcher = FakeLauncher()
+        self.manager = BrowserManager(launcher=self.launcher)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pages = {'/': '<html><head><title>Home</title></head><body>Hello</body></html>'}
+    
+    def tearDown(self):
+        """Clean up fixtures."""
+        self.manager.run(self.manager.close())
+        self.temp_dir.cleanup()
+    
+    def test_browser_reused_across_captures(self):
+        """Test that one browser serves several captures with fresh contexts."""
+        with LocalHTTPServer(self.pages) as server:
+            for i in range(3):
+                path = os.path.join(self.temp_dir.name, f'shot{i}.png')
+                self.manager.run(self.manager.capture(server.url('/'), path))
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), FAKE_PNG)
+        
+        self.assertEqual(self.manager.launch_count, 1)
+        browser = self.launcher.browsers[0]
+        self.assertEqual(len(browser.contexts), 3)
+        self.assertTrue(all(c.closed for c in browser.contexts))
+        self.assertEqual(len(browser.loaded_urls), 3)
+    
+    def test_relaunch_after_crash_between_invocations(self):
+        """Test that a crashed browser is detected by the health check and relaunched."""
+        with LocalHTTPServer(self.pages) as server:
+            path = os.path.join(self.temp_dir.name, 'shot.png')
+            self.manager.run(self.manager.capture(server.url('/'), path))
+            self.launcher.browsers[0].crashed = True
+            
+            self.manager.run(self.manager.capture(server.url('/'), path))
+        
+        self.assertEqual(self.manager.launch_count, 2)
+        self.assertTrue(self.launcher.browsers[0].closed)
+        self.assertEqual(self.launcher.browsers[1].loaded_urls, [server.url('/')])
+    
+    def test_retry_after_crash_during_capture(self):
+        """Test that a crash mid-capture relaunches the browser and retries once."""
+        launcher = self.launcher
+        
+        class CrashingPageLauncher(FakeLauncher):
+            async def __call__(self):
+                browser = await launcher()
+                if len(launcher.browsers) == 1:
+                    original = browser.createIncognitoBrowserContext
+                    
+                    async def crash_on_context():
+                        browser_context = await original()
+                        browser.crashed = True
+                        return browser_context
+                    browser.createIncognitoBrowserContext = crash_on_context
+                return browser
+        
+        manager = BrowserManager(launcher=CrashingPageLauncher())
+        with LocalHTTPServer(self.pages) as server:
+            path = os.path.join(self.temp_dir.name, 'shot.png')
+            manager.run(manager.capture(server.url('/'), path))
+        
+        self.assertEqual(manager.launch_count, 2)
+        self.assertTrue(os.path.exists(path))
+        manager.run(manager.close())
+    
+    def test_navigation_error_is_raised(self):
+        """Test that page errors from a healthy browser propagate without relaunch."""
+        with LocalHTTPServer(self.pages) as server:
+            path = os.path.join(self.temp_dir.name, 'shot.png')
+            with self.assertRaises(Exception):
+                self.manager.run(self.manager.capture(server.url('/missing'), path))
+        
+        self.assertEqual(self.manager.launch_count, 1)
+        self.assertTrue(self.launcher.browsers[0].contexts[0].closed)
+    
+    def test_capture_many_bounds_open_tabs(self):
+        """Test that parallel captures share one browser and respect max_tabs."""
+        self.pages.update({f'/p{i}': f'<html><body>{i}</body></html>' for i in range(5)})
+        with LocalHTTPServer(self.pages) as server:
+            targets = [
+                (server.url(f'/p{i}'), os.path.join(self.temp_dir.name, f'p{i}.png'))
+                for i in range(5)
+            ]
+            targets.append((server.url('/missing'), os.path.join(self.temp_dir.name, 'missing.png')))
+            
+            outcomes = self.manager.run(self.manager.capture_many(targets, max_tabs=2))
+        
+        self.assertEqual(outcomes[:5], [{'imagePath': path} for _, path in targets[:5]])
+        self.assertIsInstance(outcomes[5], Exception)
+        self.assertEqual(self.manager.launch_count, 1)
+        browser = self.launcher.browsers[0]
+        self.assertEqual(browser.max_open_pages, 2)
+        self.assertEqual(browser.open_pages, 0)
+    
+    @unittest.skipUnless(PYPPETEER_AVAILABLE and os.environ.get('CHROMIUM_PATH'),
+                         "Requires pyppeteer and a Chromium binary")
+    def test_real_browser_against_local_server(self):
+        """Test a real headless Chromium capture against a local HTTP server."""
+        manager = BrowserManager()
+        try:
+            with LocalHTTPServer(self.pages) as server:
+                path = os.path.join(self.temp_dir.name, 'real.png')
+                manager.run(manager.capture(server.url('/'), path))
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+        finally:
+            manager.run(manager.close())
+
+
+if __name__ == '__main__':
+    unittest.main()
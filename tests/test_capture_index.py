@@ -0,0 +1,58 @@
+"""
+Unit tests for capture_index module.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+
+from capture_index import load_capture_record, save_capture_record, hamming_distance, find_unchanged_capture
+
+
+class TestCaptureIndex(unittest.TestCase):
+    """Test cases for the per-URL screenshot index."""
+    
+    def setUp(self):
+        """Set up a temporary index location."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.location = self.temp_dir.name
+        self.url = 'https://example.com/page'
+    
+    def tearDown(self):
+        """Remove the index."""
+        self.temp_dir.cleanup()
+    
+    def test_save_and_load_record(self):
+        """Test round-tripping a record for a URL."""
+        self.assertIsNone(load_capture_record(self.location, self.url))
+        
+        save_capture_record(self.location, self.url, 'ff00ff00ff00ff00', 'https://drive/1', 'file1')
+        record = load_capture_record(self.location, self.url)
+        
+        self.assertEqual(record['url'], self.url)
+        self.assertEqual(record['perceptualHash'], 'ff00ff00ff00ff00')
+        self.assertEqual(record['shareable_url'], 'https://drive/1')
+        self.assertEqual(record['file_id'], 'file1')
+        self.assertIsNone(load_capture_record(self.location, 'https://example.com/other'))
+    
+    def test_hamming_distance(self):
+        """Test bit distance between hex hashes."""
+        self.assertEqual(hamming_distance('ff', 'ff'), 0)
+        self.assertEqual(hamming_distance('ff', 'fe'), 1)
+        self.assertEqual(hamming_distance('0000', 'ffff'), 16)
+    
+    def test_find_unchanged_capture_with_threshold(self):
+        """Test that hashes within the threshold count as unchanged."""
+        save_capture_record(self.location, self.url, '00000000000000ff', 'https://drive/1', 'file1')
+        
+        self.assertIsNotNone(find_unchanged_capture(self.location, self.url, '00000000000000ff'))
+        self.assertIsNone(find_unchanged_capture(self.location, self.url, '00000000000000fc'))
+        self.assertIsNotNone(find_unchanged_capture(self.location, self.url, '00000000000000fc', threshold=2))
+        self.assertIsNone(find_unchanged_capture(self.location, 'https://new.example.com', '00000000000000ff'))
+
+
+if __name__ == '__main__':
+    unittest.main()
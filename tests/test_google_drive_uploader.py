@@ -6,12 +6,18 @@ import json
 import sys
 import os
 import base64
+import contextlib
+import hashlib
+import io
+import tempfile
 from unittest.mock import patch, MagicMock, mock_open
 
 # Add the src directory to Python path to import the Lambda function
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
 
-from google_drive_uploader import lambda_handler, upload_image_to_drive, get_drive_service
+import google_drive_uploader
+from google_drive_uploader import lambda_handler, upload_image_to_drive, get_drive_service, reset_drive_service
+from capture_index import load_capture_record, load_content_record, save_content_record
 
 
 class TestGoogleDriveUploader(unittest.TestCase):
@@ -23,6 +29,8 @@ class TestGoogleDriveUploader(unittest.TestCase):
         # Create a simple test image (1x1 PNG in base64)
         self.test_image_b64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
         self.test_image_data = base64.b64decode(self.test_image_b64)
+        reset_drive_service()
+        self.addCleanup(reset_drive_service)
     
     @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
     @patch('google_drive_uploader.upload_image_to_drive')
@@ -52,7 +60,7 @@ class TestGoogleDriveUploader(unittest.TestCase):
         self.assertEqual(body['message'], 'Image uploaded to Google Drive successfully')
         
         # Verify upload function was called with correct parameters
-        mock_upload.assert_called_once_with(self.test_image_data, 'test_image.png', None)
+        mock_upload.assert_called_once_with(self.test_image_data, 'test_image.png', None, 'image/png')
     
     @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
     @patch('google_drive_uploader.upload_image_to_drive')
@@ -73,7 +81,7 @@ class TestGoogleDriveUploader(unittest.TestCase):
         response = lambda_handler(event, self.context)
         
         self.assertEqual(response['statusCode'], 200)
-        mock_upload.assert_called_once_with(self.test_image_data, 'folder_image.png', 'test_folder_id')
+        mock_upload.assert_called_once_with(self.test_image_data, 'folder_image.png', 'test_folder_id', 'image/png')
     
     def test_missing_image_data(self):
         """Test handling of missing image data."""
@@ -140,7 +148,52 @@ class TestGoogleDriveUploader(unittest.TestCase):
             response = lambda_handler(event, self.context)
             
             self.assertEqual(response['statusCode'], 200)
-            mock_upload.assert_called_once_with(self.test_image_data, 'screenshot.png', None)
+            mock_upload.assert_called_once_with(self.test_image_data, 'screenshot.png', None, 'image/png')
+    
+    @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+    @patch('google_drive_uploader.upload_image_to_drive')
+    def test_mime_type_from_event(self, mock_upload):
+        """Test that the MIME type reported by page_capture is used for the upload."""
+        mock_upload.return_value = {
+            'file_id': 'webp_id',
+            'shareable_url': 'https://drive.google.com/file/d/webp_id/view',
+            'filename': 'screenshot.webp'
+        }
+        
+        image_b64 = base64.b64encode(b'unknown-format').decode('utf-8')
+        response = lambda_handler({'imageData': image_b64, 'mimeType': 'image/webp'}, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        mock_upload.assert_called_once_with(b'unknown-format', 'screenshot.webp', None, 'image/webp')
+    
+    @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+    @patch('google_drive_uploader.upload_image_to_drive')
+    def test_mime_type_from_filename(self, mock_upload):
+        """Test that the MIME type is guessed from the filename extension."""
+        mock_upload.return_value = {
+            'file_id': 'jpg_id',
+            'shareable_url': 'https://drive.google.com/file/d/jpg_id/view',
+            'filename': 'shot.jpg'
+        }
+        
+        image_b64 = base64.b64encode(b'unknown-format').decode('utf-8')
+        lambda_handler({'imageData': image_b64, 'filename': 'shot.jpg'}, self.context)
+        
+        mock_upload.assert_called_once_with(b'unknown-format', 'shot.jpg', None, 'image/jpeg')
+    
+    @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+    @patch('google_drive_uploader.upload_image_to_drive')
+    def test_mime_type_from_magic_bytes(self, mock_upload):
+        """Test that the detected image format wins over the event and filename."""
+        mock_upload.return_value = {
+            'file_id': 'png_id',
+            'shareable_url': 'https://drive.google.com/file/d/png_id/view',
+            'filename': 'shot.jpg'
+        }
+        
+        lambda_handler({'imageData': self.test_image_b64, 'filename': 'shot.jpg', 'mimeType': 'image/jpeg'}, self.context)
+        
+        mock_upload.assert_called_once_with(self.test_image_data, 'shot.jpg', None, 'image/png')
     
     @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
     @patch('google_drive_uploader.upload_image_to_drive')
@@ -195,7 +248,9 @@ class TestGoogleDriveUploader(unittest.TestCase):
         
         self.assertEqual(service, mock_service)
         mock_credentials.from_service_account_info.assert_called_once()
-        mock_build.assert_called_once_with('drive', 'v3', credentials=mock_creds)
+        mock_build.assert_called_once_with(
+            'drive', 'v3', credentials=mock_creds, static_discovery=True, cache_discovery=False
+        )
     
     @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', False)
     def test_get_drive_service_no_libraries(self):
@@ -286,6 +341,675 @@ class TestGoogleDriveUploader(unittest.TestCase):
         with self.assertRaises(Exception):
             upload_image_to_drive(self.test_image_data, 'test.png')
 
+    
+    @patch('google_drive_uploader.upload_stream_to_drive')
+    def test_upload_from_image_key(self, mock_upload_stream):
+        """Test that an image key is streamed from the object store."""
+        received = {}
+        
+        def fake_upload(stream, filename, folder_id, mime_type, session_id=None):
+            received['data'] = stream.read()
+            return {
+                'file_id': 'key_file_id',
+                'shareable_url': 'https://drive.google.com/file/d/key_file_id/view',
+                'filename': filename
+            }
+        mock_upload_stream.side_effect = fake_upload
+        
+        with tempfile.TemporaryDirectory() as storage_dir:
+            os.makedirs(os.path.join(storage_dir, 'screenshots'))
+            with open(os.path.join(storage_dir, 'screenshots', 'shot.webp'), 'wb') as f:
+                f.write(self.test_image_data)
+            
+            event = {'imageKey': 'screenshots/shot.webp', 'storageLocation': storage_dir, 'folderId': 'folder'}
+            response = lambda_handler(event, self.context)
+            session_id = os.path.join(storage_dir, 'screenshots', 'shot.webp')
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['filename'], 'shot.webp')
+        self.assertEqual(received['data'], self.test_image_data)
+        args = mock_upload_stream.call_args[0]
+        self.assertEqual(args[1:], ('shot.webp', 'folder', None, session_id))
+    
+    @patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+    def test_upload_from_image_path(self):
+        """Test streaming a local file with its MIME type detected from the bytes."""
+        mock_service = MagicMock()
+        mock_service.files().create().execute.return_value = {'id': 'path_file_id'}
+        webp_data = b'RIFF\x10\x00\x00\x00WEBPVP8 ' + b'\x00' * 32
+        
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+             patch.dict(os.environ, {'SCRATCH_DIR': tmp_dir}), \
+             patch('google_drive_uploader.get_drive_service', return_value=mock_service), \
+             patch('google_drive_uploader.MediaIoBaseUpload') as mock_media:
+            image_path = os.path.join(tmp_dir, 'capture')
+            with open(image_path, 'wb') as f:
+                f.write(webp_data)
+            
+            response = lambda_handler({'imagePath': image_path}, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['file_id'], 'path_file_id')
+        self.assertEqual(response['filename'], 'capture')
+        self.assertEqual(mock_media.call_args.kwargs['mimetype'], 'image/webp')
+    
+    def test_image_path_not_found(self):
+        """Test that a missing local file is rejected."""
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.dict(os.environ, {'SCRATCH_DIR': tmp_dir}):
+            response = lambda_handler({'imagePath': os.path.join(tmp_dir, 'shot.png')}, self.context)
+        
+        self.assertEqual(response['statusCode'], 400)
+        self.assertIn('Image file not found', json.loads(response['body'])['error'])
+    
+    @patch('google_drive_uploader.upload_file_to_drive')
+    @patch('google_drive_uploader.upload_streams_to_drive')
+    def test_image_path_outside_scratch_dir_rejected(self, mock_upload_many, mock_upload_file):
+        """Test that paths outside the scratch directory, including via symlinks, are never uploaded."""
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.dict(os.environ, {'SCRATCH_DIR': tmp_dir}):
+            link = os.path.join(tmp_dir, 'environ')
+            os.symlink('/proc/self/environ', link)
+            for path in ('/proc/self/environ', os.path.join(tmp_dir, '..', 'etc', 'passwd'), link):
+                response = lambda_handler({'imagePath': path}, self.context)
+                self.assertEqual(response['statusCode'], 400)
+                self.assertIn('outside the scratch directory', json.loads(response['body'])['error'])
+            
+            response = lambda_handler({'images': [{'imagePath': '/proc/self/environ'}]}, self.context)
+        
+        self.assertEqual(response['results'][0]['statusCode'], 400)
+        mock_upload_file.assert_not_called()
+        mock_upload_many.assert_not_called()
+    
+    def test_image_key_without_storage_location(self):
+        """Test that an image key needs a storage location."""
+        with patch.dict(os.environ, {}, clear=True):
+            response = lambda_handler({'imageKey': 'screenshots/shot.png'}, self.context)
+        
+        self.assertEqual(response['statusCode'], 400)
+        body = json.loads(response['body'])
+        self.assertEqual(body['error'], 'Storage location not found for image key')
+    
+    def test_image_key_missing_object(self):
+        """Test that a missing stored object is reported as an upload failure."""
+        with tempfile.TemporaryDirectory() as storage_dir:
+            response = lambda_handler(
+                {'imageKey': 'screenshots/missing.png', 'storageLocation': storage_dir},
+                self.context
+            )
+        
+        self.assertEqual(response['statusCode'], 500)
+        self.assertIn('Failed to upload to Google Drive', json.loads(response['body'])['error'])
+
+    
+    @patch('google_drive_uploader.upload_image_to_drive')
+    def test_unchanged_page_skips_upload(self, mock_upload):
+        """Test that unchanged pages reuse the previous shareable URL."""
+        event = {
+            'url': 'https://example.com',
+            'unchanged': True,
+            'shareable_url': 'https://drive.google.com/file/d/old/view',
+            'file_id': 'old'
+        }
+        
+        response = lambda_handler(event, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(response['unchanged'])
+        self.assertEqual(response['shareable_url'], 'https://drive.google.com/file/d/old/view')
+        mock_upload.assert_not_called()
+    
+    @patch('google_drive_uploader.upload_image_to_drive')
+    def test_upload_updates_capture_index(self, mock_upload):
+        """Test that a successful upload records the perceptual hash for the URL."""
+        mock_upload.return_value = {
+            'file_id': 'new_id',
+            'shareable_url': 'https://drive.google.com/file/d/new_id/view',
+            'filename': 'screenshot.png'
+        }
+        
+        with tempfile.TemporaryDirectory() as index_dir:
+            event = {
+                'url': 'https://example.com',
+                'imageData': self.test_image_b64,
+                'perceptualHash': 'abcdabcdabcdabcd',
+                'indexLocation': index_dir
+            }
+            response = lambda_handler(event, self.context)
+            record = load_capture_record(index_dir, 'https://example.com')
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(record['perceptualHash'], 'abcdabcdabcdabcd')
+        self.assertEqual(record['file_id'], 'new_id')
+
+
+
+class AuthError(Exception):
+    """Stand-in for an HttpError carrying a 401 response."""
+    
+    def __init__(self):
+        super().__init__('Invalid Credentials')
+        self.resp = MagicMock(status=401)
+
+
+@patch.dict(os.environ, {'GOOGLE_SERVICE_ACCOUNT_KEY': '{"type": "service_account"}'})
+@patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+class TestDriveClientCache(unittest.TestCase):
+    """Test cases for reusing the Drive client across invocations."""
+    
+    def setUp(self):
+        reset_drive_service()
+        self.addCleanup(reset_drive_service)
+        patcher = patch.multiple(
+            'google_drive_uploader',
+            build=MagicMock(side_effect=lambda *args, **kwargs: MagicMock()),
+            Credentials=MagicMock(),
+            MediaIoBaseUpload=MagicMock(),
+            google_auth_httplib2=MagicMock(),
+            httplib2=MagicMock()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.credentials = google_drive_uploader.Credentials.from_service_account_info.return_value
+        self.credentials.expiry = None
+    
+    def test_service_is_reused(self):
+        """Test that warm calls reuse the service without rebuilding it."""
+        first = get_drive_service()
+        second = get_drive_service()
+        
+        self.assertIs(first, second)
+        self.assertEqual(google_drive_uploader.build.call_count, 1)
+        self.credentials.refresh.assert_not_called()
+    
+    def test_key_change_rebuilds_service(self):
+        """Test that a different service account key builds a new client."""
+        first = get_drive_service()
+        with patch.dict(os.environ, {'GOOGLE_SERVICE_ACCOUNT_KEY': '{"type": "service_account", "n": 2}'}):
+            second = get_drive_service()
+        
+        self.assertIsNot(first, second)
+    
+    def test_token_refreshed_near_expiry(self):
+        """Test that the token is refreshed only when it is about to expire."""
+        from datetime import datetime, timedelta
+        get_drive_service()
+        
+        self.credentials.expiry = datetime.utcnow() + timedelta(minutes=30)
+        get_drive_service()
+        self.credentials.refresh.assert_not_called()
+        
+        self.credentials.expiry = datetime.utcnow() + timedelta(minutes=1)
+        get_drive_service()
+        self.credentials.refresh.assert_called_once()
+    
+    def test_auth_error_rebuilds_client_and_retries(self):
+        """Test that a 401 drops the cached client and retries the request once."""
+        stale = get_drive_service()
+        stale.files().create().execute.side_effect = AuthError()
+        
+        result = upload_image_to_drive(b'image', 'test.png')
+        
+        fresh = get_drive_service()
+        self.assertIsNot(fresh, stale)
+        self.assertEqual(result['file_id'], fresh.files().create().execute.return_value.get.return_value)
+        fresh.permissions().create().execute.assert_called_once()
+
+    
+    def test_rate_limited_request_retried(self):
+        """Test that a grant rejected with a 429 is retried within the Drive limiter."""
+        from rate_limiter import RateLimiter
+        service = get_drive_service()
+        error = Exception('Rate limit exceeded')
+        error.resp = MagicMock(status=429)
+        service.permissions().create().execute.side_effect = [error, {}]
+        sleeps = []
+        limiter = RateLimiter('drive', clock=lambda: sum(sleeps), sleep=sleeps.append)
+        
+        with patch.dict('rate_limiter._limiters', {'drive': limiter}):
+            result = upload_image_to_drive(b'image', 'test.png')
+        
+        self.assertTrue(result['file_id'])
+        self.assertEqual(service.permissions().create().execute.call_count, 2)
+        self.assertEqual(len(sleeps), 1)
+
+
+class ResumableRequest:
+    """Stand-in for a resumable Drive insert request that sends one chunk per call."""
+    
+    def __init__(self, size, chunk_size, fail_statuses=()):
+        self.size = size
+        self.chunk_size = chunk_size
+        self.fail_statuses = list(fail_statuses)
+        self.resumable_uri = None
+        self.resumable_progress = 0
+        self.calls = []
+    
+    def next_chunk(self):
+        self.calls.append(self.resumable_progress)
+        if self.fail_statuses:
+            error = Exception('Session failed')
+            error.resp = MagicMock(status=self.fail_statuses.pop(0))
+            raise error
+        if self.resumable_uri is None:
+            self.resumable_uri = 'https://upload.example/session/new'
+        self.resumable_progress = min(self.resumable_progress + self.chunk_size, self.size)
+        if self.resumable_progress < self.size:
+            return MagicMock(), None
+        return None, {'id': 'big_file'}
+
+
+@patch.dict(os.environ, {'DRIVE_MULTIPART_THRESHOLD': '10'})
+@patch('google_drive_uploader.UPLOAD_CHUNK_SIZE', 8)
+@patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+class TestUploadStrategy(unittest.TestCase):
+    """Test cases for choosing between multipart and resumable uploads."""
+    
+    def setUp(self):
+        self.service = MagicMock()
+        self.service.files().create().execute.return_value = {'id': 'small_file'}
+        self.requests = []
+        self.fail_statuses = ()
+        
+        def create(body=None, media_body=None, fields=None):
+            request = ResumableRequest(20, 8, self.fail_statuses)
+            self.fail_statuses = ()
+            self.requests.append(request)
+            return request
+        
+        patcher = patch.multiple(
+            'google_drive_uploader',
+            get_drive_service=MagicMock(return_value=self.service),
+            MediaIoBaseUpload=MagicMock()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.create = create
+        self.session_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.session_dir.cleanup)
+    
+    def test_small_file_uses_multipart(self):
+        """Test that files up to the threshold are sent in one request."""
+        result = upload_image_to_drive(b'0123456789', 'small.png')
+        
+        self.assertEqual(result['file_id'], 'small_file')
+        self.assertFalse(google_drive_uploader.MediaIoBaseUpload.call_args.kwargs['resumable'])
+    
+    def test_large_file_uses_resumable_chunks(self):
+        """Test that larger files are sent in chunks through a resumable session."""
+        self.service.files().create.side_effect = self.create
+        
+        with patch.dict(os.environ, {'UPLOAD_SESSION_LOCATION': self.session_dir.name}):
+            result = upload_image_to_drive(b'x' * 20, 'large.png')
+        
+        self.assertEqual(result['file_id'], 'big_file')
+        self.assertEqual(self.requests[0].calls, [0, 8, 16])
+        self.assertTrue(google_drive_uploader.MediaIoBaseUpload.call_args.kwargs['resumable'])
+        # The session is removed once the upload completes
+        self.assertEqual(os.listdir(os.path.join(self.session_dir.name, 'sessions')), [])
+    
+    def test_saved_session_is_resumed(self):
+        """Test that a retried upload continues from the saved progress."""
+        from upload_sessions import load_upload_session, save_upload_session
+        data = b'y' * 20
+        session_id = 'sha256:' + hashlib.sha256(data).hexdigest()
+        save_upload_session(self.session_dir.name, session_id, 'https://upload.example/session/old', 16, 20)
+        self.service.files().create.side_effect = self.create
+        
+        with patch.dict(os.environ, {'UPLOAD_SESSION_LOCATION': self.session_dir.name}):
+            result = upload_image_to_drive(data, 'large.png')
+        
+        self.assertEqual(result['file_id'], 'big_file')
+        self.assertEqual(self.requests[0].calls, [16])
+        self.assertEqual(self.requests[0].resumable_uri, 'https://upload.example/session/old')
+        self.assertIsNone(load_upload_session(self.session_dir.name, session_id))
+    
+    def test_expired_session_restarts_upload(self):
+        """Test that an expired saved session is replaced by a new one."""
+        from upload_sessions import save_upload_session
+        data = b'z' * 20
+        session_id = 'sha256:' + hashlib.sha256(data).hexdigest()
+        save_upload_session(self.session_dir.name, session_id, 'https://upload.example/session/old', 8, 20)
+        self.fail_statuses = (404,)
+        self.service.files().create.side_effect = self.create
+        
+        with patch.dict(os.environ, {'UPLOAD_SESSION_LOCATION': self.session_dir.name}):
+            result = upload_image_to_drive(data, 'large.png')
+        
+        self.assertEqual(result['file_id'], 'big_file')
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1].calls, [0, 8, 16])
+
+@patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+class TestContentDedupe(unittest.TestCase):
+    """Test cases for skipping uploads of identical bytes."""
+    
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        env = patch.dict(os.environ, {'DRIVE_CONTENT_DEDUPE': 'true', 'CAPTURE_INDEX_LOCATION': self.index_dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+        
+        self.service = MagicMock()
+        self.service.files().list().execute.return_value = {'files': []}
+        self.service.files().get().execute.return_value = {'trashed': False}
+        self.service.files().create().execute.return_value = {'id': 'new_file'}
+        patcher = patch.multiple(
+            'google_drive_uploader',
+            get_drive_service=MagicMock(return_value=self.service),
+            MediaIoBaseUpload=MagicMock()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.data = b'same-bytes'
+        self.content_hash = hashlib.sha256(self.data).hexdigest()
+    
+    def test_new_content_is_uploaded_and_indexed(self):
+        """Test that new bytes are uploaded with their hash and recorded."""
+        result = upload_image_to_drive(self.data, 'a.png', 'folder')
+        
+        self.assertEqual(result['file_id'], 'new_file')
+        self.assertNotIn('deduplicated', result)
+        body = self.service.files().create.call_args.kwargs['body']
+        self.assertEqual(body['appProperties'], {'sha256': self.content_hash})
+        record = load_content_record(self.index_dir.name, self.content_hash, 'folder')
+        self.assertEqual((record['file_id'], record['folderId']), ('new_file', 'folder'))
+    
+    def test_index_hit_skips_upload(self):
+        """Test that bytes found in the content index are not uploaded again."""
+        save_content_record(self.index_dir.name, self.content_hash, 'folder',
+                            'https://drive.google.com/file/d/old_file/view', 'old_file')
+        self.service.reset_mock()
+        
+        result = upload_image_to_drive(self.data, 'a.png', 'folder')
+        
+        self.assertTrue(result['deduplicated'])
+        self.assertEqual(result['shareable_url'], 'https://drive.google.com/file/d/old_file/view')
+        self.service.files().list.assert_not_called()
+        self.service.files().create.assert_not_called()
+        self.service.permissions().create.assert_not_called()
+    
+    def test_index_record_of_other_folder_is_ignored(self):
+        """Test that an indexed upload in another folder is not reused."""
+        save_content_record(self.index_dir.name, self.content_hash, 'other',
+                            'https://drive.google.com/file/d/old_file/view', 'old_file')
+        
+        result = upload_image_to_drive(self.data, 'a.png', 'folder')
+        
+        self.assertEqual(result['file_id'], 'new_file')
+    
+    def test_records_of_several_folders_are_kept(self):
+        """Test that an upload to a second folder keeps the first folder's record."""
+        upload_image_to_drive(self.data, 'a.png', 'first')
+        self.service.files().create().execute.return_value = {'id': 'second_file'}
+        upload_image_to_drive(self.data, 'a.png', 'second')
+        self.service.reset_mock()
+        
+        result = upload_image_to_drive(self.data, 'a.png', 'first')
+        
+        self.assertEqual(result['file_id'], 'new_file')
+        self.assertTrue(result['deduplicated'])
+        self.service.files().create.assert_not_called()
+    
+    def test_trashed_index_hit_is_uploaded_again(self):
+        """Test that an indexed file that was trashed is not reused."""
+        save_content_record(self.index_dir.name, self.content_hash, 'folder',
+                            'https://drive.google.com/file/d/old_file/view', 'old_file')
+        self.service.files().get().execute.return_value = {'trashed': True}
+        
+        result = upload_image_to_drive(self.data, 'a.png', 'folder')
+        
+        self.assertEqual(result['file_id'], 'new_file')
+        self.service.files().get.assert_called_with(fileId='old_file', fields='trashed')
+    
+    def test_failed_drive_query_falls_through_to_upload(self):
+        """Test that a failed appProperties query does not fail the upload."""
+        self.service.files().list().execute.side_effect = Exception('Backend error')
+        
+        result = upload_image_to_drive(self.data, 'a.png', 'folder')
+        
+        self.assertEqual(result['file_id'], 'new_file')
+    
+    def test_drive_app_properties_hit_skips_upload(self):
+        """Test that bytes found through Drive appProperties are reused and indexed."""
+        self.service.files().list().execute.return_value = {'files': [{'id': 'drive_file'}]}
+        self.service.reset_mock()
+        
+        result = upload_image_to_drive(self.data, 'a.png', 'folder')
+        
+        self.assertEqual(result['file_id'], 'drive_file')
+        query = self.service.files().list.call_args.kwargs['q']
+        self.assertIn(f"value='{self.content_hash}'", query)
+        self.assertIn("'folder' in parents", query)
+        self.service.files().create.assert_not_called()
+        self.assertEqual(load_content_record(self.index_dir.name, self.content_hash, 'folder')['file_id'], 'drive_file')
+    
+    def test_batch_skips_sharing_duplicates(self):
+        """Test that deduplicated files in a batch are not shared again."""
+        save_content_record(self.index_dir.name, self.content_hash, None,
+                            'https://drive.google.com/file/d/old_file/view', 'old_file')
+        batch = MagicMock()
+        self.service.new_batch_http_request.return_value = batch
+        
+        results = google_drive_uploader.upload_streams_to_drive([
+            (io.BytesIO(self.data), 'a.png', 'image/png'),
+            (io.BytesIO(b'other-bytes'), 'b.png', 'image/png')
+        ])
+        
+        self.assertTrue(results[0]['deduplicated'])
+        self.assertEqual(results[1]['file_id'], 'new_file')
+        self.assertEqual([c.kwargs['request_id'] for c in batch.add.call_args_list], ['new_file'])
+
+@patch.dict(os.environ, {'DRIVE_SHARE_MODE': 'folder'})
+@patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+class TestFolderSharing(unittest.TestCase):
+    """Test cases for sharing the target folder instead of every file."""
+    
+    def setUp(self):
+        self.service = MagicMock()
+        self.service.files().create().execute.return_value = {'id': 'file_id'}
+        self.service.permissions().list().execute.return_value = {'permissions': [{'type': 'user', 'role': 'owner'}]}
+        self.service.reset_mock()
+        patcher = patch.multiple(
+            'google_drive_uploader',
+            get_drive_service=MagicMock(return_value=self.service),
+            MediaIoBaseUpload=MagicMock(),
+            _shared_folders=set()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_folder_shared_once(self):
+        """Test that the folder is shared on first use and files skip permission calls."""
+        upload_image_to_drive(b'image', 'a.png', 'folder')
+        upload_image_to_drive(b'image', 'b.png', 'folder')
+        
+        self.service.permissions().list.assert_called_once_with(fileId='folder', fields='permissions(type,role)')
+        self.service.permissions().create.assert_called_once_with(
+            fileId='folder', body=google_drive_uploader.PUBLIC_READER_PERMISSION
+        )
+    
+    def test_already_public_folder_is_not_shared_again(self):
+        """Test that a folder that is already public gets no new permission."""
+        self.service.permissions().list().execute.return_value = {'permissions': [{'type': 'anyone', 'role': 'reader'}]}
+        
+        upload_image_to_drive(b'image', 'a.png', 'folder')
+        
+        self.service.permissions().create.assert_not_called()
+    
+    def test_upload_without_folder_shares_file(self):
+        """Test that uploads without a folder still share the file itself."""
+        upload_image_to_drive(b'image', 'a.png')
+        
+        self.service.permissions().list.assert_not_called()
+        self.service.permissions().create.assert_called_once_with(
+            fileId='file_id', body=google_drive_uploader.PUBLIC_READER_PERMISSION
+        )
+    
+    def test_failed_folder_share_uploads_nothing(self):
+        """Test that a folder that cannot be shared fails before any file is created."""
+        self.service.permissions().list().execute.side_effect = Exception('Insufficient permissions')
+        
+        with self.assertRaises(Exception):
+            upload_image_to_drive(b'image', 'a.png', 'folder')
+        with self.assertRaises(Exception):
+            google_drive_uploader.upload_streams_to_drive([(io.BytesIO(b'image'), 'a.png', 'image/png')], 'folder')
+        
+        self.service.files().create.assert_not_called()
+    
+    def test_batch_upload_skips_grants(self):
+        """Test that batch uploads into a shared folder send no batch request."""
+        google_drive_uploader._shared_folders.add('folder')
+        
+        results = google_drive_uploader.upload_streams_to_drive([(io.BytesIO(b'image'), 'a.png', 'image/png')], 'folder')
+        
+        self.assertEqual(results[0]['file_id'], 'file_id')
+        self.service.new_batch_http_request.assert_not_called()
+        self.service.permissions().list.assert_not_called()
+
+
+class FakeBatch:
+    """Stand-in for a Drive BatchHttpRequest that answers every call."""
+    
+    def __init__(self, callback, failing_ids=(), error=None):
+        self.callback = callback
+        self.failing_ids = failing_ids
+        self.error = error or Exception('Permission denied')
+        self.requests = []
+        self.executed = 0
+    
+    def add(self, request, request_id=None):
+        self.requests.append(request_id)
+    
+    def execute(self):
+        self.executed += 1
+        for request_id in self.requests:
+            error = self.error if request_id in self.failing_ids else None
+            self.callback(request_id, None if error else {'id': 'perm'}, error)
+
+
+@patch('google_drive_uploader.GOOGLE_DRIVE_AVAILABLE', True)
+class TestBatchUpload(unittest.TestCase):
+    """Test cases for uploading several images in one event."""
+    
+    def setUp(self):
+        self.image_b64 = base64.b64encode(b'image-bytes').decode('utf-8')
+        self.service = MagicMock()
+        self.service.files().create().execute.side_effect = [{'id': 'file_1'}, {'id': 'file_2'}]
+        self.batches = []
+        self.failing_ids = ()
+        self.batch_error = None
+        
+        def new_batch(callback):
+            batch = FakeBatch(callback, self.failing_ids, self.batch_error)
+            self.batches.append(batch)
+            return batch
+        
+        self.service.new_batch_http_request.side_effect = new_batch
+        patcher = patch.multiple(
+            'google_drive_uploader',
+            get_drive_service=MagicMock(return_value=self.service),
+            MediaIoBaseUpload=MagicMock()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_batch_upload_shares_files_in_one_request(self):
+        """Test that permission grants for all uploads go through one batch request."""
+        event = {
+            'images': [
+                {'imageData': self.image_b64, 'filename': 'a.png'},
+                {'unchanged': True, 'shareable_url': 'https://drive.google.com/file/d/old/view', 'file_id': 'old'},
+                {'filename': 'missing.png'},
+                {'imageData': self.image_b64, 'filename': 'b.webp'}
+            ],
+            'folderId': 'folder_id'
+        }
+        
+        response = lambda_handler(event, {})
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual([r['statusCode'] for r in response['results']], [200, 200, 400, 200])
+        self.assertEqual(response['results'][0]['file_id'], 'file_1')
+        self.assertEqual(response['results'][3]['shareable_url'], 'https://drive.google.com/file/d/file_2/view')
+        self.assertTrue(response['results'][1]['unchanged'])
+        self.assertEqual(response['uploadedCount'], 3)
+        self.assertEqual(response['failedCount'], 1)
+        
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(self.batches[0].requests, ['file_1', 'file_2'])
+        self.assertEqual(self.batches[0].executed, 1)
+        self.service.permissions().create().execute.assert_not_called()
+        mime_types = [c.kwargs['mimetype'] for c in google_drive_uploader.MediaIoBaseUpload.call_args_list]
+        self.assertEqual(mime_types, ['image/png', 'image/webp'])
+    
+    def test_failed_grant_fails_only_that_image(self):
+        """Test that a failed permission grant is reported for its image."""
+        self.failing_ids = ('file_2',)
+        event = {'images': [{'imageData': self.image_b64}, {'imageData': self.image_b64}]}
+        
+        response = lambda_handler(event, {})
+        
+        self.assertEqual([r['statusCode'] for r in response['results']], [200, 500])
+        self.assertIn('Permission denied', response['results'][1]['error'])
+    
+    def test_rate_limited_grant_in_batch_is_retried(self):
+        """Test that a grant rejected by the rate limit inside a batch is sent again through the limiter."""
+        from rate_limiter import RateLimiter
+        self.failing_ids = ('file_2',)
+        self.batch_error = Exception('Rate limit exceeded')
+        self.batch_error.resp = MagicMock(status=429)
+        self.batch_error.resp.get.side_effect = {'retry-after': '3'}.get
+        sleeps = []
+        limiter = RateLimiter('drive', clock=lambda: sum(sleeps), sleep=sleeps.append)
+        event = {'images': [{'imageData': self.image_b64}, {'imageData': self.image_b64}]}
+        
+        with patch.dict('rate_limiter._limiters', {'drive': limiter}), \
+             patch('rate_limiter.random.uniform', return_value=0.5):
+            response = lambda_handler(event, {})
+        
+        self.assertEqual([r['statusCode'] for r in response['results']], [200, 200])
+        self.service.permissions().create.assert_called_with(
+            fileId='file_2', body=google_drive_uploader.PUBLIC_READER_PERMISSION
+        )
+        self.service.permissions().create().execute.assert_called_once()
+        self.assertEqual(sleeps, [3.5])
+    
+    def test_failed_batch_request_fails_its_images(self):
+        """Test that a batch request that raises is reported for every image it carried."""
+        self.service.new_batch_http_request.side_effect = None
+        self.service.new_batch_http_request.return_value.execute.side_effect = Exception('Backend error')
+        event = {'images': [{'imageData': self.image_b64}, {'imageData': self.image_b64}]}
+        
+        response = lambda_handler(event, {})
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual([r['statusCode'] for r in response['results']], [500, 500])
+        self.assertIn('Backend error', response['results'][0]['error'])
+    
+    def test_streams_opened_one_at_a_time(self):
+        """Test that each stream is opened just before its upload and closed after it."""
+        events = []
+        
+        def source(name):
+            @contextlib.contextmanager
+            def open_stream():
+                events.append(f'open {name}')
+                yield io.BytesIO(b'image-bytes')
+                events.append(f'close {name}')
+            return open_stream
+        
+        google_drive_uploader.upload_streams_to_drive([(source('a'), 'a.png', None), (source('b'), 'b.png', None)])
+        
+        self.assertEqual(events, ['open a', 'close a', 'open b', 'close b'])
+    
+    def test_empty_image_list(self):
+        """Test handling of an empty image list."""
+        response = lambda_handler({'images': []}, {})
+        
+        self.assertEqual(response['statusCode'], 400)
+        self.assertEqual(json.loads(response['body'])['error'], 'Images not found in input')
+
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
+
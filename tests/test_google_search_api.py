@@ -10,7 +10,9 @@ from unittest.mock import patch, Mock, mock_open
 # Add the src directory to Python path to import the Lambda function
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
 
+import google_search_api
 from google_search_api import lambda_handler, perform_google_search, extract_urls_from_results
+from rate_limiter import RateLimiter
 
 
 class TestGoogleSearchApi(unittest.TestCase):
@@ -241,6 +243,31 @@ class TestGoogleSearchApi(unittest.TestCase):
         
         self.assertIsNone(result)
     
+    @patch('urllib.request.urlopen')
+    def test_perform_google_search_rate_limited(self, mock_urlopen):
+        """Test that a 429 response is retried after its Retry-After delay."""
+        from urllib.error import HTTPError
+        
+        mock_response = Mock()
+        mock_response.status = 200
+        mock_response.read.return_value = json.dumps(self.mock_search_results).encode('utf-8')
+        ok = Mock()
+        ok.__enter__ = Mock(return_value=mock_response)
+        ok.__exit__ = Mock(return_value=False)
+        mock_urlopen.side_effect = [
+            HTTPError(url='test_url', code=429, msg='Too Many Requests', hdrs={'Retry-After': '2'}, fp=None),
+            ok
+        ]
+        
+        sleeps = []
+        limiter = RateLimiter('search', clock=lambda: sum(sleeps), sleep=sleeps.append)
+        with patch.dict('rate_limiter._limiters', {'search': limiter}):
+            result = perform_google_search('test search', self.mock_api_key, self.mock_search_engine_id)
+        
+        self.assertEqual(len(result['items']), 5)
+        self.assertEqual(len(sleeps), 1)
+        self.assertGreaterEqual(sleeps[0], 2)
+    
     @patch('urllib.request.urlopen')
     def test_perform_google_search_invalid_json(self, mock_urlopen):
         """Test Google search API invalid JSON response handling."""
@@ -255,5 +282,107 @@ class TestGoogleSearchApi(unittest.TestCase):
         self.assertIsNone(result)
 
 
+
+class TestSearchCache(unittest.TestCase):
+    """Test cases for caching search results."""
+    
+    def setUp(self):
+        self.results = {'items': [{'link': 'https://example1.com'}]}
+        response = Mock()
+        response.status = 200
+        response.read.return_value = json.dumps(self.results).encode('utf-8')
+        patcher = patch('urllib.request.urlopen')
+        self.mock_urlopen = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_urlopen.return_value.__enter__.return_value = response
+        cache = patch.dict(google_search_api._result_cache, clear=True)
+        cache.start()
+        self.addCleanup(cache.stop)
+        env = patch.dict(os.environ, {'SEARCH_CACHE_TTL_SECONDS': '600'})
+        env.start()
+        self.addCleanup(env.stop)
+    
+    def search(self, search_word, search_engine_id='cx'):
+        return perform_google_search(search_word, 'key', search_engine_id)
+    
+    def test_normalized_query_served_from_memory(self):
+        """Test that repeated searches differing only in case and spacing hit the cache."""
+        self.assertEqual(self.search('Python  Tutorial'), self.results)
+        self.assertEqual(self.search(' python tutorial '), self.results)
+        self.assertEqual(self.search('ｐｙｔｈｏｎ　tutorial'), self.results)
+        
+        self.assertEqual(self.mock_urlopen.call_count, 1)
+    
+    def test_parameters_are_part_of_key(self):
+        """Test that another search engine is not served from the cache."""
+        self.search('python')
+        self.search('python', search_engine_id='other')
+        
+        self.assertEqual(self.mock_urlopen.call_count, 2)
+    
+    def test_expired_results_refetched(self):
+        """Test that results older than the TTL are fetched again."""
+        with patch('google_search_api.time.time', return_value=1000):
+            self.search('python')
+        with patch('google_search_api.time.time', return_value=1601):
+            self.search('python')
+        
+        self.assertEqual(self.mock_urlopen.call_count, 2)
+    
+    def test_least_recently_used_evicted(self):
+        """Test that the memory tier keeps at most SEARCH_CACHE_MAX_ENTRIES results."""
+        with patch.dict(os.environ, {'SEARCH_CACHE_MAX_ENTRIES': '2'}):
+            self.search('a')
+            self.search('b')
+            self.search('a')
+            self.search('c')  # evicts 'b'
+            self.search('a')
+            self.search('b')
+        
+        self.assertEqual(self.mock_urlopen.call_count, 4)
+    
+    def test_persistent_tier_shared_by_containers(self):
+        """Test that a new container reads results cached by another one."""
+        import tempfile
+        with tempfile.TemporaryDirectory() as location, \
+             patch.dict(os.environ, {'SEARCH_CACHE_LOCATION': location}):
+            self.search('python')
+            google_search_api._result_cache.clear()
+            
+            self.assertEqual(self.search('python'), self.results)
+        
+        self.assertEqual(self.mock_urlopen.call_count, 1)
+    
+    def test_malformed_persistent_record_is_a_miss(self):
+        """Test that a partial cache object falls back to the API instead of failing."""
+        import tempfile
+        with tempfile.TemporaryDirectory() as location, \
+             patch.dict(os.environ, {'SEARCH_CACHE_LOCATION': location}):
+            self.search('python')
+            google_search_api._result_cache.clear()
+            (name,) = os.listdir(os.path.join(location, 'search-cache'))
+            with open(os.path.join(location, 'search-cache', name), 'w', encoding='utf-8') as f:
+                json.dump({'searchWord': 'python'}, f)
+            
+            self.assertEqual(self.search('python'), self.results)
+        
+        self.assertEqual(self.mock_urlopen.call_count, 2)
+    
+    def test_failures_not_cached(self):
+        """Test that failed searches are retried on the next call."""
+        from urllib.error import HTTPError
+        self.mock_urlopen.side_effect = [HTTPError('url', 500, 'Server Error', {}, None), self.mock_urlopen.return_value]
+        
+        self.assertIsNone(self.search('python'))
+        self.assertEqual(self.search('python'), self.results)
+    
+    def test_disabled_without_ttl(self):
+        """Test that every search calls the API when no TTL is set."""
+        with patch.dict(os.environ, {'SEARCH_CACHE_TTL_SECONDS': '0'}):
+            self.search('python')
+            self.search('python')
+        
+        self.assertEqual(self.mock_urlopen.call_count, 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
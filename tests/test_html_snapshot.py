@@ -0,0 +1,97 @@
+"""
+Unit tests for html_snapshot module.
+"""
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from browser_manager import BrowserManager
+from html_snapshot import HtmlSnapshot, load_snapshot
+from object_store import LocalObjectStore
+from fake_browser import FakeLauncher
+
+PAGE_URL = 'https://example.com/news/article'
+
+SNAPSHOT_HTML = (
+    '<html><head><title>Archived</title><script src="https://cdn.example.net/live.js"></script></head>'
+    '<body><img src="images/photo.png"><img src="data:image/png;base64,AAAA"></body></html>'
+)
+
+
+def write_snapshot(root, key='snapshots/article'):
+    """Store a snapshot whose relative image is archived and whose script is not."""
+    store = LocalObjectStore(root)
+    store.put(f'{key}/index.html', SNAPSHOT_HTML.encode('utf-8'))
+    store.put(f'{key}/assets/photo.png', b'png-bytes')
+    store.put(f'{key}/manifest.json', json.dumps({
+        'assets': {
+            'https://example.com/news/images/photo.png': {'key': f'{key}/assets/photo.png', 'contentType': 'image/png'}
+        }
+    }).encode('utf-8'))
+    return key
+
+
+class TestHtmlSnapshot(unittest.TestCase):
+    """Test cases for loading snapshots."""
+    
+    def test_html_with_base(self):
+        """Test that a base tag is added once, inside head when present."""
+        snapshot = HtmlSnapshot('<html><HEAD lang="ja"><title>t</title></HEAD></html>', PAGE_URL)
+        self.assertEqual(
+            snapshot.html_with_base(),
+            f'<html><HEAD lang="ja"><base href="{PAGE_URL}"><title>t</title></HEAD></html>'
+        )
+        self.assertEqual(HtmlSnapshot('<p>x</p>', PAGE_URL).html_with_base(), f'<base href="{PAGE_URL}"><p>x</p>')
+        existing = '<head><base href="https://other.example/"></head>'
+        self.assertEqual(HtmlSnapshot(existing, PAGE_URL).html_with_base(), existing)
+    
+    def test_base_href_is_escaped(self):
+        """Test that quotes and angle brackets in the URL cannot break the base tag."""
+        snapshot = HtmlSnapshot('<p>x</p>', 'https://example.com/a"><script>?q=1&r=2')
+        self.assertEqual(
+            snapshot.html_with_base(),
+            '<base href="https://example.com/a&quot;&gt;&lt;script&gt;?q=1&amp;r=2"><p>x</p>'
+        )
+    
+    def test_load_snapshot(self):
+        """Test loading the HTML and archived assets from an object store."""
+        with tempfile.TemporaryDirectory() as root:
+            key = write_snapshot(root)
+            snapshot = load_snapshot(root, key + '/', PAGE_URL)
+            
+            self.assertEqual(snapshot.html, SNAPSHOT_HTML)
+            self.assertEqual(snapshot.asset('https://example.com/news/images/photo.png'), (b'png-bytes', 'image/png'))
+            self.assertIsNone(snapshot.asset('https://cdn.example.net/live.js'))
+    
+    def test_missing_snapshot(self):
+        """Test that a missing snapshot is reported."""
+        with tempfile.TemporaryDirectory() as root:
+            with self.assertRaises(FileNotFoundError):
+                load_snapshot(root, 'snapshots/missing', PAGE_URL)
+    
+    def test_render_snapshot_offline(self):
+        """Test that a snapshot is rendered from the archive without network requests."""
+        launcher = FakeLauncher()
+        manager = BrowserManager(launcher=launcher)
+        
+        with tempfile.TemporaryDirectory() as root:
+            snapshot = load_snapshot(root, write_snapshot(root), PAGE_URL)
+            result = manager.run(manager.capture(
+                PAGE_URL, os.path.join(root, 'shot.png'), {'snapshot': snapshot}
+            ))
+        manager.run(manager.close())
+        
+        self.assertEqual(result['snapshot'], {'servedAssets': 1, 'missingAssets': 1})
+        browser = launcher.browsers[0]
+        self.assertEqual(browser.loaded_urls, [])
+        self.assertEqual(browser.contexts[0].pages[0].requested, ['data:image/png;base64,AAAA'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Unit tests for image_processing module.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+
+from image_processing import PIL_AVAILABLE, encode_image, normalize_format, mime_type_for_format, compute_dhash, detect_mime_type
+
+if PIL_AVAILABLE:
+    from PIL import Image
+
+
+class TestImageFormats(unittest.TestCase):
+    """Test cases for format helpers."""
+    
+    def test_normalize_format(self):
+        """Test format name normalization."""
+        self.assertEqual(normalize_format('WebP'), 'webp')
+        self.assertEqual(normalize_format('jpg'), 'jpeg')
+        self.assertEqual(normalize_format(None), 'png')
+        with self.assertRaises(ValueError):
+            normalize_format('gif')
+    
+    def test_mime_type_for_format(self):
+        """Test MIME types for output formats."""
+        self.assertEqual(mime_type_for_format('png'), 'image/png')
+        self.assertEqual(mime_type_for_format('webp'), 'image/webp')
+        self.assertEqual(mime_type_for_format('jpg'), 'image/jpeg')
+    
+    def test_detect_mime_type(self):
+        """Test MIME detection from file signatures."""
+        self.assertEqual(detect_mime_type(b'\x89PNG\r\n\x1a\n\x00\x00\x00\x0d'), 'image/png')
+        self.assertEqual(detect_mime_type(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01'), 'image/jpeg')
+        self.assertEqual(detect_mime_type(b'RIFF\x24\x00\x00\x00WEBP'), 'image/webp')
+        self.assertEqual(detect_mime_type(b'GIF89a\x01\x00\x01\x00'), 'image/gif')
+        self.assertIsNone(detect_mime_type(b'RIFF\x24\x00\x00\x00WAVE'))
+        self.assertIsNone(detect_mime_type(b''))
+    
+    @unittest.skipIf(PIL_AVAILABLE, "Pillow is installed")
+    def test_encode_without_pillow(self):
+        """Test that encoding requires Pillow."""
+        with self.assertRaises(ImportError):
+            encode_image('/tmp/missing.png', 'webp')
+
+
+@unittest.skipUnless(PIL_AVAILABLE, "Requires Pillow")
+class TestEncodeImage(unittest.TestCase):
+    """Test cases for encode_image."""
+    
+    def setUp(self):
+        """Create a source PNG."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.temp_dir.name, 'shot.png')
+        image = Image.new('RGB', (1200, 3000), color='white')
+        for y in range(0, 3000, 50):
+            image.paste((y % 255, 80, 160), (0, y, 1200, y + 10))
+        image.save(self.source_path, 'PNG')
+    
+    def tearDown(self):
+        """Remove temporary files."""
+        self.temp_dir.cleanup()
+    
+    def test_webp_with_downscale_and_thumbnails(self):
+        """Test WebP output, downscaling and thumbnails from one decode."""
+        result = encode_image(
+            self.source_path, 'webp', quality=70, max_width=600,
+            thumbnail_sizes=[(300, 300), (100, 100)]
+        )
+        
+        self.assertEqual(result['imagePath'], os.path.join(self.temp_dir.name, 'shot.webp'))
+        self.assertEqual(result['mimeType'], 'image/webp')
+        self.assertEqual((result['width'], result['height']), (600, 1500))
+        self.assertFalse(os.path.exists(self.source_path))
+        
+        with Image.open(result['imagePath']) as encoded:
+            self.assertEqual(encoded.format, 'WEBP')
+        
+        self.assertEqual(len(result['thumbnails']), 2)
+        self.assertEqual(result['thumbnails'][0]['height'], 300)
+        self.assertEqual(result['thumbnails'][1]['height'], 100)
+        self.assertTrue(result['thumbnails'][0]['path'].endswith('shot_thumb_300x300.webp'))
+    
+    def test_webp_beyond_size_limit_falls_back_to_png(self):
+        """Test that images taller than WebP allows are encoded as PNG."""
+        tall_path = os.path.join(self.temp_dir.name, 'tall.png')
+        Image.new('RGB', (100, 17000), color='white').save(tall_path, 'PNG')
+        
+        result = encode_image(tall_path, 'webp', thumbnail_sizes=[(50, 50)])
+        
+        self.assertEqual(result['imagePath'], tall_path)
+        self.assertEqual(result['mimeType'], 'image/png')
+        self.assertEqual(result['thumbnails'][0]['mimeType'], 'image/png')
+        with Image.open(result['imagePath']) as encoded:
+            self.assertEqual(encoded.format, 'PNG')
+    
+    def test_jpeg_output(self):
+        """Test JPEG output ignores palette quantization."""
+        result = encode_image(self.source_path, 'jpeg', palette_colors=16)
+        
+        self.assertTrue(result['imagePath'].endswith('.jpg'))
+        with Image.open(result['imagePath']) as encoded:
+            self.assertEqual(encoded.format, 'JPEG')
+    
+    def test_png_palette_in_place(self):
+        """Test palette quantized PNG overwrites the source path."""
+        result = encode_image(self.source_path, 'png', palette_colors=32)
+        
+        self.assertEqual(result['imagePath'], self.source_path)
+        with Image.open(result['imagePath']) as encoded:
+            self.assertEqual(encoded.mode, 'P')
+
+    
+    def test_dhash_stable_across_encodings(self):
+        """Test that re-encoding keeps the perceptual hash while content changes alter it."""
+        original_hash = compute_dhash(self.source_path)
+        self.assertEqual(len(original_hash), 16)
+        
+        result = encode_image(self.source_path, 'webp', quality=90)
+        self.assertLessEqual(bin(int(original_hash, 16) ^ int(compute_dhash(result['imagePath']), 16)).count('1'), 2)
+        
+        changed_path = os.path.join(self.temp_dir.name, 'changed.png')
+        gradient = Image.linear_gradient('L').rotate(-90).resize((1200, 3000)).convert('RGB')
+        gradient.save(changed_path)
+        self.assertNotEqual(compute_dhash(changed_path), original_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
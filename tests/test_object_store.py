@@ -0,0 +1,108 @@
+"""
+Unit tests for object_store helpers.
+"""
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+
+from object_store import LocalObjectStore, S3ObjectStore, get_object_store
+
+
+class TestObjectStore(unittest.TestCase):
+    """Test cases for object_store helpers."""
+    
+    def test_local_put_and_exists(self):
+        """Test storing bytes in a local object store."""
+        with tempfile.TemporaryDirectory() as root:
+            store = LocalObjectStore(root)
+            
+            self.assertFalse(store.exists('a/b/c.bin'))
+            location = store.put('a/b/c.bin', b'hello')
+            
+            self.assertEqual(location, os.path.join(root, 'a', 'b', 'c.bin'))
+            self.assertTrue(store.exists('a/b/c.bin'))
+            with open(location, 'rb') as f:
+                self.assertEqual(f.read(), b'hello')
+            self.assertFalse(os.path.exists(location + '.partial'))
+    
+    def test_local_put_file_and_open(self):
+        """Test copying a file into the store and streaming it back."""
+        with tempfile.TemporaryDirectory() as root, tempfile.NamedTemporaryFile(delete=False) as source:
+            source.write(b'image-bytes')
+            source.close()
+            store = LocalObjectStore(root)
+            
+            store.put_file('shots/a.png', source.name)
+            with store.open('shots/a.png') as stream:
+                self.assertEqual(stream.read(5), b'image')
+                self.assertEqual(stream.read(), b'-bytes')
+            os.remove(source.name)
+    
+    def test_delete(self):
+        """Test deleting objects, ignoring missing ones."""
+        with tempfile.TemporaryDirectory() as root:
+            store = LocalObjectStore(root)
+            store.put('a.json', b'{}')
+            
+            store.delete('a.json')
+            store.delete('a.json')
+            self.assertFalse(store.exists('a.json'))
+        
+        client = MagicMock()
+        S3ObjectStore('bucket', 'sessions', client=client).delete('a.json')
+        client.delete_object.assert_called_once_with(Bucket='bucket', Key='sessions/a.json')
+    
+    def test_s3_put_file_and_open(self):
+        """Test S3 file upload and download into a seekable temp file."""
+        client = MagicMock()
+        client.download_fileobj.side_effect = lambda bucket, key, f: f.write(b'payload')
+        store = S3ObjectStore('bucket', 'images', client=client)
+        
+        location = store.put_file('a.webp', '/tmp/a.webp', content_type='image/webp')
+        self.assertEqual(location, 's3://bucket/images/a.webp')
+        client.upload_file.assert_called_once_with(
+            '/tmp/a.webp', 'bucket', 'images/a.webp', ExtraArgs={'ContentType': 'image/webp'}
+        )
+        
+        with store.open('a.webp') as stream:
+            self.assertEqual(stream.read(), b'payload')
+            stream.seek(0)
+            self.assertEqual(stream.read(3), b'pay')
+    
+    def test_s3_put_uses_prefix(self):
+        """Test that S3 keys are placed under the store prefix."""
+        client = MagicMock()
+        store = S3ObjectStore('bucket', 'archive/', client=client)
+        
+        location = store.put('dt=2024-01-01/part.ndjson.gz', b'data', content_type='application/gzip')
+        
+        self.assertEqual(location, 's3://bucket/archive/dt=2024-01-01/part.ndjson.gz')
+        client.put_object.assert_called_once_with(
+            Bucket='bucket',
+            Key='archive/dt=2024-01-01/part.ndjson.gz',
+            Body=b'data',
+            ContentType='application/gzip'
+        )
+    
+    def test_s3_exists_handles_missing_object(self):
+        """Test exists() returns False when head_object fails."""
+        client = MagicMock()
+        client.head_object.side_effect = Exception('404')
+        store = S3ObjectStore('bucket', client=client)
+        
+        self.assertFalse(store.exists('missing'))
+    
+    def test_get_object_store(self):
+        """Test store selection from a location string."""
+        self.assertIsInstance(get_object_store('/tmp/archive'), LocalObjectStore)
+        with self.assertRaises(ValueError):
+            get_object_store('')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,11 +7,18 @@ import sys
 import os
 import tempfile
 import base64
+from unittest.mock import patch
 
 # Add the src directory to Python path to import the Lambda function
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+sys.path.insert(0, os.path.dirname(__file__))
 
-from page_capture import lambda_handler, capture_page_screenshot, create_placeholder_image
+from page_capture import lambda_handler, capture_page_screenshot, create_placeholder_image, _max_concurrent_tabs, _image_options
+from browser_manager import BrowserManager
+from capture_index import save_capture_record
+from fake_browser import FakeLauncher, LocalHTTPServer, FAKE_PNG
+from image_processing import PIL_AVAILABLE
+from object_store import LocalObjectStore
 
 
 class TestPageCapture(unittest.TestCase):
@@ -38,10 +45,10 @@ class TestPageCapture(unittest.TestCase):
         self.assertEqual(body['url'], 'https://example.com')
         self.assertEqual(body['message'], 'Page screenshot captured successfully')
         
-        # Verify image file exists and is not empty
+        # Verify the image file was cleaned up after being returned
         image_path = response['imagePath']
-        self.assertTrue(os.path.exists(image_path))
-        self.assertGreater(os.path.getsize(image_path), 0)
+        self.assertFalse(os.path.exists(image_path))
+        self.assertEqual(response['scratchUsage']['trackedBytes'], 0)
         
         # Verify base64 data is valid
         image_data = response['imageData']
@@ -188,6 +195,392 @@ class TestPageCapture(unittest.TestCase):
         self.assertIsNotNone(response['imagePath'])
         self.assertIsNotNone(response['imageData'])
 
+    
+    def test_browser_engine_reuses_browser(self):
+        """Test that the browser engine captures via the shared browser manager."""
+        launcher = FakeLauncher()
+        manager = BrowserManager(launcher=launcher)
+        pages = {'/page': '<html><body>content</body></html>'}
+        
+        with LocalHTTPServer(pages) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser'}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            for _ in range(2):
+                response = lambda_handler({'url': server.url('/page')}, self.context)
+                self.assertEqual(response['statusCode'], 200)
+                self.assertEqual(base64.b64decode(response['imageData']), FAKE_PNG)
+        
+        self.assertEqual(manager.launch_count, 1)
+        self.assertEqual(len(launcher.browsers[0].loaded_urls), 2)
+        manager.run(manager.close())
+
+    
+    def test_batch_capture_placeholder(self):
+        """Test capturing a list of URLs with per-URL results."""
+        event = {'urls': ['https://example.com/a', 'not-a-url', 'https://example.com/b']}
+        
+        response = lambda_handler(event, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['capturedCount'], 2)
+        self.assertEqual(response['failedCount'], 1)
+        results = response['results']
+        self.assertEqual([r['url'] for r in results], event['urls'])
+        self.assertEqual([r['statusCode'] for r in results], [200, 400, 200])
+        self.assertNotEqual(results[0]['imagePath'], results[2]['imagePath'])
+        self.assertFalse(os.path.exists(results[0]['imagePath']))
+        self.assertEqual(response['scratchUsage']['trackedFiles'], 0)
+        self.assertGreater(len(base64.b64decode(results[2]['imageData'])), 0)
+        
+        body = json.loads(response['body'])
+        self.assertNotIn('imageData', body['results'][0])
+        self.assertEqual(body['capturedCount'], 2)
+    
+    def test_batch_capture_finish_failure_is_per_url(self):
+        """Test that a URL failing to be stored fails alone and leaves nothing behind."""
+        from object_store import LocalObjectStore
+        original_put_file = LocalObjectStore.put_file
+        
+        def put_file(store, key, file_path, content_type=None):
+            if '_1.' in key:
+                raise OSError('disk full')
+            return original_put_file(store, key, file_path, content_type)
+        
+        with tempfile.TemporaryDirectory() as storage_dir, \
+             patch.object(LocalObjectStore, 'put_file', put_file):
+            event = {'urls': ['https://example.com/a', 'https://example.com/b'], 'storageLocation': storage_dir}
+            response = lambda_handler(event, self.context)
+            stored = [name for _, _, names in os.walk(storage_dir) for name in names]
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual([r['statusCode'] for r in response['results']], [200, 500])
+        self.assertIn('disk full', response['results'][1]['error'])
+        self.assertEqual(response['failedCount'], 1)
+        self.assertEqual(len(stored), 1)
+        self.assertEqual(response['scratchUsage']['trackedFiles'], 0)
+    
+    def test_batch_capture_empty_list(self):
+        """Test handling of an empty URL list."""
+        response = lambda_handler({'urls': []}, self.context)
+        
+        self.assertEqual(response['statusCode'], 400)
+        body = json.loads(response['body'])
+        self.assertEqual(body['error'], 'URLs not found in input')
+    
+    def test_batch_capture_browser_parallel_tabs(self):
+        """Test that a batch shares one browser and opens tabs in parallel."""
+        launcher = FakeLauncher()
+        manager = BrowserManager(launcher=launcher)
+        pages = {f'/p{i}': f'<html><body>{i}</body></html>' for i in range(5)}
+        
+        with LocalHTTPServer(pages) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser', 'CAPTURE_MAX_TABS': '3'}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            urls = [server.url(f'/p{i}') for i in range(5)] + [server.url('/missing')]
+            response = lambda_handler({'urls': urls}, self.context)
+        
+        self.assertEqual(response['capturedCount'], 5)
+        self.assertEqual(response['results'][5]['statusCode'], 500)
+        self.assertEqual(manager.launch_count, 1)
+        self.assertEqual(launcher.browsers[0].max_open_pages, 3)
+        manager.run(manager.close())
+    
+    def test_resource_policy_from_environment(self):
+        """Test that the browser engine applies the configured resource policy."""
+        launcher = FakeLauncher()
+        manager = BrowserManager(launcher=launcher)
+        pages = {'/page': '<html><body><img src="/a.png"><video src="/v.mp4"></video></body></html>', '/a.png': 'img'}
+        
+        with LocalHTTPServer(pages) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser', 'CAPTURE_RESOURCE_POLICY': 'default'}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            response = lambda_handler({'url': server.url('/page')}, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['resourceStats']['blockedByType'], {'media': 1})
+        self.assertEqual(json.loads(response['body'])['resourceStats']['allowedRequests'], 1)
+        manager.run(manager.close())
+    
+    def test_adaptive_readiness_from_environment(self):
+        """Test that the readiness signal is reported for browser captures."""
+        manager = BrowserManager(launcher=FakeLauncher())
+        pages = {'/page': '<html><body>content</body></html>'}
+        readiness = json.dumps({'quietMs': 20, 'pollMs': 10})
+        
+        with LocalHTTPServer(pages) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser', 'CAPTURE_READINESS': readiness}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            response = lambda_handler({'url': server.url('/page')}, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['readiness']['signal'], 'dom-quiet')
+        self.assertIn('waitedMs', json.loads(response['body'])['readiness'])
+        manager.run(manager.close())
+    
+    def test_combined_mode_returns_rendered_text(self):
+        """Test that the screenshot load also yields a scrapedData-shaped item."""
+        manager = BrowserManager(launcher=FakeLauncher())
+        pages = {'/article': (
+            '<html><head><title> Example  Article </title><script>var x = 1;</script></head>'
+            '<body><nav>Menu</nav><main><h1>Heading</h1>\n<p>Body   text.</p></main><footer>Footer</footer></body></html>'
+        )}
+        
+        with LocalHTTPServer(pages) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser'}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            url = server.url('/article')
+            response = lambda_handler({'url': url, 'extractText': True}, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        item = response['scrapedItem']
+        self.assertEqual(item['title'], 'Example Article')
+        self.assertEqual(item['url'], url)
+        self.assertEqual(item['content'], 'Heading Body text.')
+        self.assertRegex(item['timestamp'], r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+        self.assertEqual(len(manager.browser.loaded_urls), 1)
+        manager.run(manager.close())
+    
+    def test_combined_mode_batch_feeds_data_processor(self):
+        """Test that batch results collect scrapedData usable by data_processor."""
+        from data_processor import lambda_handler as process_handler
+        manager = BrowserManager(launcher=FakeLauncher())
+        pages = {f'/p{i}': f'<html><head><title>Python {i}</title></head><body>About Python {i}</body></html>'
+                 for i in range(2)}
+        
+        with LocalHTTPServer(pages) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser', 'CAPTURE_EXTRACT_TEXT': 'true'}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            urls = [server.url('/p0'), server.url('/missing'), server.url('/p1')]
+            response = lambda_handler({'urls': urls, 'searchWord': 'Python'}, self.context)
+        manager.run(manager.close())
+        
+        self.assertEqual([item['url'] for item in response['scrapedData']], [urls[0], urls[2]])
+        self.assertEqual(response['searchWord'], 'Python')
+        processed = process_handler(response, None)
+        self.assertEqual(processed['statusCode'], 200)
+        self.assertEqual(len(processed['processedData']), 2)
+    
+    def test_recapture_from_snapshot(self):
+        """Test that a snapshotKey renders the archived HTML instead of the live URL."""
+        manager = BrowserManager(launcher=FakeLauncher())
+        
+        with tempfile.TemporaryDirectory() as snapshot_dir, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser', 'CAPTURE_SNAPSHOT_LOCATION': snapshot_dir}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            LocalObjectStore(snapshot_dir).put('snapshots/a/index.html', b'<html><body>archived</body></html>')
+            event = {'url': 'https://unreachable.invalid/a', 'snapshotKey': 'snapshots/a', 'extractText': True}
+            response = lambda_handler(event, self.context)
+            missing = lambda_handler(dict(event, snapshotKey='snapshots/missing'), self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['snapshot'], {'servedAssets': 0, 'missingAssets': 0})
+        self.assertEqual(response['scrapedItem']['content'], 'archived')
+        self.assertEqual(manager.browser.loaded_urls, [])
+        self.assertEqual(missing['statusCode'], 500)
+        manager.run(manager.close())
+    
+    def test_max_concurrent_tabs_from_memory(self):
+        """Test tab concurrency derived from the function memory size."""
+        class Context:
+            memory_limit_in_mb = '1024'
+        
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(_max_concurrent_tabs(Context()), 8)
+            Context.memory_limit_in_mb = '256'
+            self.assertEqual(_max_concurrent_tabs(Context()), 1)
+            self.assertEqual(_max_concurrent_tabs({}), 1)
+        with patch.dict(os.environ, {'CAPTURE_MAX_TABS': '4'}):
+            self.assertEqual(_max_concurrent_tabs(Context()), 4)
+
+    
+    def test_png_output_reports_mime_type(self):
+        """Test that the default output is PNG with no thumbnails."""
+        response = lambda_handler({'url': 'https://example.com'}, self.context)
+        
+        self.assertEqual(response['mimeType'], 'image/png')
+        self.assertEqual(response['thumbnails'], [])
+    
+    def test_image_options_from_environment_and_event(self):
+        """Test image options merge environment defaults with event overrides."""
+        env = {
+            'CAPTURE_IMAGE_FORMAT': 'jpeg',
+            'CAPTURE_IMAGE_QUALITY': '60',
+            'CAPTURE_THUMBNAIL_SIZES': '320x240, 160x120'
+        }
+        with patch.dict(os.environ, env):
+            options = _image_options({'imageOptions': {'format': 'WebP', 'maxWidth': 800}})
+        
+        self.assertEqual(options['format'], 'webp')
+        self.assertEqual(options['quality'], '60')
+        self.assertEqual(options['maxWidth'], 800)
+        self.assertEqual(options['thumbnails'], [[320, 240], [160, 120]])
+    
+    @patch('page_capture.PIL_AVAILABLE', False)
+    def test_webp_falls_back_to_png_without_pillow(self):
+        """Test that encoding falls back to the original PNG without Pillow."""
+        event = {'url': 'https://example.com', 'imageOptions': {'format': 'webp'}}
+        
+        response = lambda_handler(event, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['mimeType'], 'image/png')
+        self.assertTrue(response['imagePath'].endswith('.png'))
+    
+    @patch('page_capture.PIL_AVAILABLE', True)
+    @patch('page_capture.encode_image')
+    def test_encoding_stage_applied(self, mock_encode):
+        """Test that requested encoding options are passed to the encoder."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            encoded_path = os.path.join(temp_dir, 'shot.webp')
+            with open(encoded_path, 'wb') as f:
+                f.write(b'RIFF....WEBP')
+            mock_encode.return_value = {'imagePath': encoded_path, 'mimeType': 'image/webp', 'thumbnails': []}
+            
+            event = {
+                'url': 'https://example.com',
+                'imageOptions': {'format': 'webp', 'quality': 50, 'maxHeight': 4000, 'thumbnails': [[200, 200]]}
+            }
+            response = lambda_handler(event, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['mimeType'], 'image/webp')
+        self.assertEqual(base64.b64decode(response['imageData']), b'RIFF....WEBP')
+        kwargs = mock_encode.call_args[1]
+        self.assertEqual(kwargs['output_format'], 'webp')
+        self.assertEqual(kwargs['quality'], 50)
+        self.assertEqual(kwargs['max_height'], 4000)
+        self.assertEqual(kwargs['thumbnail_sizes'], [(200, 200)])
+
+    
+    def test_storage_location_returns_key_instead_of_data(self):
+        """Test that storage mode writes the image to the store and returns only a key."""
+        with tempfile.TemporaryDirectory() as storage_dir:
+            event = {'url': 'https://example.com', 'storageLocation': storage_dir}
+            
+            response = lambda_handler(event, self.context)
+            
+            self.assertEqual(response['statusCode'], 200)
+            self.assertIsNone(response['imageData'])
+            self.assertEqual(response['storageLocation'], storage_dir)
+            self.assertTrue(response['imageKey'].startswith('screenshots/'))
+            stored_path = os.path.join(storage_dir, *response['imageKey'].split('/'))
+            self.assertGreater(os.path.getsize(stored_path), 0)
+            self.assertFalse(os.path.exists(response['imagePath']))
+    
+    @unittest.skipUnless(PIL_AVAILABLE, "Pillow is not installed")
+    def test_tiles_are_stored_with_keys(self):
+        """Test that tiles mode writes every tile to the object store."""
+        manager = BrowserManager(launcher=FakeLauncher(
+            lambda elapsed: {'mutations': 0, 'width': 1280, 'height': 1500, 'pendingImages': 0}
+        ))
+        
+        with tempfile.TemporaryDirectory() as storage_dir, \
+             LocalHTTPServer({'/long': '<html><body>long</body></html>'}) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser', 'CAPTURE_TILING': 'tiles'}), \
+             patch('page_capture.get_browser_manager', return_value=manager):
+            response = lambda_handler({'url': server.url('/long'), 'storageLocation': storage_dir}, self.context)
+            
+            self.assertEqual(response['statusCode'], 200)
+            self.assertEqual(response['tiling']['tileCount'], 3)
+            self.assertEqual([tile['height'] for tile in response['tiles']], [720, 720, 60])
+            for tile in response['tiles']:
+                self.assertTrue(os.path.exists(os.path.join(storage_dir, *tile['key'].split('/'))))
+        manager.run(manager.close())
+    
+    @unittest.skipUnless(PIL_AVAILABLE, "Pillow is not installed")
+    def test_stitched_capture_skips_encoding_and_dedupe(self):
+        """Test that a stitched capture stays PNG even with WebP output and dedupe requested."""
+        manager = BrowserManager(launcher=FakeLauncher(
+            lambda elapsed: {'mutations': 0, 'width': 1280, 'height': 1500, 'pendingImages': 0}
+        ))
+        
+        with tempfile.TemporaryDirectory() as index_dir, \
+             LocalHTTPServer({'/long': '<html><body>long</body></html>'}) as server, \
+             patch.dict(os.environ, {'CAPTURE_ENGINE': 'browser', 'CAPTURE_TILING': 'stitch'}), \
+             patch('page_capture.get_browser_manager', return_value=manager), \
+             patch('page_capture.encode_image') as mock_encode, \
+             patch('page_capture.compute_dhash') as mock_dhash:
+            event = {'url': server.url('/long'), 'indexLocation': index_dir, 'imageOptions': {'format': 'webp'}}
+            response = lambda_handler(event, self.context)
+        manager.run(manager.close())
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['tiling']['mode'], 'stitch')
+        self.assertEqual(response['mimeType'], 'image/png')
+        self.assertTrue(base64.b64decode(response['imageData']).startswith(b'\x89PNG'))
+        mock_encode.assert_not_called()
+        mock_dhash.assert_not_called()
+    
+    def test_batch_storage_location_from_environment(self):
+        """Test that batch captures honour IMAGE_STORAGE_LOCATION."""
+        with tempfile.TemporaryDirectory() as storage_dir, \
+             patch.dict(os.environ, {'IMAGE_STORAGE_LOCATION': storage_dir}):
+            response = lambda_handler({'urls': ['https://example.com/a', 'https://example.com/b']}, self.context)
+            
+            keys = [result['imageKey'] for result in response['results']]
+            self.assertEqual(len(set(keys)), 2)
+            self.assertTrue(all(result['imageData'] is None for result in response['results']))
+            for key in keys:
+                self.assertTrue(os.path.exists(os.path.join(storage_dir, *key.split('/'))))
+            body = json.loads(response['body'])
+            self.assertEqual([r['imageKey'] for r in body['results']], keys)
+
+    
+    @patch('page_capture.PIL_AVAILABLE', True)
+    @patch('page_capture.compute_dhash', return_value='00ff00ff00ff00ff')
+    def test_unchanged_page_reuses_previous_upload(self, mock_dhash):
+        """Test that a page matching the indexed hash is marked unchanged."""
+        with tempfile.TemporaryDirectory() as index_dir, tempfile.TemporaryDirectory() as storage_dir:
+            url = 'https://example.com/static'
+            save_capture_record(index_dir, url, '00ff00ff00ff00ff', 'https://drive.google.com/file/d/old/view', 'old')
+            event = {'url': url, 'indexLocation': index_dir, 'storageLocation': storage_dir}
+            
+            response = lambda_handler(event, self.context)
+            
+            self.assertEqual(response['statusCode'], 200)
+            self.assertTrue(response['unchanged'])
+            self.assertEqual(response['shareable_url'], 'https://drive.google.com/file/d/old/view')
+            self.assertEqual(response['file_id'], 'old')
+            self.assertIsNone(response['imageData'])
+            self.assertNotIn('imageKey', response)
+            self.assertEqual(os.listdir(storage_dir), [])
+    
+    @patch('page_capture.PIL_AVAILABLE', True)
+    @patch('page_capture.compute_dhash', return_value='00ff00ff00ff00ff')
+    def test_changed_page_is_uploaded(self, mock_dhash):
+        """Test that a page with a different hash is passed on for upload."""
+        with tempfile.TemporaryDirectory() as index_dir:
+            url = 'https://example.com/news'
+            save_capture_record(index_dir, url, 'ff00ff00ff00ff00', 'https://drive.google.com/file/d/old/view', 'old')
+            
+            response = lambda_handler({'url': url, 'indexLocation': index_dir}, self.context)
+            
+            self.assertFalse(response['unchanged'])
+            self.assertEqual(response['perceptualHash'], '00ff00ff00ff00ff')
+            self.assertEqual(response['indexLocation'], index_dir)
+            self.assertIsNotNone(response['imageData'])
+            self.assertNotIn('shareable_url', response)
+    
+    @patch('page_capture.PIL_AVAILABLE', True)
+    @patch('page_capture.compute_dhash', return_value='00ff00ff00ff00ff')
+    @patch('page_capture.find_unchanged_capture', side_effect=Exception('Access Denied'))
+    def test_index_read_failure_treats_page_as_changed(self, mock_find, mock_dhash):
+        """Test that an unreadable capture index does not fail the capture."""
+        response = lambda_handler({'url': 'https://example.com', 'indexLocation': 's3://bucket/index'}, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertFalse(response['unchanged'])
+        self.assertIsNotNone(response['imageData'])
+    
+    @patch('page_capture.PIL_AVAILABLE', False)
+    def test_dedupe_skipped_without_pillow(self):
+        """Test that dedupe is skipped when the image cannot be hashed."""
+        with tempfile.TemporaryDirectory() as index_dir:
+            response = lambda_handler({'url': 'https://example.com', 'indexLocation': index_dir}, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertNotIn('unchanged', response)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
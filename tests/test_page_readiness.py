@@ -0,0 +1,90 @@
+"""
+Unit tests for page_readiness module.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from browser_manager import BrowserManager
+from page_readiness import DEFAULT_READINESS, readiness_options
+from fake_browser import FakeLauncher, LocalHTTPServer
+
+FAST_READINESS = {'quietMs': 50, 'layoutStableMs': 150, 'deadlineMs': 400, 'pollMs': 10}
+
+
+class TestPageReadiness(unittest.TestCase):
+    """Test cases for adaptive readiness detection."""
+    
+    def _capture(self, dom_activity, readiness=FAST_READINESS):
+        launcher = FakeLauncher(dom_activity)
+        manager = BrowserManager(launcher=launcher)
+        pages = {'/': '<html><body>content</body></html>'}
+        
+        with tempfile.TemporaryDirectory() as temp_dir, LocalHTTPServer(pages) as server:
+            result = manager.run(manager.capture(
+                server.url('/'), os.path.join(temp_dir, 'shot.png'), {'readiness': readiness}
+            ))
+        manager.run(manager.close())
+        return result['readiness']
+    
+    def test_static_page_is_ready_when_dom_is_quiet(self):
+        """Test that a page without activity is captured after the quiet window."""
+        readiness = self._capture(None)
+        
+        self.assertEqual(readiness['signal'], 'dom-quiet')
+        self.assertGreaterEqual(readiness['waitedMs'], 50)
+        self.assertLess(readiness['waitedMs'], 150)
+    
+    def test_rendering_page_waits_for_mutations_to_stop(self):
+        """Test that DOM mutations and loading images postpone readiness."""
+        def activity(elapsed):
+            rendering = elapsed < 0.1
+            return {
+                'mutations': int(elapsed * 1000) if rendering else 100,
+                'width': 1280,
+                'height': 720 + int(elapsed * 1000) if rendering else 820,
+                'pendingImages': 1 if rendering else 0
+            }
+        
+        readiness = self._capture(activity)
+        
+        self.assertEqual(readiness['signal'], 'dom-quiet')
+        self.assertGreaterEqual(readiness['waitedMs'], 140)
+    
+    def test_ticker_page_is_ready_when_layout_is_stable(self):
+        """Test that constant DOM updates with a fixed layout use the layout signal."""
+        def activity(elapsed):
+            return {'mutations': int(elapsed * 1000), 'width': 1280, 'height': 720, 'pendingImages': 0}
+        
+        readiness = self._capture(activity)
+        
+        self.assertEqual(readiness['signal'], 'layout-stable')
+        self.assertLess(readiness['waitedMs'], 400)
+    
+    def test_growing_page_hits_deadline(self):
+        """Test that a page that never settles is captured at the deadline."""
+        def activity(elapsed):
+            return {'mutations': int(elapsed * 1000), 'width': 1280, 'height': 720 + int(elapsed * 1000),
+                    'pendingImages': 0}
+        
+        readiness = self._capture(activity)
+        
+        self.assertEqual(readiness['signal'], 'deadline')
+        self.assertGreaterEqual(readiness['waitedMs'], 400)
+    
+    def test_readiness_options(self):
+        """Test defaults and overrides of readiness options."""
+        self.assertEqual(readiness_options('adaptive'), DEFAULT_READINESS)
+        options = readiness_options({'deadlineMs': '3000', 'unknown': 1})
+        self.assertEqual(options['deadlineMs'], 3000)
+        self.assertEqual(options['quietMs'], DEFAULT_READINESS['quietMs'])
+        self.assertNotIn('unknown', options)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+"""
+Unit tests for rate_limiter helpers.
+"""
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+from urllib.error import HTTPError
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+
+import rate_limiter
+from rate_limiter import (
+    DynamoDbCounterStore, LocalCounterStore, RateLimiter, RateLimitTimeout, TokenBucket,
+    backoff_delay, call_with_retries, get_rate_limiter, is_rate_limit_error, retry_after_seconds, set_deadline
+)
+
+
+class FakeClock:
+    """Clock advanced by the sleeps of the code under test."""
+    
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeHttpError(Exception):
+    """Stand-in for googleapiclient's HttpError."""
+    
+    def __init__(self, status, content=b'', headers=None):
+        super().__init__(f"HTTP {status}")
+        self.resp = MagicMock(status=status)
+        self.resp.get.side_effect = (headers or {}).get
+        self.content = content
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for the token bucket."""
+    
+    def test_burst_then_refill(self):
+        """Test that a full bucket allows a burst and then refills at the rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(60, 2, clock)
+        
+        self.assertEqual((bucket.take(), bucket.take()), (0, 0))
+        self.assertAlmostEqual(bucket.take(), 1.0)
+        clock.now += 1
+        self.assertEqual(bucket.take(), 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for per-API limiters."""
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.store_dir.cleanup)
+    
+    def limiter(self, rate, store=None):
+        return RateLimiter('sheets', rate, store, clock=self.clock, sleep=self.clock.sleep)
+    
+    def test_acquire_waits_for_tokens(self):
+        """Test that requests beyond the burst are spaced at the rate."""
+        limiter = self.limiter(60)  # burst of 10
+        for _ in range(12):
+            limiter.acquire()
+        
+        self.assertAlmostEqual(sum(self.clock.sleeps), 2.0)
+    
+    def test_request_larger_than_burst(self):
+        """Test that a batch larger than the bucket is admitted in parts instead of waiting forever."""
+        store = LocalCounterStore(self.store_dir.name)
+        limiter = self.limiter(300, store)  # burst of 50, 300 per minute
+        limiter.acquire(100)
+        
+        self.assertAlmostEqual(sum(self.clock.sleeps), 10.0)
+        with open(os.path.join(self.store_dir.name, 'sheets.json')) as f:
+            self.assertIn('"count": 100', f.read())
+    
+    def test_unlimited_api(self):
+        """Test that APIs without a rate never wait."""
+        limiter = self.limiter(None)
+        for _ in range(1000):
+            limiter.acquire()
+        
+        self.assertEqual(self.clock.sleeps, [])
+    
+    def test_pause_holds_requests(self):
+        """Test that a pause delays the next request."""
+        limiter = self.limiter(None)
+        limiter.pause(5)
+        limiter.acquire()
+        
+        self.assertEqual(self.clock.sleeps, [5])
+    
+    def test_wait_beyond_deadline_fails_fast(self):
+        """Test that a wait outlasting the invocation raises instead of sleeping."""
+        limiter = self.limiter(None)
+        limiter.pause(10)
+        
+        with patch('rate_limiter._deadline', self.clock.now + 12):
+            with self.assertRaises(RateLimitTimeout):
+                limiter.acquire()
+            self.assertEqual(self.clock.sleeps, [])
+            
+            limiter.paused_until = self.clock.now + 5
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [5])
+    
+    def test_set_deadline(self):
+        """Test that the deadline follows the Lambda context and is cleared without one."""
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 30000
+        with patch('rate_limiter._deadline', None), patch('rate_limiter.time.time', return_value=100.0):
+            set_deadline(context)
+            self.assertEqual(rate_limiter._deadline, 130.0)
+            set_deadline(None)
+            self.assertIsNone(rate_limiter._deadline)
+    
+    def test_shared_counter_limits_containers(self):
+        """Test that containers sharing a store stay within the per-minute quota together."""
+        store = LocalCounterStore(self.store_dir.name)
+        first, second = self.limiter(6, store), self.limiter(6, store)
+        # Only the shared counter limits here
+        first.bucket = second.bucket = None
+        for _ in range(3):
+            first.acquire()
+            second.acquire()
+        
+        self.assertEqual(self.clock.sleeps, [])
+        with patch('rate_limiter.random.uniform', return_value=0.5):
+            second.acquire()
+        # Waits for the next minute window
+        self.assertEqual(self.clock.now, 1020.5)
+    
+    def test_dynamodb_store(self):
+        """Test the conditional counter update and a full window."""
+        client = MagicMock()
+        store = DynamoDbCounterStore('rate-limits', client)
+        
+        self.assertTrue(store.take('drive', 16, 2, 10))
+        kwargs = client.update_item.call_args.kwargs
+        self.assertEqual(kwargs['Key'], {'counterKey': {'S': 'drive#16'}})
+        self.assertEqual(kwargs['ExpressionAttributeValues'][':remaining'], {'N': '8'})
+        
+        error = Exception('conditional check failed')
+        error.response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+        client.update_item.side_effect = error
+        self.assertFalse(store.take('drive', 16, 2, 10))
+    
+    def test_limiter_from_environment(self):
+        """Test that rates and the store location come from the environment."""
+        env = {'GOOGLE_API_RATE_LIMITS': 'sheets=60, search=100', 'GOOGLE_API_RATE_STORE': self.store_dir.name}
+        with patch.dict(os.environ, env), patch.dict(rate_limiter._limiters, clear=True):
+            sheets, drive = get_rate_limiter('sheets'), get_rate_limiter('drive')
+        
+        self.assertEqual(sheets.rate, 60)
+        self.assertIsInstance(sheets.store, LocalCounterStore)
+        self.assertIsNone(drive.rate)
+
+
+class TestRetries(unittest.TestCase):
+    """Test cases for retrying rate-limited calls."""
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        limiters = patch.dict(rate_limiter._limiters, {
+            'sheets': RateLimiter('sheets', None, clock=self.clock, sleep=self.clock.sleep)
+        })
+        limiters.start()
+        self.addCleanup(limiters.stop)
+    
+    def test_rate_limit_errors(self):
+        """Test which errors count as rate limiting."""
+        self.assertTrue(is_rate_limit_error(FakeHttpError(429)))
+        self.assertTrue(is_rate_limit_error(FakeHttpError(403, b'{"reason": "userRateLimitExceeded"}')))
+        self.assertFalse(is_rate_limit_error(FakeHttpError(403, b'{"reason": "forbidden"}')))
+        self.assertTrue(is_rate_limit_error(HTTPError('url', 429, 'Too Many Requests', {}, None)))
+        self.assertFalse(is_rate_limit_error(ValueError('bad')))
+    
+    def test_retry_after(self):
+        """Test reading Retry-After as seconds or an HTTP date."""
+        self.assertEqual(retry_after_seconds(FakeHttpError(429, headers={'retry-after': '7'})), 7)
+        self.assertIsNone(retry_after_seconds(FakeHttpError(429)))
+        with patch('rate_limiter.time.time', return_value=784111787.0):
+            error = HTTPError('url', 429, 'Too Many Requests', {'Retry-After': 'Sun, 06 Nov 1994 08:49:57 GMT'}, None)
+            self.assertEqual(retry_after_seconds(error), 10)
+    
+    def test_backoff_is_jittered_and_capped(self):
+        """Test the backoff delay bounds."""
+        for attempt in range(10):
+            self.assertLessEqual(backoff_delay(attempt), min(32, 2 ** attempt))
+        with patch('rate_limiter.random.uniform', return_value=0.25):
+            self.assertEqual(backoff_delay(3, retry_after=4), 4.25)
+    
+    def test_retries_after_retry_after(self):
+        """Test that a rejected call is retried after the requested delay."""
+        func = MagicMock(side_effect=[FakeHttpError(429, headers={'retry-after': '3'}), 'ok'])
+        
+        with patch('rate_limiter.random.uniform', return_value=0.5):
+            self.assertEqual(call_with_retries('sheets', func), 'ok')
+        self.assertEqual(self.clock.sleeps, [3.5])
+    
+    def test_other_errors_raised_immediately(self):
+        """Test that errors other than rate limiting are not retried."""
+        func = MagicMock(side_effect=FakeHttpError(500))
+        
+        with self.assertRaises(FakeHttpError):
+            call_with_retries('sheets', func)
+        self.assertEqual(func.call_count, 1)
+    
+    def test_gives_up_after_max_retries(self):
+        """Test that retries stop after GOOGLE_API_MAX_RETRIES."""
+        func = MagicMock(side_effect=FakeHttpError(429))
+        
+        with patch.dict(os.environ, {'GOOGLE_API_MAX_RETRIES': '2'}), self.assertRaises(FakeHttpError):
+            call_with_retries('sheets', func)
+        self.assertEqual(func.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for resource_policy module.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from resource_policy import ResourcePolicy
+from browser_manager import BrowserManager
+from fake_browser import FakeLauncher, LocalHTTPServer
+
+
+PAGE_URL = 'https://news.example.com/article'
+
+
+class TestResourcePolicy(unittest.TestCase):
+    """Test cases for ResourcePolicy decisions."""
+    
+    def test_default_policy(self):
+        """Test the built-in policy blocks fonts, media, trackers and third-party scripts."""
+        policy = ResourcePolicy.from_config('default')
+        
+        self.assertEqual(policy.block_reason('https://news.example.com/f.woff2', 'font', PAGE_URL), 'type')
+        self.assertEqual(policy.block_reason('https://cdn.example.com/v.mp4', 'media', PAGE_URL), 'type')
+        self.assertEqual(
+            policy.block_reason('https://stats.g.doubleclick.net/pixel.gif', 'image', PAGE_URL), 'pattern'
+        )
+        self.assertEqual(
+            policy.block_reason('https://cdn.other.net/widget.js', 'script', PAGE_URL), 'third-party-script'
+        )
+        self.assertIsNone(policy.block_reason('https://static.example.com/app.js', 'script', PAGE_URL))
+        self.assertIsNone(policy.block_reason('https://news.example.com/style.css', 'stylesheet', PAGE_URL))
+        self.assertIsNone(policy.block_reason(PAGE_URL, 'document', PAGE_URL))
+    
+    def test_third_party_scripts_under_multi_label_suffixes(self):
+        """Test that sites under co.jp and similar suffixes are told apart."""
+        policy = ResourcePolicy(block_third_party_scripts=True)
+        page = 'https://www.news.co.jp/article'
+        
+        self.assertIsNone(policy.block_reason('https://static.news.co.jp/app.js', 'script', page))
+        self.assertEqual(
+            policy.block_reason('https://cdn.ads.co.jp/tag.js', 'script', page), 'third-party-script'
+        )
+        self.assertEqual(
+            policy.block_reason('https://widget.shop.co.uk/w.js', 'script', 'https://www.paper.co.uk/'),
+            'third-party-script'
+        )
+    
+    def test_allowed_patterns_take_precedence(self):
+        """Test that allow patterns win over type and pattern blocks."""
+        policy = ResourcePolicy(
+            blocked_types=['font'],
+            blocked_patterns=['*://cdn.example.com/*'],
+            allowed_patterns=['*://cdn.example.com/brand/*']
+        )
+        
+        self.assertIsNone(policy.block_reason('https://cdn.example.com/brand/logo.woff', 'font', PAGE_URL))
+        self.assertEqual(policy.block_reason('https://cdn.example.com/x.png', 'image', PAGE_URL), 'pattern')
+    
+    def test_domain_overrides(self):
+        """Test that overrides apply to the page's domain and its subdomains."""
+        policy = ResourcePolicy.from_config({
+            'blockedTypes': ['font', 'image'],
+            'domainOverrides': {'example.com': {'blockedTypes': ['font']}}
+        })
+        
+        self.assertIsNone(policy.for_page(PAGE_URL).block_reason('https://x.com/a.png', 'image', PAGE_URL))
+        other_page = 'https://other.org/'
+        self.assertEqual(
+            policy.for_page(other_page).block_reason('https://x.com/a.png', 'image', other_page), 'type'
+        )
+
+
+class TestResourcePolicyCapture(unittest.TestCase):
+    """Test cases for applying a policy during a browser capture."""
+    
+    def test_capture_blocks_and_counts_resources(self):
+        """Test that blocked resources are never requested and stats are reported."""
+        pages = {
+            '/': (
+                '<html><head>'
+                '<link rel="stylesheet" href="/style.css">'
+                '<link rel="preload" as="font" href="/font.woff2">'
+                '<script src="/app.js"></script>'
+                '<script src="https://www.googletagmanager.com/gtm.js"></script>'
+                '</head><body><img src="/logo.png"><video src="/intro.mp4"></video></body></html>'
+            ),
+            '/style.css': 'body { color: black; }',
+            '/app.js': 'console.log("app");',
+            '/logo.png': 'png-bytes'
+        }
+        launcher = FakeLauncher()
+        manager = BrowserManager(launcher=launcher)
+        policy = ResourcePolicy.from_config('default')
+        
+        with tempfile.TemporaryDirectory() as temp_dir, LocalHTTPServer(pages) as server:
+            result = manager.run(manager.capture(
+                server.url('/'), os.path.join(temp_dir, 'shot.png'), {'resourcePolicy': policy}
+            ))
+        manager.run(manager.close())
+        
+        page = launcher.browsers[0].contexts[0].pages[0]
+        self.assertEqual(
+            page.requested,
+            [server.url('/style.css'), server.url('/app.js'), server.url('/logo.png')]
+        )
+        stats = result['resourceStats']
+        self.assertEqual(stats['allowedRequests'], 3)
+        self.assertEqual(stats['blockedRequests'], 3)
+        self.assertEqual(stats['blockedByType'], {'font': 1, 'media': 1, 'script': 1})
+        self.assertEqual(stats['blockedByReason'], {'type': 2, 'pattern': 1})
+        expected_bytes = sum(len(pages[path].encode('utf-8')) for path in ('/', '/style.css', '/app.js', '/logo.png'))
+        self.assertEqual(stats['allowedBytes'], expected_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,14 @@ import unittest
 import json
 import sys
 import os
+import gzip
+import tempfile
+from unittest.mock import patch
 
 # Add the src directory to Python path to import the Lambda function
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
 
-from results_handler import lambda_handler
+from results_handler import lambda_handler, archive_processed_items
 
 
 class TestResultsHandler(unittest.TestCase):
@@ -174,6 +177,110 @@ class TestResultsHandler(unittest.TestCase):
         body = json.loads(response['body'])
         self.assertIn('error', body)
         self.assertIsNone(body['finalResults'])
+    
+    def test_archive_processed_items_gzip(self):
+        """Test archiving processed items as gzip NDJSON in a day partition."""
+        with tempfile.TemporaryDirectory() as archive_dir:
+            info = archive_processed_items(
+                'python',
+                self.sample_processed_data,
+                archive_dir,
+                archive_format='ndjson.gz',
+                processed_at='2024-01-02T03:04:05.678Z',
+                run_id='run1'
+            )
+            
+            self.assertEqual(info['format'], 'ndjson.gz')
+            self.assertEqual(info['partition'], 'dt=2024-01-02')
+            self.assertEqual(info['recordCount'], 2)
+            self.assertEqual(
+                info['location'],
+                os.path.join(archive_dir, 'dt=2024-01-02', 'part-20240102T030405-run1.ndjson.gz')
+            )
+            
+            with gzip.open(info['location'], 'rt', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+            
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(rows[0]['searchWord'], 'python')
+            self.assertEqual(rows[0]['runProcessedAt'], '2024-01-02T03:04:05.678Z')
+            self.assertEqual(rows[0]['url'], 'https://example.com/python-tutorial')
+            self.assertEqual(rows[1]['relevanceScore'], 72.0)
+    
+    def test_archive_runs_append_separate_parts(self):
+        """Test that each run adds its own part file to the partition."""
+        with tempfile.TemporaryDirectory() as archive_dir:
+            for run_id in ('a', 'b'):
+                archive_processed_items(
+                    'python', self.sample_processed_data, archive_dir,
+                    archive_format='ndjson.gz', processed_at='2024-01-02T03:04:05Z', run_id=run_id
+                )
+            
+            parts = sorted(os.listdir(os.path.join(archive_dir, 'dt=2024-01-02')))
+            self.assertEqual(parts, ['part-20240102T030405-a.ndjson.gz', 'part-20240102T030405-b.ndjson.gz'])
+    
+    @patch('results_handler.PYARROW_AVAILABLE', False)
+    @patch('results_handler.ZSTD_AVAILABLE', False)
+    def test_archive_format_fallback_and_validation(self):
+        """Test auto format selection and unavailable encoders."""
+        with tempfile.TemporaryDirectory() as archive_dir:
+            info = archive_processed_items('python', [], archive_dir)
+            self.assertEqual(info['format'], 'ndjson.gz')
+            self.assertEqual(info['recordCount'], 0)
+            
+            with self.assertRaises(ImportError):
+                archive_processed_items('python', [], archive_dir, archive_format='parquet')
+            with self.assertRaises(ValueError):
+                archive_processed_items('python', [], archive_dir, archive_format='csv')
+    
+    def test_handler_archives_when_location_given(self):
+        """Test that the handler archives all items when an archive location is set."""
+        with tempfile.TemporaryDirectory() as archive_dir:
+            event = {
+                'searchWord': 'python',
+                'processedData': self.sample_processed_data,
+                'itemCount': 2,
+                'originalItemCount': 2,
+                'archiveLocation': archive_dir,
+                'archiveFormat': 'ndjson.gz'
+            }
+            
+            response = lambda_handler(event, self.context)
+            
+            self.assertEqual(response['statusCode'], 200)
+            archive = response['finalResults']['metadata']['archive']
+            self.assertEqual(archive['recordCount'], 2)
+            self.assertTrue(os.path.exists(archive['location']))
+    
+    def test_handler_archive_failure_does_not_fail_run(self):
+        """Test that an archive error is logged without failing the run."""
+        event = {
+            'searchWord': 'python',
+            'processedData': self.sample_processed_data,
+            'itemCount': 2,
+            'originalItemCount': 2,
+            'archiveLocation': '/tmp/archive',
+            'archiveFormat': 'unknown'
+        }
+        
+        response = lambda_handler(event, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertIsNone(response['finalResults']['metadata']['archive'])
+    
+    def test_handler_without_archive_location(self):
+        """Test that no archive is written by default."""
+        event = {
+            'searchWord': 'python',
+            'processedData': self.sample_processed_data,
+            'itemCount': 2,
+            'originalItemCount': 2
+        }
+        
+        with patch.dict(os.environ, {}, clear=True):
+            response = lambda_handler(event, self.context)
+        
+        self.assertNotIn('archive', response['finalResults']['metadata'])
 
 
 if __name__ == '__main__':
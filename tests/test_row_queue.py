@@ -0,0 +1,100 @@
+"""
+Unit tests for row_queue helpers.
+"""
+import unittest
+import json
+import sys
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+
+from row_queue import LocalQueue, SqsQueue, get_queue
+
+
+class TestLocalQueue(unittest.TestCase):
+    """Test cases for the directory-backed queue."""
+    
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.queue = LocalQueue(self.root.name)
+    
+    def test_send_receive_delete(self):
+        """Test that messages are received in send order and removed on delete."""
+        self.queue.send([{'n': 1}, {'n': 2}, {'n': 3}])
+        
+        first = self.queue.receive(2)
+        second = self.queue.receive(2)
+        
+        self.assertEqual([message for _, message in first], [{'n': 1}, {'n': 2}])
+        self.assertEqual([message for _, message in second], [{'n': 3}])
+        self.queue.delete(receipt for receipt, _ in first + second)
+        self.assertEqual(self.queue.receive(), [])
+    
+    def test_undeleted_messages_return_after_visibility_timeout(self):
+        """Test that received but undeleted messages become visible again."""
+        self.queue.send([{'n': 1}])
+        (receipt, _), = self.queue.receive()
+        
+        self.assertEqual(self.queue.receive(), [])
+        expired = time.time() - self.queue.visibility_timeout - 1
+        os.utime(receipt, (expired, expired))
+        
+        self.assertEqual([message for _, message in self.queue.receive()], [{'n': 1}])
+    
+    def test_receive_from_missing_directory(self):
+        """Test that an unused queue directory is an empty queue."""
+        self.assertEqual(LocalQueue(os.path.join(self.root.name, 'missing')).receive(), [])
+
+
+class TestSqsQueue(unittest.TestCase):
+    """Test cases for the SQS-backed queue."""
+    
+    def test_send_in_batches_of_ten(self):
+        """Test that messages are sent with SendMessageBatch, 10 at a time."""
+        client = MagicMock()
+        client.send_message_batch.return_value = {'Successful': []}
+        queue = SqsQueue('https://sqs.example/queue', client=client)
+        
+        self.assertEqual(queue.send([{'n': n} for n in range(12)]), 12)
+        
+        calls = client.send_message_batch.call_args_list
+        self.assertEqual([len(c.kwargs['Entries']) for c in calls], [10, 2])
+        self.assertEqual(json.loads(calls[1].kwargs['Entries'][1]['MessageBody']), {'n': 11})
+    
+    def test_failed_send_raises(self):
+        """Test that partially failed batches are reported."""
+        client = MagicMock()
+        client.send_message_batch.return_value = {'Failed': [{'Id': '0'}]}
+        
+        with self.assertRaises(RuntimeError):
+            SqsQueue('https://sqs.example/queue', client=client).send([{'n': 1}])
+    
+    def test_receive_and_delete(self):
+        """Test receiving and deleting messages by receipt handle."""
+        client = MagicMock()
+        client.receive_message.return_value = {'Messages': [{'ReceiptHandle': 'r1', 'Body': '{"n": 1}'}]}
+        queue = SqsQueue('https://sqs.example/queue', client=client)
+        
+        received = queue.receive(50)
+        queue.delete([receipt for receipt, _ in received])
+        
+        self.assertEqual(received, [('r1', {'n': 1})])
+        self.assertEqual(client.receive_message.call_args.kwargs['MaxNumberOfMessages'], 10)
+        client.delete_message_batch.assert_called_once_with(
+            QueueUrl='https://sqs.example/queue', Entries=[{'Id': '0', 'ReceiptHandle': 'r1'}]
+        )
+    
+    def test_get_queue(self):
+        """Test choosing the queue type from the location."""
+        self.assertIsInstance(get_queue('/tmp/queue'), LocalQueue)
+        with self.assertRaises(ValueError):
+            get_queue('')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit tests for scratch_space module.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+
+from scratch_space import ScratchSpace
+
+
+class TestScratchSpace(unittest.TestCase):
+    """Test cases for ScratchSpace."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.scratch = ScratchSpace(self.temp_dir.name, budget_bytes=250)
+    
+    def _write(self, name, size=100):
+        path = self.scratch.path(name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        return path
+    
+    def test_evicts_least_recently_used_over_budget(self):
+        """Test that the oldest artifacts are deleted once the budget is exceeded."""
+        first = self._write('first.png')
+        second = self._write('second.png')
+        self.scratch.track(first)
+        self.scratch.track(second)
+        self.scratch.track(first)  # first is now the most recently used
+        
+        third = self._write('third.png')
+        self.scratch.track(third)
+        
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(first))
+        self.assertTrue(os.path.exists(third))
+        usage = self.scratch.usage()
+        self.assertEqual(usage['trackedFiles'], 2)
+        self.assertEqual(usage['trackedBytes'], 200)
+        self.assertEqual(usage['evictedFiles'], 1)
+        self.assertEqual(usage['evictedBytes'], 100)
+        self.assertEqual(usage['peakBytes'], 300)
+    
+    def test_new_artifacts_are_never_evicted(self):
+        """Test that an artifact larger than the budget survives until released."""
+        large = self._write('large.png', size=400)
+        
+        self.scratch.track(large)
+        
+        self.assertTrue(os.path.exists(large))
+        self.scratch.release([large, None, self.scratch.path('missing.png')])
+        self.assertFalse(os.path.exists(large))
+        self.assertEqual(self.scratch.usage()['trackedBytes'], 0)
+    
+    def test_usage_reports_free_space(self):
+        """Test that usage includes the free space of the scratch directory."""
+        usage = self.scratch.usage()
+        
+        self.assertEqual(usage['budgetBytes'], 250)
+        self.assertGreater(usage['freeBytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+"""
+Unit tests for sheets_row_aggregator Lambda function.
+"""
+import unittest
+import json
+import sys
+import os
+import tempfile
+from unittest.mock import patch, MagicMock
+
+# Add the src directory to Python path to import the Lambda function
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+
+import sheets_url_recorder
+from sheets_row_aggregator import lambda_handler
+from row_queue import LocalQueue
+
+
+class TestSheetsRowAggregator(unittest.TestCase):
+    """Test cases for flushing the write-behind queue."""
+    
+    def setUp(self):
+        self.queue_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.queue_dir.cleanup)
+        env = patch.dict(os.environ, {'SHEETS_WRITE_QUEUE': self.queue_dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+        
+        self.service = MagicMock()
+        self.service.spreadsheets().get().execute.return_value = {'sheets': [
+            {'properties': {'title': 'Sheet1', 'sheetId': 0}},
+            {'properties': {'title': 'Other', 'sheetId': 1}}
+        ]}
+        self.service.reset_mock()
+        for target in ('sheets_url_recorder.get_sheets_service', 'sheets_row_aggregator.get_sheets_service'):
+            patcher = patch(target, return_value=self.service)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        sheet_ids = patch.dict(sheets_url_recorder._sheet_ids, clear=True)
+        sheet_ids.start()
+        self.addCleanup(sheet_ids.stop)
+    
+    def record(self, url, spreadsheet_id='spreadsheet_id', sheet_range='Sheet1!A:F'):
+        with patch('datetime.datetime') as mock_datetime:
+            # Later recordings get earlier timestamps, so send order differs from capture order
+            mock_datetime.utcnow.return_value.isoformat.return_value = f"2024-01-01T00:00:{60 - len(url):02d}"
+            return sheets_url_recorder.lambda_handler(
+                {'url': url, 'spreadsheet_id': spreadsheet_id, 'sheet_range': sheet_range}, {}
+            )
+    
+    def test_recorder_queues_instead_of_writing(self):
+        """Test that the recorder puts rows on the queue in write-behind mode."""
+        response = self.record('https://example.com/a')
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(response['queued'])
+        self.service.spreadsheets().values().append.assert_not_called()
+        (_, message), = LocalQueue(self.queue_dir.name).receive()
+        self.assertEqual(message['spreadsheet_id'], 'spreadsheet_id')
+        self.assertEqual(message['row'][1], 'https://example.com/a')
+    
+    def test_recorder_queues_batch_rows(self):
+        """Test that a rows event is queued row by row."""
+        event = {
+            'spreadsheet_id': 'spreadsheet_id',
+            'rows': [{'url': 'https://example.com/a'}, {'url': 'https://example.com/b'}, {'unchanged': True}]
+        }
+        
+        response = sheets_url_recorder.lambda_handler(event, {})
+        
+        self.assertEqual((response['queuedCount'], response['skippedCount']), (2, 1))
+        self.assertEqual(len(LocalQueue(self.queue_dir.name).receive()), 2)
+    
+    def test_flush_writes_rows_in_capture_order(self):
+        """Test that queued rows are written in one append, ordered by timestamp."""
+        self.record('https://example.com/a')
+        self.record('https://example.com/bbb')
+        
+        response = lambda_handler({}, None)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['writtenCount'], 2)
+        append = self.service.spreadsheets().values().append
+        append.assert_called_once()
+        urls = [row[1] for row in append.call_args.kwargs['body']['values']]
+        self.assertEqual(urls, ['https://example.com/bbb', 'https://example.com/a'])
+        self.assertEqual(LocalQueue(self.queue_dir.name).receive(), [])
+    
+    def test_flush_groups_by_spreadsheet(self):
+        """Test one write per spreadsheet, with batchUpdate for several sheets."""
+        self.record('https://example.com/a', 'first')
+        self.record('https://example.com/b', 'second')
+        self.record('https://example.com/c', 'second', 'Other!A:F')
+        
+        response = lambda_handler({}, None)
+        
+        self.assertEqual(response['writtenCount'], 3)
+        self.assertEqual(self.service.spreadsheets().values().append.call_args.kwargs['spreadsheetId'], 'first')
+        batch_update = self.service.spreadsheets().batchUpdate
+        self.assertEqual(batch_update.call_args.kwargs['spreadsheetId'], 'second')
+    
+    def test_write_mode_is_carried_through_queue(self):
+        """Test that the event's writeMode is queued and used when flushing."""
+        sheets_url_recorder.lambda_handler(
+            {'url': 'https://example.com/a', 'spreadsheet_id': 'spreadsheet_id', 'writeMode': 'upsert'}, {}
+        )
+        self.record('https://example.com/b')
+    
+        with patch('sheets_row_aggregator.write_rows', return_value={'appendedCount': 1}) as write_rows:
+            response = lambda_handler({}, None)
+    
+        self.assertEqual(response['writtenCount'], 2)
+        modes = {call.args[3]: call.args[2]['Sheet1!A:F'][0][1] for call in write_rows.call_args_list}
+        self.assertEqual(modes, {'append': 'https://example.com/b', 'upsert': 'https://example.com/a'})
+    
+    def test_unknown_write_mode_is_not_queued(self):
+        """Test that an unsupported writeMode is rejected before queuing."""
+        response = sheets_url_recorder.lambda_handler(
+            {'url': 'https://example.com/a', 'spreadsheet_id': 'spreadsheet_id', 'writeMode': 'replace'}, {}
+        )
+    
+        self.assertEqual(response['statusCode'], 500)
+        self.assertEqual(LocalQueue(self.queue_dir.name).receive(), [])
+    
+    def test_failed_write_keeps_rows_queued(self):
+        """Test that rows of a failed write stay on the queue for a later run."""
+        self.record('https://example.com/a')
+        self.service.spreadsheets().values().append().execute.side_effect = Exception('Quota exceeded')
+        
+        response = lambda_handler({}, None)
+        
+        self.assertEqual(response['statusCode'], 500)
+        self.assertEqual(response['failedCount'], 1)
+        inflight = os.listdir(os.path.join(self.queue_dir.name, 'inflight'))
+        self.assertEqual(len(inflight), 1)
+    
+    def test_bad_range_does_not_block_other_rows(self):
+        """Test that rows of a missing sheet fail alone when a multi-sheet write fails."""
+        self.record('https://example.com/a')
+        self.record('https://example.com/b', sheet_range='Deleted!A:F')
+        
+        def append(**kwargs):
+            request = MagicMock()
+            if kwargs['range'].startswith('Deleted!'):
+                request.execute.side_effect = Exception('Unable to parse range')
+            return request
+        
+        self.service.spreadsheets().values().append.side_effect = append
+        
+        response = lambda_handler({}, None)
+        
+        self.assertEqual((response['writtenCount'], response['failedCount']), (1, 1))
+        (inflight,) = os.listdir(os.path.join(self.queue_dir.name, 'inflight'))
+        with open(os.path.join(self.queue_dir.name, 'inflight', inflight), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['sheet_range'], 'Deleted!A:F')
+    
+    def test_rows_of_failed_shards_stay_queued(self):
+        """Test that only rows reported as failed by write_rows stay on the queue."""
+        self.record('https://example.com/a')
+        self.record('https://example.com/bb')
+        
+        def write_rows(service, spreadsheet_id, rows_by_range, mode):
+            rows = rows_by_range['Sheet1!A:F']
+            failed = [row for row in rows if row[1] == 'https://example.com/a']
+            return {'appendedCount': len(rows) - len(failed), 'failedRows': failed}
+        
+        with patch('sheets_row_aggregator.write_rows', side_effect=write_rows):
+            response = lambda_handler({}, None)
+        
+        self.assertEqual((response['writtenCount'], response['failedCount']), (1, 1))
+        (inflight,) = os.listdir(os.path.join(self.queue_dir.name, 'inflight'))
+        with open(os.path.join(self.queue_dir.name, 'inflight', inflight), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['row'][1], 'https://example.com/a')
+    
+    def test_malformed_rows_are_dropped(self):
+        """Test that unusable messages are removed without a write."""
+        LocalQueue(self.queue_dir.name).send([{'row': ['t', 'u']}])
+        
+        response = lambda_handler({}, None)
+        
+        self.assertEqual(response['droppedCount'], 1)
+        self.assertEqual(os.listdir(os.path.join(self.queue_dir.name, 'inflight')), [])
+    
+    def test_max_rows(self):
+        """Test that a run drains at most maxRows rows."""
+        for url in ('https://example.com/a', 'https://example.com/b', 'https://example.com/c'):
+            self.record(url)
+        
+        response = lambda_handler({'maxRows': 2}, None)
+        
+        self.assertEqual(response['writtenCount'], 2)
+        self.assertEqual(len(LocalQueue(self.queue_dir.name).receive()), 1)
+    
+    def test_queue_not_configured(self):
+        """Test that the aggregator needs a queue location."""
+        with patch.dict(os.environ, {}, clear=True):
+            response = lambda_handler({}, None)
+        
+        self.assertEqual(response['statusCode'], 400)
+        self.assertEqual(json.loads(response['body'])['error'], 'Write queue not configured')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ from unittest.mock import Mock, patch, MagicMock
 # Add the src directory to Python path to import the Lambda function
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
 
+import sheets_url_recorder
 from sheets_url_recorder import lambda_handler, get_sheets_service, write_url_to_sheet
 
 
@@ -239,7 +240,9 @@ class TestSheetsUrlRecorder(unittest.TestCase):
             
             self.assertEqual(service, mock_service)
             mock_service_account.Credentials.from_service_account_info.assert_called_once()
-            mock_build.assert_called_once_with('sheets', 'v4', credentials=mock_credentials)
+            mock_build.assert_called_once_with(
+                'sheets', 'v4', credentials=mock_credentials, static_discovery=True, cache_discovery=False
+            )
     
     def test_write_url_to_sheet_no_service(self):
         """Test write_url_to_sheet when service is None."""
@@ -293,6 +296,488 @@ class TestSheetsUrlRecorder(unittest.TestCase):
             body=expected_body
         )
 
+    
+    def test_unchanged_page_skips_write(self):
+        """Test that rows for unchanged pages are not written again."""
+        event = {
+            'unchanged': True,
+            'shareable_url': 'https://drive.google.com/file/d/old/view',
+            'spreadsheet_id': 'spreadsheet_id'
+        }
+        
+        with patch('sheets_url_recorder.get_sheets_service') as mock_get_service:
+            response = lambda_handler(event, self.context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertTrue(response['skipped'])
+        mock_get_service.assert_not_called()
+
+
+class TestBatchRecord(unittest.TestCase):
+    """Test cases for recording several URLs with one write."""
+    
+    def setUp(self):
+        self.service = MagicMock()
+        self.service.spreadsheets().get().execute.return_value = {'sheets': [
+            {'properties': {'title': 'Sheet1', 'sheetId': 0}},
+            {'properties': {'title': 'Archive 2024', 'sheetId': 7}}
+        ]}
+        self.service.reset_mock()
+        patcher = patch('sheets_url_recorder.get_sheets_service', return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sheet_ids = patch.dict(sheets_url_recorder._sheet_ids, clear=True)
+        sheet_ids.start()
+        self.addCleanup(sheet_ids.stop)
+    
+    def test_rows_written_with_one_append(self):
+        """Test that all rows for one range go through a single append."""
+        event = {
+            'spreadsheet_id': 'spreadsheet_id',
+            'rows': [
+                {'url': 'https://drive.google.com/file/d/a/view', 'additional_data': {'filename': 'a.png'}},
+                {'shareable_url': 'https://drive.google.com/file/d/b/view', 'file_id': 'b', 'statusCode': 200},
+                {'unchanged': True, 'shareable_url': 'https://drive.google.com/file/d/old/view'},
+                {'statusCode': 500, 'shareable_url': None}
+            ]
+        }
+        
+        response = lambda_handler(event, Mock())
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual((response['recordedCount'], response['skippedCount']), (2, 2))
+        append = self.service.spreadsheets().values().append
+        append.assert_called_once()
+        values = append.call_args.kwargs['body']['values']
+        self.assertEqual(append.call_args.kwargs['range'], 'Sheet1!A:F')
+        self.assertEqual([row[1:] for row in values], [
+            ['https://drive.google.com/file/d/a/view', 'a.png', '', '', ''],
+            ['https://drive.google.com/file/d/b/view', '', 'b', '', '']
+        ])
+    
+    def test_rows_for_several_sheets_use_one_batch_update(self):
+        """Test that rows for several sheets are written in one batchUpdate."""
+        event = {
+            'spreadsheet_id': 'spreadsheet_id',
+            'rows': [
+                {'url': 'https://example.com/a'},
+                {'url': 'https://example.com/b', 'sheet_range': "'Archive 2024'!A:F"},
+                {'url': 'https://example.com/c', 'additional_data': {'file_size': 1024}}
+            ]
+        }
+        
+        response = lambda_handler(event, Mock())
+        lambda_handler(event, Mock())
+        
+        self.assertEqual(response['recordedCount'], 3)
+        self.service.spreadsheets().values().append.assert_not_called()
+        # Sheet IDs are looked up once per spreadsheet
+        self.assertEqual(self.service.spreadsheets().get.call_count, 1)
+        requests = self.service.spreadsheets().batchUpdate.call_args.kwargs['body']['requests']
+        self.assertEqual([r['appendCells']['sheetId'] for r in requests], [0, 7])
+        self.assertEqual(len(requests[0]['appendCells']['rows']), 2)
+        cells = requests[0]['appendCells']['rows'][1]['values']
+        self.assertEqual(cells[1], {'userEnteredValue': {'stringValue': 'https://example.com/c'}})
+        self.assertEqual(cells[4], {'userEnteredValue': {'numberValue': 1024}})
+    
+    def test_unknown_sheet_fails(self):
+        """Test that a range naming a missing sheet fails the batch."""
+        event = {
+            'spreadsheet_id': 'spreadsheet_id',
+            'rows': [{'url': 'https://example.com/a'}, {'url': 'https://example.com/b', 'sheet_range': 'Missing!A:F'}]
+        }
+        
+        response = lambda_handler(event, Mock())
+        
+        self.assertEqual(response['statusCode'], 500)
+        self.service.spreadsheets().batchUpdate.assert_not_called()
+        # The cached sheet IDs are reloaded once before giving up
+        self.assertEqual(self.service.spreadsheets().get.call_count, 2)
+    
+    def test_sheet_added_later_is_found(self):
+        """Test that a tab added after the sheet IDs were cached is picked up."""
+        event = {
+            'spreadsheet_id': 'spreadsheet_id',
+            'rows': [{'url': 'https://example.com/a'}, {'url': 'https://example.com/b', 'sheet_range': 'New!A:F'}]
+        }
+        sheets_url_recorder._get_sheet_ids(self.service, 'spreadsheet_id')
+        self.service.spreadsheets().get().execute.return_value = {'sheets': [
+            {'properties': {'title': 'Sheet1', 'sheetId': 0}},
+            {'properties': {'title': 'New', 'sheetId': 9}}
+        ]}
+        
+        response = lambda_handler(event, Mock())
+        
+        self.assertEqual(response['statusCode'], 200)
+        requests = self.service.spreadsheets().batchUpdate.call_args.kwargs['body']['requests']
+        self.assertEqual([r['appendCells']['sheetId'] for r in requests], [0, 9])
+    
+    def test_only_skipped_rows(self):
+        """Test that a batch with nothing to write makes no API calls."""
+        response = lambda_handler({'spreadsheet_id': 'spreadsheet_id', 'rows': [{'unchanged': True}]}, Mock())
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['recordedCount'], 0)
+        self.service.spreadsheets().values().append.assert_not_called()
+
+
+class FakeSheetsService:
+    """In-memory stand-in for the Sheets values API of one sheet."""
+    
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+        self.calls = []
+    
+    def spreadsheets(self):
+        return self
+    
+    def values(self):
+        return self
+    
+    def _request(self, name, result):
+        self.calls.append(name)
+        request = MagicMock()
+        request.execute.side_effect = result
+        return request
+    
+    def get(self, spreadsheetId, range, majorDimension='ROWS'):
+        def result():
+            cells = range.split('!')[1]
+            if majorDimension == 'COLUMNS':
+                column = [row[1] if len(row) > 1 else '' for row in self.rows]
+                return {'values': [column]} if column else {}
+            first, last = (int(part[1:]) for part in cells.split(':'))
+            values = [[row[0]] for row in self.rows[first - 1:last]]
+            return {'values': values} if values else {}
+        return self._request('get', result)
+    
+    def append(self, spreadsheetId, range, valueInputOption, body):
+        def result():
+            first = len(self.rows) + 1
+            self.rows.extend(body['values'])
+            return {'updates': {'updatedRange': f"Sheet1!A{first}:F{len(self.rows)}"}}
+        return self._request('append', result)
+    
+    def batchUpdate(self, spreadsheetId, body):
+        def result():
+            for data in body['data']:
+                self.rows[int(data['range'].split('!A')[1]) - 1] = data['values'][0]
+            return {}
+        return self._request('batchUpdate', result)
+
+
+class TestUpsert(unittest.TestCase):
+    """Test cases for recording URLs without duplicate rows."""
+    
+    def setUp(self):
+        self.service = FakeSheetsService([
+            ['Timestamp', 'URL'],
+            ['2024-01-01T00:00:00Z', 'https://example.com/a', 'old.png']
+        ])
+        patcher = patch('sheets_url_recorder.get_sheets_service', return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        indexes = patch.dict(sheets_url_recorder._url_indexes, clear=True)
+        indexes.start()
+        self.addCleanup(indexes.stop)
+    
+    def record(self, url, mode='upsert', **fields):
+        event = dict({'url': url, 'spreadsheet_id': 'spreadsheet_id', 'writeMode': mode}, **fields)
+        return lambda_handler(event, Mock())
+    
+    def test_existing_url_updated_in_place(self):
+        """Test that a retried URL updates its row instead of appending."""
+        response = self.record('https://example.com/a', additional_data={'filename': 'new.png'})
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual((response['appendedCount'], response['updatedCount']), (0, 1))
+        self.assertEqual(len(self.service.rows), 2)
+        self.assertEqual(self.service.rows[1][2], 'new.png')
+    
+    def test_skip_existing(self):
+        """Test that skip-existing leaves recorded URLs alone."""
+        response = self.record('https://example.com/a', mode='skip-existing')
+        
+        self.assertEqual(response['existingCount'], 1)
+        self.assertEqual(self.service.rows[1][2], 'old.png')
+        self.assertNotIn('batchUpdate', self.service.calls)
+    
+    def test_index_is_reused_until_sheet_changes(self):
+        """Test that the URL column is read once while only this container writes."""
+        self.record('https://example.com/b')
+        self.record('https://example.com/b')
+        self.record('https://example.com/c')
+        
+        self.assertEqual([row[1] for row in self.service.rows[1:]],
+                         ['https://example.com/a', 'https://example.com/b', 'https://example.com/c'])
+        index = sheets_url_recorder._url_indexes[('spreadsheet_id', 'Sheet1')]
+        self.assertEqual(index.rows['https://example.com/c'], 4)
+        self.assertEqual(self.service.calls.count('get'), 1 + 2)  # one column read, then one probe per write
+    
+    def test_rows_appended_elsewhere_invalidate_index(self):
+        """Test that rows written by another writer force a reload."""
+        self.record('https://example.com/b')
+        self.service.rows.append(['2024-01-02T00:00:00Z', 'https://example.com/c'])
+        
+        response = self.record('https://example.com/c')
+        
+        self.assertEqual(response['updatedCount'], 1)
+        self.assertEqual(len(self.service.rows), 4)
+    
+    def test_version_cell_change_invalidates_index(self):
+        """Test that changing the version cell forces a reload."""
+        versions = iter([[['1']], [['2']]])
+        original_get = self.service.get
+        
+        def get(spreadsheetId, range, majorDimension='ROWS'):
+            if range == 'Meta!A1':
+                return self.service._request('version', lambda: {'values': next(versions)})
+            return original_get(spreadsheetId, range, majorDimension)
+        
+        self.service.get = get
+        with patch.dict(os.environ, {'SHEETS_INDEX_VERSION_CELL': 'Meta!A1'}):
+            self.record('https://example.com/b')
+            # Rows sorted by hand: same row count, different positions
+            self.service.rows[1], self.service.rows[2] = self.service.rows[2], self.service.rows[1]
+            self.record('https://example.com/a', additional_data={'filename': 'sorted.png'})
+        
+        self.assertEqual(self.service.rows[2][1:3], ['https://example.com/a', 'sorted.png'])
+    
+    def test_batch_upsert_counts(self):
+        """Test upserting a rows event, including a URL repeated in the batch."""
+        event = {
+            'spreadsheet_id': 'spreadsheet_id',
+            'writeMode': 'upsert',
+            'rows': [{'url': 'https://example.com/a'}, {'url': 'https://example.com/b'}, {'url': 'https://example.com/b'}]
+        }
+        
+        response = lambda_handler(event, Mock())
+        
+        self.assertEqual((response['appendedCount'], response['updatedCount']), (1, 1))
+        self.assertEqual(len(self.service.rows), 3)
+    
+    def test_unknown_write_mode(self):
+        """Test that an unsupported write mode is an error."""
+        response = self.record('https://example.com/a', mode='replace')
+        
+        self.assertEqual(response['statusCode'], 500)
+
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
+
+class TestRollover(unittest.TestCase):
+    """Test cases for rolling recording over to new sheets."""
+    
+    def setUp(self):
+        self.service = MagicMock()
+        self.service.spreadsheets.return_value.get.return_value.execute.return_value = {
+            'sheets': [{'properties': {'sheetId': 0, 'title': 'Sheet1'}}]
+        }
+        # Two filled rows (header and one record) in a grid of blank rows
+        self.service.spreadsheets.return_value.values.return_value.get.return_value.execute.return_value = {
+            'values': [['Timestamp'], ['2023-12-31T00:00:00Z']]
+        }
+        self.service.spreadsheets.return_value.batchUpdate.side_effect = self.batch_update
+        self.added = []
+        for cache in (sheets_url_recorder._sheet_ids, sheets_url_recorder._sheet_row_counts,
+                      sheets_url_recorder._shard_indexes):
+            patcher = patch.dict(cache, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def batch_update(self, spreadsheetId, body):
+        request = MagicMock()
+        replies = []
+        for item in body['requests']:
+            if 'addSheet' in item:
+                self.added.append(item['addSheet']['properties']['title'])
+                replies.append({'addSheet': {'properties': {'sheetId': len(self.added), 'title': self.added[-1]}}})
+        request.execute.return_value = {'replies': replies}
+        return request
+    
+    def appended_ranges(self):
+        return [call.kwargs['range'] for call in self.service.spreadsheets.return_value.values.return_value.append.call_args_list]
+    
+    def rows(self, *timestamps):
+        return {'Sheet1!A:F': [[timestamp, f'https://example.com/{i}'] for i, timestamp in enumerate(timestamps)]}
+    
+    def test_disabled_by_default(self):
+        """Test that rows stay in their range without rollover settings."""
+        routed = sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-01-01T00:00:00Z'))
+        
+        self.assertEqual(routed, {'spreadsheet_id': self.rows('2024-01-01T00:00:00Z')})
+    
+    def test_row_threshold_opens_new_tab(self):
+        """Test that a full sheet rolls over to a numbered tab."""
+        with patch.dict(os.environ, {'SHEETS_ROLLOVER_ROWS': '3'}):
+            counts = sheets_url_recorder.write_rows(
+                self.service, 'spreadsheet_id',
+                self.rows('2024-01-01T00:00:02Z', '2024-01-01T00:00:01Z', '2024-01-01T00:00:03Z')
+            )
+        
+        self.assertEqual(counts['appendedCount'], 3)
+        self.assertEqual(self.added, ['Sheet1 (2)'])
+        shards = sheets_url_recorder._shard_indexes[('spreadsheet_id', 'Sheet1!A:F')]
+        self.assertEqual([shard['sheetRange'] for shard in shards], ["'Sheet1'!A:F", "'Sheet1 (2)'!A:F"])
+        self.assertEqual(shards[0]['rowCount'], 3)
+        self.assertEqual(shards[1]['firstTimestamp'], '2024-01-01T00:00:02Z')
+        # Both tabs are written with one batchUpdate
+        requests = self.service.spreadsheets.return_value.batchUpdate.call_args_list[-1].kwargs['body']['requests']
+        self.assertEqual([len(item['appendCells']['rows']) for item in requests], [1, 2])
+    
+    def test_monthly_partition(self):
+        """Test that each month is written to its own tab."""
+        with patch.dict(os.environ, {'SHEETS_PARTITION': 'month'}):
+            sheets_url_recorder.write_rows(self.service, 'spreadsheet_id', self.rows('2024-02-01T00:00:00Z'))
+            sheets_url_recorder.write_rows(self.service, 'spreadsheet_id', self.rows('2024-02-15T00:00:00Z'))
+        
+        self.assertEqual(self.added, ['Sheet1 2024-02'])
+        self.assertEqual(self.appended_ranges(), ["'Sheet1 2024-02'!A:F"] * 2)
+    
+    def test_existing_tab_is_adopted(self):
+        """Test that a tab added by another container is reused."""
+        self.service.spreadsheets.return_value.batchUpdate.side_effect = Exception(
+            'A sheet with the name "Sheet1 2024-02" already exists.')
+        
+        with patch.dict(os.environ, {'SHEETS_PARTITION': 'month'}):
+            routed = sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-02-01T00:00:00Z'))
+        
+        self.assertEqual(list(routed['spreadsheet_id']), ["'Sheet1 2024-02'!A:F"])
+        self.assertEqual(self.service.spreadsheets.return_value.get.call_count, 2)
+    
+    def test_spreadsheet_shards(self):
+        """Test rolling over to a new spreadsheet."""
+        self.service.spreadsheets.return_value.create.return_value.execute.return_value = {
+            'spreadsheetId': 'shard_id',
+            'sheets': [{'properties': {'sheetId': 0, 'title': 'Sheet1'}}]
+        }
+        
+        with patch.dict(os.environ, {'SHEETS_PARTITION': 'day', 'SHEETS_SHARD_TARGET': 'spreadsheet'}):
+            routed = sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-02-01T00:00:00Z'))
+        
+        self.assertEqual(list(routed), ['shard_id'])
+        body = self.service.spreadsheets.return_value.create.call_args.kwargs['body']
+        self.assertEqual(body['properties']['title'], 'spreadsheet_id Sheet1 2024-02-01')
+    
+    def test_shard_index_persisted(self):
+        """Test that shards are stored and found again by date."""
+        import tempfile
+        from shard_index import find_shards, load_shard_index
+        
+        with tempfile.TemporaryDirectory() as location:
+            with patch.dict(os.environ, {'SHEETS_PARTITION': 'month', 'SHEETS_SHARD_INDEX_LOCATION': location}):
+                sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-01-31T00:00:00Z'))
+                sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-02-01T00:00:00Z'))
+                index = load_shard_index(location, 'spreadsheet_id', 'Sheet1!A:F')
+                
+                # A new container picks up the stored shards
+                sheets_url_recorder._shard_indexes.clear()
+                sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-02-02T00:00:00Z'))
+        
+        self.assertEqual([shard['partition'] for shard in index['shards']], ['2024-01', '2024-02'])
+        self.assertEqual(self.added, ['Sheet1 2024-01', 'Sheet1 2024-02'])
+        self.assertEqual([shard['partition'] for shard in find_shards(index, '2024-02-01', '2024-02-28')], ['2024-02'])
+        self.assertEqual(len(find_shards(index, '2024-01', '2024-12')), 2)
+    
+    def test_row_counts_follow_written_rows(self):
+        """Test that failed writes and updated rows do not count towards the threshold."""
+        append = self.service.spreadsheets.return_value.values.return_value.append
+        append.return_value.execute.side_effect = Exception('backend error')
+        sheet = {'spreadsheetId': 'spreadsheet_id', 'sheetRange': 'Sheet1!A:F'}
+        sheets_url_recorder._shard_row_count(self.service, sheet, {})  # 2 filled rows read from the sheet
+        with patch.dict(os.environ, {'SHEETS_ROLLOVER_ROWS': '3'}):
+            self.assertIsNone(sheets_url_recorder.write_rows(
+                self.service, 'spreadsheet_id', self.rows('2024-01-01T00:00:01Z')))
+            self.assertEqual(sheets_url_recorder._sheet_row_counts[('spreadsheet_id', 'Sheet1')], 2)
+            
+            updated = {'appendedCount': 0, 'updatedCount': 1, 'existingCount': 0}
+            with patch('sheets_url_recorder.upsert_rows', return_value=updated):
+                sheets_url_recorder.write_rows(
+                    self.service, 'spreadsheet_id', self.rows('2024-01-01T00:00:02Z'), 'upsert')
+            self.assertEqual(sheets_url_recorder._sheet_row_counts[('spreadsheet_id', 'Sheet1')], 2)
+            
+            append.return_value.execute.side_effect = None
+            sheets_url_recorder.write_rows(self.service, 'spreadsheet_id', self.rows('2024-01-01T00:00:03Z'))
+        
+        self.assertEqual(self.added, [])
+        self.assertEqual(sheets_url_recorder._sheet_row_counts[('spreadsheet_id', 'Sheet1')], 3)
+    
+    def test_blank_grid_rows_are_not_counted(self):
+        """Test that a new sheet's blank grid rows do not trigger a rollover."""
+        self.service.spreadsheets.return_value.values.return_value.get.return_value.execute.return_value = {}
+        
+        with patch.dict(os.environ, {'SHEETS_ROLLOVER_ROWS': '3'}):
+            sheets_url_recorder.write_rows(
+                self.service, 'spreadsheet_id', self.rows('2024-01-01T00:00:01Z', '2024-01-01T00:00:02Z'))
+        
+        self.assertEqual(self.added, [])
+        self.assertEqual(sheets_url_recorder._sheet_row_counts[('spreadsheet_id', 'Sheet1')], 2)
+    
+    def test_failed_shard_rows_are_reported(self):
+        """Test that only the rows of a failed target spreadsheet are returned as failed."""
+        self.service.spreadsheets.return_value.create.return_value.execute.side_effect = [
+            {'spreadsheetId': f'shard_{day}', 'sheets': [{'properties': {'sheetId': 0, 'title': 'Sheet1'}}]}
+            for day in (1, 2)
+        ]
+        
+        def append(spreadsheetId, **kwargs):
+            request = MagicMock()
+            if spreadsheetId == 'shard_2':
+                request.execute.side_effect = Exception('backend error')
+            return request
+        
+        self.service.spreadsheets.return_value.values.return_value.append.side_effect = append
+        rows = self.rows('2024-02-01T00:00:00Z', '2024-02-02T00:00:00Z')
+        
+        with patch.dict(os.environ, {'SHEETS_PARTITION': 'day', 'SHEETS_SHARD_TARGET': 'spreadsheet'}):
+            counts = sheets_url_recorder.write_rows(self.service, 'spreadsheet_id', rows)
+        
+        self.assertEqual(counts['appendedCount'], 1)
+        self.assertEqual(len(counts['failedRows']), 1)
+        self.assertIs(counts['failedRows'][0], rows['Sheet1!A:F'][1])
+    
+    def test_shard_index_merged_with_other_containers(self):
+        """Test that saving the index keeps shards stored by other containers."""
+        import tempfile
+        from shard_index import load_shard_index, save_shard_index
+        
+        with tempfile.TemporaryDirectory() as location:
+            with patch.dict(os.environ, {'SHEETS_PARTITION': 'month', 'SHEETS_SHARD_INDEX_LOCATION': location}):
+                sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-01-31T00:00:00Z'))
+                # Another container opens the February shard
+                stored = load_shard_index(location, 'spreadsheet_id', 'Sheet1!A:F')['shards']
+                other = dict(stored[0], partition='2024-02', sheetRange="'Sheet1 2024-02'!A:F")
+                save_shard_index(location, 'spreadsheet_id', 'Sheet1!A:F', stored + [other])
+                
+                sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-03-01T00:00:00Z'))
+                index = load_shard_index(location, 'spreadsheet_id', 'Sheet1!A:F')
+        
+        self.assertEqual([shard['partition'] for shard in index['shards']], ['2024-01', '2024-02', '2024-03'])
+        shards = sheets_url_recorder._shard_indexes[('spreadsheet_id', 'Sheet1!A:F')]
+        self.assertEqual(len(shards), 3)
+    
+    def test_open_shard_found_for_later_dates(self):
+        """Test that the stored open shard has no last timestamp and matches later dates."""
+        import tempfile
+        from shard_index import find_shards, load_shard_index
+        
+        with tempfile.TemporaryDirectory() as location:
+            with patch.dict(os.environ, {'SHEETS_ROLLOVER_ROWS': '100', 'SHEETS_SHARD_INDEX_LOCATION': location}):
+                sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-01-01T00:00:00Z'))
+                sheets_url_recorder.route_rows(self.service, 'spreadsheet_id', self.rows('2024-01-02T00:00:00Z'))
+                index = load_shard_index(location, 'spreadsheet_id', 'Sheet1!A:F')
+        
+        self.assertIsNone(index['shards'][0]['lastTimestamp'])
+        self.assertEqual(len(find_shards(index, '2024-01-03', '2024-01-04')), 1)
+        self.assertEqual(find_shards(index, '2023-12-01', '2023-12-31'), [])
+    
+    def test_single_url_routed(self):
+        """Test that single URL events are routed too."""
+        with patch('sheets_url_recorder.get_sheets_service', return_value=self.service), \
+             patch.dict(os.environ, {'SHEETS_PARTITION': 'month'}):
+            response = lambda_handler({'url': 'https://example.com/a', 'spreadsheet_id': 'spreadsheet_id'}, Mock())
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(len(self.added), 1)
+        self.assertTrue(self.appended_ranges()[0].startswith("'Sheet1 "))
@@ -0,0 +1,93 @@
+"""
+Unit tests for tiled_capture module.
+"""
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the src directory to Python path to import the module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'lambda'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from browser_manager import BrowserManager
+from image_processing import PIL_AVAILABLE
+from tiled_capture import DEFAULT_MAX_TILES, tiling_options
+from fake_browser import FakeLauncher, LocalHTTPServer
+
+if PIL_AVAILABLE:
+    from PIL import Image
+
+VIEWPORT = {'width': 40, 'height': 30}
+
+
+def tall_page(elapsed):
+    """A 100px tall page, i.e. three full viewports and a 10px remainder."""
+    return {'mutations': 0, 'width': 40, 'height': 100, 'pendingImages': 0}
+
+
+class TestTilingOptions(unittest.TestCase):
+    """Test cases for tiling option parsing."""
+    
+    def test_tiling_options(self):
+        """Test modes and limits from configuration."""
+        self.assertEqual(tiling_options('stitch'), {'mode': 'stitch', 'maxTiles': DEFAULT_MAX_TILES})
+        self.assertEqual(tiling_options({'mode': 'tiles', 'maxTiles': '3'}), {'mode': 'tiles', 'maxTiles': 3})
+        with self.assertRaises(ValueError):
+            tiling_options('columns')
+
+
+@unittest.skipUnless(PIL_AVAILABLE, "Pillow is not installed")
+class TestTiledCapture(unittest.TestCase):
+    """Test cases for capturing a tall page in strips."""
+    
+    def _capture(self, tiling):
+        manager = BrowserManager(launcher=FakeLauncher(tall_page))
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        image_path = os.path.join(self.temp_dir.name, 'shot.png')
+        
+        with LocalHTTPServer({'/': '<html><body>long</body></html>'}) as server:
+            result = manager.run(manager.capture(
+                server.url('/'), image_path, {'viewport': VIEWPORT, 'tiling': tiling_options(tiling)}
+            ))
+        manager.run(manager.close())
+        return result
+    
+    def _assert_rows(self, path, first_row, height):
+        """Fake screenshots encode the document y of every row as its gray level."""
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (40, height))
+            gray = image.convert('L')
+            self.assertEqual([gray.getpixel((0, y)) for y in range(height)],
+                             [(first_row + y) % 256 for y in range(height)])
+    
+    def test_stitched_capture_matches_page(self):
+        """Test that strips are stitched into one image without gaps or overlap."""
+        result = self._capture('stitch')
+        
+        self.assertEqual(result['tiling'], {'mode': 'stitch', 'tileCount': 4, 'pageHeight': 100})
+        self.assertNotIn('tiles', result)
+        self._assert_rows(result['imagePath'], 0, 100)
+        self.assertEqual(os.listdir(self.temp_dir.name), ['shot.png'])
+    
+    def test_tiles_mode_keeps_cropped_tiles(self):
+        """Test that tiles are emitted separately and the last one is cropped."""
+        result = self._capture('tiles')
+        
+        tiles = result['tiles']
+        self.assertEqual([(tile['top'], tile['height']) for tile in tiles], [(0, 30), (30, 30), (60, 30), (90, 10)])
+        for tile in tiles:
+            self._assert_rows(tile['path'], tile['top'], tile['height'])
+        self._assert_rows(result['imagePath'], 0, 30)
+    
+    def test_max_tiles_limits_height(self):
+        """Test that endless pages are cut at maxTiles viewports."""
+        result = self._capture({'mode': 'stitch', 'maxTiles': 2})
+        
+        self.assertEqual(result['tiling']['pageHeight'], 60)
+        self._assert_rows(result['imagePath'], 0, 60)
+
+
+if __name__ == '__main__':
+    unittest.main()